@@ -28,7 +28,9 @@ api.interceptors.request.use(
 export const getLatestMetrics = () => api.get('/metrics/latest/');
 export const collectMetrics = () => api.post('/metrics/collect/');
 export const getMetricsHistory = (params) => api.get('/metrics/', { params });
-export const getMetricsStatistics = (days = 7) => api.get(`/metrics/statistics/?days=${days}`);
+// `points` caps the hourly chart series; the server downsamples it
+export const getMetricsStatistics = (days = 7, points) =>
+  api.get('/metrics/statistics/', { params: { days, points } });
 export const getSystemSummary = () => api.get('/dashboard/');
 export const getUnresolvedIssues = () => api.get('/issues/unresolved/');
 export const resolveIssue = (id) => api.post(`/issues/${id}/resolve/`);
@@ -36,6 +38,21 @@ export const login = (credentials) => api.post('/token/', credentials);
 export const register = (userData) => api.post('/users/register/', userData);
 export const getSystemInfo = () => api.get('/system-info/');
 export const getFanInfo = () => api.get("/fans/");
+// Training runs as a background job; poll it until its status is
+// 'succeeded', 'failed' or 'cancelled'
+export const getTrainingJob = (id) => api.get(`/training/jobs/${id}/`);
+export const cancelTrainingJob = (id) => api.post(`/training/jobs/${id}/cancel/`);
+
+// Live updates over Server-Sent Events. `handlers` maps event names
+// ('metric', 'issue', 'fans') to callbacks receiving the parsed payload.
+// EventSource reconnects by itself and resumes from the last event it saw.
+export const openMetricsStream = (handlers) => {
+  const source = new EventSource(`${API_BASE_URL}/stream/`);
+  Object.entries(handlers).forEach(([name, handler]) => {
+    source.addEventListener(name, (event) => handler(JSON.parse(event.data)));
+  });
+  return source;
+};
 
 export const trainModel = async (samples = 300) => {
   try {
@@ -19,7 +19,7 @@ import {
   IconAlertTriangle,
   IconCircleCheck,
 } from "@tabler/icons-react";
-import { getFanInfo } from "../api";
+import { getFanInfo, openMetricsStream } from "../api";
 
 const FanMonitor = () => {
   const [fans, setFans] = useState([]);
@@ -28,6 +28,21 @@ const FanMonitor = () => {
   const [metrics, setMetrics] = useState(null);
   const [anomalyDetected, setAnomalyDetected] = useState(false);
 
+  const updateFans = (data) => {
+    // Make sure you're setting the fans state with the response data
+    setFans(data);
+
+    // Check for anomalies only if there are fans
+    if (data && data.length > 0) {
+      const hasAnomaly = data.some(
+        (fan) =>
+          fan.status === "Inactive" ||
+          (fan.value && fan.value < 500 && fan.name.includes("CPU"))
+      );
+      setAnomalyDetected(hasAnomaly);
+    }
+  };
+
   // Load fan data when component mounts
   useEffect(() => {
     const fetchFanData = async () => {
@@ -36,18 +51,7 @@ const FanMonitor = () => {
         const response = await getFanInfo();
         console.log("Fan data response:", response);
         
-        // Make sure you're setting the fans state with the response data
-        setFans(response.data);
-        
-        // Check for anomalies only if there are fans
-        if (response.data && response.data.length > 0) {
-          const hasAnomaly = response.data.some(
-            (fan) =>
-              fan.status === "Inactive" ||
-              (fan.value && fan.value < 500 && fan.name.includes("CPU"))
-          );
-          setAnomalyDetected(hasAnomaly);
-        }
+        updateFans(response.data);
       } catch (err) {
         console.error("Failed to fetch fan information:", err);
         setError("Failed to load fan information");
@@ -57,10 +61,10 @@ const FanMonitor = () => {
     };
     fetchFanData();
 
-    // Set up polling for updated fan data every 30 seconds
-    const interval = setInterval(fetchFanData, 30000);
+    // Updated fan readings are pushed by the server
+    const stream = openMetricsStream({ fans: updateFans });
 
-    return () => clearInterval(interval);
+    return () => stream.close();
   }, []);
 
   // Function to get fan speed color based on RPM
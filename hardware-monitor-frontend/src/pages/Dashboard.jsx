@@ -23,9 +23,13 @@ import {
   IconRefresh
 } from '@tabler/icons-react';
 import { LineChart } from '@mantine/charts';
-import { getLatestMetrics, getSystemSummary, collectMetrics, getUnresolvedIssues } from '../api';
+import { getLatestMetrics, getSystemSummary, collectMetrics, getUnresolvedIssues, openMetricsStream } from '../api';
 import FanMonitor from '../components/FanMonitor';
 
+// The summary's trends move once a minute, so a burst of metric events
+// refreshes it at most this often
+const SUMMARY_REFRESH_MS = 30000;
+
 const Dashboard = () => {
   const [loading, setLoading] = useState(true);
   const [metrics, setMetrics] = useState(null);
@@ -62,9 +66,35 @@ const Dashboard = () => {
 
   useEffect(() => {
     fetchData();
-    // Refresh data every 30 seconds
-    const interval = setInterval(fetchData, 30000);
-    return () => clearInterval(interval);
+    let lastSummary = Date.now();
+    let summaryTimer = null;
+    const refreshSummary = () => {
+      if (summaryTimer) return;
+      const wait = Math.max(0, lastSummary + SUMMARY_REFRESH_MS - Date.now());
+      summaryTimer = setTimeout(() => {
+        summaryTimer = null;
+        lastSummary = Date.now();
+        getSystemSummary()
+          .then((res) => setSummary(res.data))
+          .catch((error) => console.error('Error fetching dashboard summary:', error));
+      }, wait);
+    };
+    // Push updates from the server instead of polling
+    const stream = openMetricsStream({
+      metric: (metric) => {
+        setMetrics(metric);
+        refreshSummary();
+      },
+      issue: (issue) => {
+        if (!issue.is_resolved) {
+          setIssues((current) => [issue, ...current.filter((i) => i.id !== issue.id)]);
+        }
+      },
+    });
+    return () => {
+      stream.close();
+      clearTimeout(summaryTimer);
+    };
   }, []);
 
   const cpuColor = metrics?.cpu_percent > 80 ? 'red' : metrics?.cpu_percent > 60 ? 'orange' : 'green';
@@ -16,6 +16,9 @@ import {
 import { AreaChart, BarChart } from '@mantine/charts';
 import { getMetricsStatistics, getMetricsHistory } from '../api';
 
+// Enough points for a full-width chart at any time range
+const CHART_POINTS = 500;
+
 const Metrics = () => {
   const [statistics, setStatistics] = useState(null);
   const [metricsHistory, setMetricsHistory] = useState([]);
@@ -27,7 +30,7 @@ const Metrics = () => {
 
   const fetchStatistics = async () => {
     try {
-      const response = await getMetricsStatistics(timeRange);
+      const response = await getMetricsStatistics(timeRange, CHART_POINTS);
       setStatistics(response.data);
     } catch (error) {
       console.error('Error fetching metrics statistics:', error);
@@ -17,7 +17,10 @@ import {
   Badge,
 } from '@mantine/core';
 import { IconAlertCircle, IconBrandPython, IconDatabase } from '@tabler/icons-react';
-import { trainModel, getMetricsStatistics } from '../api';
+import { trainModel, getTrainingJob, cancelTrainingJob, getMetricsStatistics } from '../api';
+
+const JOB_POLL_INTERVAL = 1000;
+const FINISHED_JOB_STATUSES = ['succeeded', 'failed', 'cancelled'];
 
 const Settings = () => {
   const [loading, setLoading] = useState(false);
@@ -28,6 +31,7 @@ const Settings = () => {
   const [autoRefresh, setAutoRefresh] = useState(true);
   const [metricsCount, setMetricsCount] = useState(0);
   const [loadingMetrics, setLoadingMetrics] = useState(true);
+  const [job, setJob] = useState(null);
   
   // Fetch the current number of metrics
   useEffect(() => {
@@ -55,8 +59,19 @@ const Settings = () => {
     setError(null);
     
     try {
-      await trainModel(samples);
-      setSuccess(true);
+      // Training runs in the background; poll the job until it finishes
+      let current = await trainModel(samples);
+      setJob(current);
+      while (!FINISHED_JOB_STATUSES.includes(current.status)) {
+        await new Promise((resolve) => window.setTimeout(resolve, JOB_POLL_INTERVAL));
+        current = (await getTrainingJob(current.id)).data;
+        setJob(current);
+      }
+      if (current.status === 'succeeded') {
+        setSuccess(true);
+      } else if (current.status === 'failed') {
+        setError(current.error || 'Failed to train the model.');
+      }
     } catch (error) {
       console.error('Error training model:', error);
       setError('Failed to train the model. Not enough data or server error. See console for details.');
@@ -65,6 +80,15 @@ const Settings = () => {
     }
   };
   
+  const handleCancelTraining = async () => {
+    try {
+      const response = await cancelTrainingJob(job.id);
+      setJob(response.data);
+    } catch (error) {
+      console.error('Error cancelling training:', error);
+    }
+  };
+  
   // Calculate how many more samples are needed
   const minimumSamples = 50;
   const samplesNeeded = Math.max(0, minimumSamples - metricsCount);
@@ -166,6 +190,31 @@ const Settings = () => {
             </Button>
           </Group>
           
+          {loading && job && (
+            <Group align="center" mb="md">
+              <Progress
+                value={job.progress * 100}
+                size="lg"
+                radius="xl"
+                striped
+                animate
+                style={{ flex: 1 }}
+              />
+              <Text size="sm" color="dimmed">
+                {job.status === 'queued' ? 'Waiting for another training job' : job.stage}
+              </Text>
+              <Button
+                variant="light"
+                color="red"
+                size="xs"
+                onClick={handleCancelTraining}
+                disabled={job.cancel_requested}
+              >
+                Cancel
+              </Button>
+            </Group>
+          )}
+          
           <Text size="sm" color="dimmed">
             Training a new model will analyze your system's typical performance patterns to better detect anomalies.
             This process may take a few minutes depending on the number of samples.
@@ -4,7 +4,9 @@ Admin configuration for the hardware monitoring app.
 """
 
 from django.contrib import admin
-from .models import SystemMetric, HardwareIssue, ModelTrainingHistory
+from django.db import transaction
+from .models import SystemMetric, HardwareIssue, MetricRollup, ModelTrainingHistory, TrainingJob
+from .rollups import refresh_rollups
 
 @admin.register(SystemMetric)
 class SystemMetricAdmin(admin.ModelAdmin):
@@ -31,7 +33,29 @@ class SystemMetricAdmin(admin.ModelAdmin):
             'fields': ('cpu_temp', 'battery_percent', 'fan_speed'),
             'classes': ('collapse',)
         }),
+        ('Raw Sample Range', {
+            'fields': ('sample_count', 'cpu_percent_min', 'cpu_percent_max',
+                       'memory_percent_min', 'memory_percent_max'),
+            'classes': ('collapse',)
+        }),
     )
+    
+    def save_model(self, request, obj, form, change):
+        """Save the metric and recompute the rollups it falls into."""
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            refresh_rollups([obj.timestamp])
+    
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            refresh_rollups([obj.timestamp])
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            timestamps = list(queryset.values_list('timestamp', flat=True))
+            super().delete_queryset(request, queryset)
+            refresh_rollups(timestamps)
 
 
 @admin.register(HardwareIssue)
@@ -68,6 +92,35 @@ class HardwareIssueAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('metric')
 
 
+@admin.register(MetricRollup)
+class MetricRollupAdmin(admin.ModelAdmin):
+    list_display = ('bucket', 'granularity', 'count', 'anomaly_count')
+    list_filter = ('granularity',)
+    ordering = ('granularity', '-bucket')
+    date_hierarchy = 'bucket'
+    
+    def has_add_permission(self, request):
+        """Rollups are maintained from the raw metrics only."""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TrainingJob)
+class TrainingJobAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'model_name', 'status', 'samples', 'progress', 'finished_at')
+    list_filter = ('status', 'model_name')
+    ordering = ('-created_at',)
+    
+    def has_add_permission(self, request):
+        """Jobs are queued through the API only."""
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(ModelTrainingHistory)
 class ModelTrainingHistoryAdmin(admin.ModelAdmin):
     list_display = ('trained_at', 'training_samples', 'performance_score')
@@ -75,14 +128,14 @@ class ModelTrainingHistoryAdmin(admin.ModelAdmin):
     search_fields = ('notes',)
     ordering = ('-trained_at',)
     date_hierarchy = 'trained_at'
-    readonly_fields = ('trained_at', 'model_file_path', 'scaler_file_path', 'training_samples')
+    readonly_fields = ('trained_at', 'model_file_path', 'scaler_file_path', 'schema_hash', 'training_samples')
     
     fieldsets = (
         ('Training Information', {
             'fields': ('trained_at', 'training_samples', 'performance_score')
         }),
         ('Model Files', {
-            'fields': ('model_file_path', 'scaler_file_path'),
+            'fields': ('model_file_path', 'schema_hash', 'scaler_file_path'),
             'classes': ('collapse',)
         }),
         ('Notes', {
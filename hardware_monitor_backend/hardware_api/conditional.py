@@ -0,0 +1,138 @@
+"""
+Conditional GET support for the polled endpoints.
+
+A view declares what its response depends on: ``metrics``, ``issues``,
+``model`` and/or ``dashboard``. Each source has a version read with a few
+``MAX()`` queries that the database answers from an index (or one small
+cache read), and the combined version backs the ``ETag`` and
+``Last-Modified`` headers. When a poll's ``If-None-Match`` still matches,
+Django's ``condition`` answers 304 before the view runs.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.db.models import Max
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .dashboard import get_dashboard_snapshot_version
+from .models import SystemMetric, HardwareIssue, ModelTrainingHistory
+from .rollups import rollups_version
+
+
+def _latest(queryset, field):
+    return queryset.aggregate(latest=Max(field))['latest']
+
+
+def metrics_version():
+    """
+    New metrics only ever get higher ids; changing or deleting one rebuilds
+    its rollups, which moves the rollup version.
+    """
+    changed_at = rollups_version()
+    latest = _latest(SystemMetric.objects, 'timestamp')
+    changed = [t for t in (latest, changed_at) if t]
+    return (
+        (_latest(SystemMetric.objects, 'id'), changed_at),
+        max(changed) if changed else None,
+    )
+
+
+def issues_version():
+    """
+    New issues get higher ids; resolving one moves the latest ``resolved_at``.
+
+    Deleting an issue is not seen here, but the ``metrics`` version of the
+    same views moves with the next collection anyway.
+    """
+    latest_id = _latest(HardwareIssue.objects, 'id')
+    latest_resolved = _latest(HardwareIssue.objects, 'resolved_at')
+    changed = [t for t in (_latest(HardwareIssue.objects, 'timestamp'), latest_resolved) if t]
+    return (latest_id, latest_resolved), max(changed) if changed else None
+
+
+def model_version():
+    """Every training run adds a history row."""
+    latest = ModelTrainingHistory.objects.order_by('-id').values_list('id', 'trained_at').first()
+    return latest or (None, None)
+
+
+def dashboard_version():
+    """
+    The collector publishes a new snapshot every cycle, after its buffered
+    metrics reach the database.
+
+    No time is given: snapshots can be published more than once a second,
+    finer than ``Last-Modified`` can tell apart, so a view depending on the
+    dashboard alone is revalidated by its ETag only.
+    """
+    return get_dashboard_snapshot_version(), None
+
+
+SOURCES = {
+    'metrics': metrics_version,
+    'issues': issues_version,
+    'model': model_version,
+    'dashboard': dashboard_version,
+}
+
+
+def get_versions(request, sources):
+    """
+    ``(token, changed_at)`` for each source, read once per request.
+
+    ``condition`` asks for the ETag and Last-Modified separately, so the
+    versions are kept on the request.
+    """
+    versions = getattr(request, '_data_versions', None)
+    if versions is None:
+        versions = request._data_versions = {}
+    for source in sources:
+        if source not in versions:
+            versions[source] = SOURCES[source]()
+    return [versions[source] for source in sources]
+
+
+def conditional_on(*sources, extra=None):
+    """
+    Decorate a view so unchanged responses are answered with 304.
+
+    Args:
+        *sources (str): Names from ``SOURCES`` the response depends on
+        extra (callable, optional): ``extra(request)`` returns more values
+            the response depends on, e.g. query parameters
+
+    Returns:
+        callable: A decorator for function views; wrap it in
+            ``method_decorator`` for methods
+    """
+    unknown = set(sources) - set(SOURCES)
+    if unknown:
+        raise ValueError(f"Unknown version sources: {', '.join(sorted(unknown))}")
+
+    def etag(request, *args, **kwargs):
+        parts = [token for token, _ in get_versions(request, sources)]
+        if any(part is None for part in parts):
+            # A source with no version yet, e.g. no snapshot published
+            return None
+        if extra is not None:
+            parts.extend(extra(request))
+        return hashlib.md5(repr(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        times = [changed for _, changed in get_versions(request, sources) if changed]
+        return max(times) if times else None
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Make browsers revalidate every time instead of guessing a
+            # freshness lifetime from Last-Modified
+            patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,132 @@
+"""
+Precomputed dashboard snapshot.
+
+The collector rebuilds the snapshot once per collection cycle and stores it
+in the shared ``hardware_monitor`` cache. ``DashboardView`` then answers
+every poll with a single cache read, however many clients are open.
+"""
+
+import logging
+
+from django.core.cache import caches
+from django.core.cache.backends.base import InvalidCacheBackendError
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import SystemMetric, HardwareIssue, ModelTrainingHistory
+from .rollups import recent_averages
+from .serializers import SystemSummarySerializer
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_CACHE_ALIAS = 'hardware_monitor'
+SNAPSHOT_KEY = 'dashboard-snapshot'
+# generated_at of the current snapshot, readable without loading it
+SNAPSHOT_VERSION_KEY = 'dashboard-snapshot-version'
+
+
+def get_snapshot_cache():
+    """The cache shared by the collector and the web workers."""
+    try:
+        return caches[SNAPSHOT_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return caches['default']
+
+
+def build_dashboard_snapshot(current_state, model_trained):
+    """
+    Build the dashboard summary.
+
+    Args:
+        current_state (dict): Latest collected metrics
+        model_trained (bool): Whether an anomaly model is loaded
+
+    Returns:
+        dict: Serialized ``SystemSummarySerializer`` data
+    """
+    # Recent anomalies with their issues, in two queries
+    recent_anomalies = SystemMetric.objects.filter(
+        is_anomaly=True
+    ).order_by('-timestamp').only('timestamp', 'anomaly_score').prefetch_related(
+        Prefetch('issues', queryset=HardwareIssue.objects.only(
+            'metric_id', 'issue_type', 'recommendation'
+        ))
+    )[:5]
+
+    unresolved_issues = HardwareIssue.objects.filter(
+        is_resolved=False
+    ).order_by('-timestamp').values('id', 'timestamp', 'issue_type', 'recommendation')
+
+    # Trend data: per-minute averages of the last 100 minutes, newest first
+    trends = recent_averages(['cpu_percent', 'memory_percent', 'disk_usage_percent'])
+
+    last_training = ModelTrainingHistory.objects.order_by('-trained_at').values_list(
+        'trained_at', flat=True
+    ).first()
+
+    summary = {
+        'generated_at': timezone.now(),
+        'current_state': current_state,
+        'recent_anomalies': [
+            {
+                'timestamp': a.timestamp,
+                'anomaly_score': a.anomaly_score,
+                'issues': [
+                    {'type': i.issue_type, 'recommendation': i.recommendation}
+                    for i in a.issues.all()
+                ]
+            }
+            for a in recent_anomalies
+        ],
+        'unresolved_issues': list(unresolved_issues),
+        'trends': {
+            'cpu': trends['cpu_percent'],
+            'memory': trends['memory_percent'],
+            'disk': trends['disk_usage_percent']
+        },
+        'model_status': {
+            'trained': model_trained,
+            'last_training': last_training
+        }
+    }
+    return SystemSummarySerializer(summary).data
+
+
+def publish_dashboard_snapshot(current_state, model_trained, timeout=None):
+    """
+    Rebuild the snapshot and store it for the web workers.
+
+    Args:
+        current_state (dict): Latest collected metrics
+        model_trained (bool): Whether an anomaly model is loaded
+        timeout (int, optional): Seconds before the snapshot expires, so a
+            stopped collector does not leave a stale dashboard behind
+
+    Returns:
+        dict: The snapshot
+    """
+    snapshot = build_dashboard_snapshot(current_state, model_trained)
+    try:
+        get_snapshot_cache().set_many({
+            SNAPSHOT_KEY: snapshot,
+            SNAPSHOT_VERSION_KEY: snapshot['generated_at'],
+        }, timeout)
+    except Exception as e:
+        logger.error(f"Error storing dashboard snapshot: {e}")
+    return snapshot
+
+
+def get_dashboard_snapshot():
+    """
+    Returns:
+        dict: The latest snapshot, or None if none is cached
+    """
+    return get_snapshot_cache().get(SNAPSHOT_KEY)
+
+
+def get_dashboard_snapshot_version():
+    """
+    Returns:
+        str: ``generated_at`` of the cached snapshot, or None
+    """
+    return get_snapshot_cache().get(SNAPSHOT_VERSION_KEY)
@@ -0,0 +1,249 @@
+"""
+Server-side downsampling of time series for charts.
+
+Both methods pick a subset of the original points rather than averaging
+them, so every point returned is a real sample and spikes survive:
+
+- ``lttb``: Largest-Triangle-Three-Buckets, which keeps the points that
+  contribute most to the visual shape of the line.
+- ``minmax``: the lowest and highest point of each bucket.
+
+A chart with several series shares the point budget between them: each
+series picks its own points and the rows at all picked positions are
+returned, so no series loses its extremes to another's.
+"""
+
+import numpy as np
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+
+METHODS = ('lttb', 'minmax')
+
+# Upper bound on ?points=, so one request cannot ask for the raw history
+MAX_POINTS = 5000
+
+
+# Rows fetched from the database cursor per batch by load_columns
+FETCH_SIZE = 20000
+
+# Rounds select_indices spends growing each series' share towards n
+FILL_ROUNDS = 4
+
+
+def _as_float(values):
+    """Values as a float array, with None as NaN."""
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def lttb_indices(x, y, n):
+    """
+    Indices of the ``n`` points Largest-Triangle-Three-Buckets keeps.
+
+    Args:
+        x (numpy.ndarray): Ascending x coordinates
+        y (numpy.ndarray): Values, NaN where missing
+        n (int): Points to keep (at least 3)
+
+    Returns:
+        numpy.ndarray: Sorted indices into ``x``
+    """
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+
+    # Missing values count as the series mean so they neither win nor
+    # distort the triangle areas
+    y = np.where(np.isnan(y), np.nanmean(y) if not np.isnan(y).all() else 0.0, y)
+
+    # n - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+
+    # Mean of every bucket, vectorised; bucket i uses the mean of bucket i + 1
+    counts = ends - starts
+    x_means = np.add.reduceat(x[1:size - 1], starts - 1) / counts
+    y_means = np.add.reduceat(y[1:size - 1], starts - 1) / counts
+    x_next = np.append(x_means[1:], x[-1])
+    y_next = np.append(y_means[1:], y[-1])
+
+    selected = np.empty(n, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        start, end = starts[i], ends[i]
+        # Twice the area of the triangle (a, candidate, next bucket mean)
+        areas = np.abs(
+            (x[a] - x_next[i]) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (y_next[i] - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+def minmax_indices(x, y, n):
+    """
+    Indices of the minimum and maximum of ``n // 2`` equal-count buckets.
+
+    Args:
+        x (numpy.ndarray): Ascending x coordinates
+        y (numpy.ndarray): Values, NaN where missing
+        n (int): Points to keep (at least 2)
+
+    Returns:
+        numpy.ndarray: Sorted, unique indices into ``x``
+    """
+    size = len(x)
+    if n >= size or n < 2:
+        return np.arange(size)
+
+    buckets = n // 2
+    bucket_of = (np.arange(size) * buckets) // size
+
+    # Sorting by (bucket, value) puts each bucket's minimum first and its
+    # maximum last; missing values sort to neither end
+    low = np.where(np.isnan(y), np.inf, y)
+    high = np.where(np.isnan(y), -np.inf, y)
+    by_low = np.lexsort((low, bucket_of))
+    by_high = np.lexsort((high, bucket_of))
+
+    first = np.flatnonzero(np.diff(bucket_of, prepend=-1))
+    last = np.append(first[1:], size) - 1
+    return np.unique(np.concatenate((by_low[first], by_high[last])))
+
+
+def select_indices(x, series, n, method='lttb'):
+    """
+    Indices of the rows to keep so that each series is downsampled fairly.
+
+    Every series starts with an equal share of ``n``. Series often pick the
+    same rows (the ends, a spike they share), which would leave the result
+    well short of ``n``, so the shares grow in proportion to the shortfall
+    for a few rounds, and any slots still free go to rows picked in a round
+    that overshot.
+
+    Args:
+        x (numpy.ndarray): Ascending x coordinates
+        series (list): One value array per series
+        n (int): Maximum number of rows to keep
+        method (str): One of ``METHODS``
+
+    Returns:
+        numpy.ndarray: Sorted, unique indices, at most ``n`` of them
+    """
+    size = len(x)
+    if size <= n:
+        return np.arange(size)
+    if not series:
+        return np.linspace(0, size - 1, n).astype(np.int64)
+
+    pick = lttb_indices if method == 'lttb' else minmax_indices
+    share = max(n // len(series), 3)
+    best, over = None, None
+    for _ in range(FILL_ROUNDS):
+        indices = np.unique(np.concatenate([pick(x, y, share) for y in series]))
+        if len(indices) > n:
+            if over is None or len(indices) < len(over):
+                over = indices
+        elif best is None or len(indices) > len(best):
+            best = indices
+        if len(indices) == n:
+            break
+        next_share = min(size, max(3, share * n // len(indices)))
+        if next_share == share:
+            break
+        share = next_share
+
+    if best is None:
+        # Only when n is smaller than three points per series
+        return over[np.linspace(0, len(over) - 1, n).astype(np.int64)]
+    if len(best) < n and over is not None:
+        extra = np.setdiff1d(over, best, assume_unique=True)
+        extra = extra[np.linspace(0, len(extra) - 1, n - len(best)).astype(np.int64)]
+        best = np.union1d(best, extra)
+    return best
+
+
+def downsample_rows(rows, points, x_field, fields, method='lttb'):
+    """
+    Downsample a list of dicts or tuples ordered by ``x_field``.
+
+    Args:
+        rows (list): Rows, oldest first
+        points (int): Maximum number of rows to return
+        x_field (str or int): Key or index of the datetime the rows are
+            ordered by
+        fields (iterable): Keys or indices of the numeric values whose
+            shape is preserved
+        method (str): One of ``METHODS``
+
+    Returns:
+        list: At most ``points`` of the original rows, in order
+    """
+    if len(rows) <= points:
+        return list(rows)
+    x = np.array([row[x_field].timestamp() for row in rows], dtype=np.float64)
+    series = [_as_float(row[field] for row in rows) for field in fields]
+    return [rows[i] for i in select_indices(x, series, points, method)]
+
+
+def _seconds(values):
+    """
+    Datetime column as float seconds since the epoch.
+
+    Naive values are UTC, as Django stores them with ``USE_TZ``; backends
+    with time zone support return aware ones.
+    """
+    if values and values[0].tzinfo is None:
+        stamps = np.array(values, dtype='datetime64[us]')
+        return stamps.astype(np.int64) / 1e6
+    return np.fromiter((v.timestamp() for v in values), dtype=np.float64, count=len(values))
+
+
+def load_columns(queryset, x_field, fields):
+    """
+    Read ``id``, ``x_field`` and ``fields`` of a queryset into NumPy arrays.
+
+    The query runs on a plain database cursor, so rows are built as the
+    driver returns them, without the ORM's per-value conversions (making
+    every timestamp aware is a large part of the cost of ``values_list``),
+    and every fetched batch is transposed and converted by NumPy.
+
+    Args:
+        queryset (QuerySet): Rows, ordered by ``x_field``
+        x_field (str): Datetime column the rows are ordered by
+        fields (list): Numeric columns
+
+    Returns:
+        tuple: ``(ids, x, series)``; ``x`` in seconds and one float array
+        per field in ``series``, NaN where the value is NULL
+    """
+    query = queryset.values_list('id', x_field, *fields).query
+    try:
+        sql, params = query.get_compiler(queryset.db).as_sql()
+    except EmptyResultSet:
+        # A filter that matches nothing, e.g. id__in=[]
+        sql = None
+
+    batches = []
+    if sql is not None:
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                batches.append((
+                    np.array(columns[0], dtype=np.int64),
+                    _seconds(columns[1]),
+                    [np.array(column, dtype=np.float64) for column in columns[2:]],
+                ))
+
+    if not batches:
+        empty = np.empty(0)
+        return np.empty(0, dtype=np.int64), empty, [empty for _ in fields]
+    ids = np.concatenate([batch[0] for batch in batches])
+    x = np.concatenate([batch[1] for batch in batches])
+    series = [np.concatenate([batch[2][i] for batch in batches]) for i in range(len(fields))]
+    return ids, x, series
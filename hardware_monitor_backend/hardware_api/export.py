@@ -0,0 +1,164 @@
+"""
+Streaming bulk export of ``SystemMetric`` rows as CSV or NDJSON.
+
+Rows are read with ``values_list().iterator()`` so no model instances are
+built, and encoded a batch at a time into a single bytes chunk, so memory
+stays flat however long the range is. Used by ``/api/export/metrics/`` and
+the ``export_metrics`` management command.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+from django.db import models
+
+from .models import SystemMetric
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Every concrete column, in model order
+EXPORT_FIELDS = tuple(
+    field.attname for field in SystemMetric._meta.concrete_fields
+)
+
+# Columns written as ISO 8601 in both formats
+DATETIME_FIELDS = frozenset(
+    field.attname for field in SystemMetric._meta.concrete_fields
+    if isinstance(field, models.DateTimeField)
+)
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def export_queryset(start=None, end=None, fields=EXPORT_FIELDS):
+    """
+    Rows in ``[start, end]`` as tuples of ``fields``, oldest first.
+
+    Args:
+        start (datetime, optional): Earliest timestamp to include
+        end (datetime, optional): Latest timestamp to include
+        fields (tuple): Column names, see ``EXPORT_FIELDS``
+
+    Returns:
+        QuerySet: A ``values_list`` queryset
+    """
+    queryset = SystemMetric.objects.all()
+    if start is not None:
+        queryset = queryset.filter(timestamp__gte=start)
+    if end is not None:
+        queryset = queryset.filter(timestamp__lte=end)
+    return queryset.order_by('timestamp', 'id').values_list(*fields)
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _isoformat_datetimes(batch, fields):
+    """Replace the datetimes in each row with their ISO 8601 strings."""
+    indexes = [i for i, field in enumerate(fields) if field in DATETIME_FIELDS]
+    if not indexes:
+        return batch
+    rows = []
+    for row in batch:
+        row = list(row)
+        for i in indexes:
+            if row[i] is not None:
+                row[i] = row[i].isoformat()
+        rows.append(row)
+    return rows
+
+
+def encode_csv(rows, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encode rows as CSV with a header line.
+
+    Yields:
+        bytes: One chunk per ``chunk_size`` rows
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    yield buffer.getvalue().encode()
+
+    for batch in _batches(rows, chunk_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_isoformat_datetimes(batch, fields))
+        yield buffer.getvalue().encode()
+
+
+def encode_ndjson(rows, fields, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Encode rows as newline-delimited JSON objects.
+
+    Yields:
+        bytes: One chunk per ``chunk_size`` rows
+    """
+    encode = json.JSONEncoder(separators=(',', ':')).encode
+
+    for batch in _batches(rows, chunk_size):
+        lines = []
+        for row in _isoformat_datetimes(batch, fields):
+            lines.append(encode(dict(zip(fields, row))))
+        lines.append('')
+        yield '\n'.join(lines).encode()
+
+
+ENCODERS = {
+    'csv': encode_csv,
+    'ndjson': encode_ndjson,
+}
+
+
+def gzip_chunks(chunks, level=6):
+    """
+    Compress a stream of byte chunks into a single gzip member.
+
+    Yields:
+        bytes: Compressed chunks (empty ones are skipped)
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_metrics(fmt='csv', start=None, end=None, fields=EXPORT_FIELDS,
+                   compress=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Stream metrics in the given format.
+
+    Args:
+        fmt (str): One of ``EXPORT_FORMATS``
+        start (datetime, optional): Earliest timestamp to include
+        end (datetime, optional): Latest timestamp to include
+        fields (tuple): Column names, see ``EXPORT_FIELDS``
+        compress (bool): Gzip the output
+        chunk_size (int): Rows fetched from the database and encoded per chunk
+
+    Returns:
+        iterator: Byte chunks
+    """
+    fields = tuple(fields)
+    rows = export_queryset(start, end, fields).iterator(chunk_size=chunk_size)
+    chunks = ENCODERS[fmt](rows, fields, chunk_size)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    return chunks
@@ -0,0 +1,185 @@
+"""
+A fitted IsolationForest stored as flat NumPy arrays.
+
+scikit-learn keeps each tree in a Cython object that copies its nodes into
+private memory when it is unpickled, so every process that loads a model
+holds its own copy of every tree. ``FlatForest`` holds the same trees as a
+handful of plain arrays (one entry per node, all trees end to end). Saved
+with joblib and loaded with ``mmap_mode='r'``, those arrays are read
+straight from the page cache, so all web workers and the collector share one
+copy of the model, whatever its size.
+
+Scoring walks many samples through blocks of trees together, one level per
+step, and gives the same results as ``IsolationForest.decision_function``.
+"""
+
+import numpy as np
+
+# Samples x trees walked per step while scoring. Blocks of trees keep the
+# nodes being read in cache.
+BLOCK_SIZE = 1 << 16
+MIN_BLOCK_TREES = 64
+
+
+def average_path_length(n_samples):
+    """
+    Average path length of an unsuccessful search in a binary search tree of
+    ``n_samples`` nodes, the normalisation of the isolation forest paper.
+
+    Args:
+        n_samples (numpy.ndarray): Sample counts
+
+    Returns:
+        numpy.ndarray: float64 array of the same shape
+    """
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    lengths = np.zeros_like(n_samples)
+    lengths[n_samples == 2] = 1.0
+    many = n_samples > 2
+    lengths[many] = (
+        2.0 * (np.log(n_samples[many] - 1.0) + np.euler_gamma)
+        - 2.0 * (n_samples[many] - 1.0) / n_samples[many]
+    )
+    return lengths
+
+
+class FlatForest:
+    """The trees of a fitted IsolationForest as flat arrays."""
+
+    def __init__(self, children, feature, threshold, path_length, roots, max_depth,
+                 denominator, offset, n_features):
+        """
+        Args:
+            children (numpy.ndarray): Left and right child of each node,
+                interleaved (``2 * node`` and ``2 * node + 1``); leaves
+                point to themselves
+            feature (numpy.ndarray): Column each node splits on
+            threshold (numpy.ndarray): Go left when the value is <= threshold
+            path_length (numpy.ndarray): Path length a sample ending in the
+                node adds to its depth (leaves only)
+            roots (numpy.ndarray): Root node of each tree
+            max_depth (int): Splits on the longest path of any tree
+            denominator (float): Trees times the average path length of
+                the forest's sample size
+            offset (float): The forest's ``offset_``
+            n_features (int): Columns the forest was fitted on
+        """
+        self.children = children
+        self.feature = feature
+        self.threshold = threshold
+        self.path_length = path_length
+        self.roots = roots
+        self.max_depth = max_depth
+        self.denominator = denominator
+        self.offset = offset
+        self.n_features = n_features
+
+    @classmethod
+    def from_isolation_forest(cls, model):
+        """
+        Flatten a fitted ``sklearn.ensemble.IsolationForest``.
+
+        Args:
+            model (IsolationForest): The fitted forest
+
+        Returns:
+            FlatForest: The same trees as arrays
+        """
+        subsampled = any(len(features) != model.n_features_in_ for features in model.estimators_features_)
+        left, right, feature, threshold, leaf_samples, roots = [], [], [], [], [], []
+        start = 0
+        for estimator, features in zip(model.estimators_, model.estimators_features_):
+            tree = estimator.tree_
+            nodes = np.arange(start, start + tree.node_count)
+            is_leaf = tree.children_left < 0
+            left.append(np.where(is_leaf, nodes, tree.children_left + start))
+            right.append(np.where(is_leaf, nodes, tree.children_right + start))
+            # A tree fitted on a subset of the columns numbers them within it
+            columns = np.asarray(features)[tree.feature] if subsampled else tree.feature
+            feature.append(np.where(is_leaf, 0, columns))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            leaf_samples.append(np.where(is_leaf, tree.n_node_samples, 0))
+            roots.append(start)
+            start += tree.node_count
+
+        left = np.concatenate(left).astype(np.int32)
+        right = np.concatenate(right).astype(np.int32)
+        roots = np.array(roots, dtype=np.int32)
+
+        # Nodes on the path from the root, counted level by level
+        depth = np.zeros(len(left), dtype=np.float64)
+        level, frontier = 1, roots
+        while len(frontier):
+            depth[frontier] = level
+            children = np.concatenate((left[frontier], right[frontier]))
+            frontier = children[children != np.concatenate((frontier, frontier))]
+            level += 1
+
+        leaf_samples = np.concatenate(leaf_samples)
+        return cls(
+            children=np.stack((left, right), axis=1).ravel(),
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            path_length=depth + average_path_length(leaf_samples) - 1.0,
+            roots=roots,
+            max_depth=level - 2,
+            denominator=float(len(roots) * average_path_length([model.max_samples_])[0]),
+            offset=float(model.offset_),
+            n_features=int(model.n_features_in_),
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the node arrays."""
+        return sum(getattr(self, name).nbytes for name in
+                   ('children', 'feature', 'threshold', 'path_length', 'roots'))
+
+    def decision_function(self, matrix):
+        """
+        Anomaly score of each row; negative means anomalous.
+
+        Args:
+            matrix (numpy.ndarray): Scaled features, one row per sample
+
+        Returns:
+            numpy.ndarray: float64 scores, as ``IsolationForest.decision_function``
+        """
+        # The trees were grown on float32 values
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if matrix.ndim != 2 or matrix.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features per sample, got shape {matrix.shape}")
+
+        depths = np.zeros(len(matrix), dtype=np.float64)
+        trees = min(self.n_trees, max(MIN_BLOCK_TREES, BLOCK_SIZE // max(1, len(matrix))))
+        step = max(1, BLOCK_SIZE // trees)
+        for start in range(0, len(matrix), step):
+            chunk = matrix[start:start + step]
+            values = chunk.ravel()
+            # Offset of each sample's first value in ``values``
+            rows = (np.arange(len(chunk), dtype=np.int32) * self.n_features)[:, None]
+            for first in range(0, self.n_trees, trees):
+                roots = self.roots[first:first + trees]
+                nodes = np.broadcast_to(roots, (len(chunk), len(roots)))
+                for _ in range(self.max_depth):
+                    right = values[rows + self.feature[nodes]] > self.threshold[nodes]
+                    nodes = self.children[2 * nodes + right]
+                depths[start:start + step] += self.path_length[nodes].sum(axis=1)
+
+        if self.denominator == 0:
+            # Forest fitted on a single sample: scikit-learn takes the
+            # normalised depth as 1, so every score is -2 ** -1
+            return np.full(len(matrix), -0.5 - self.offset)
+        return -(2.0 ** (-depths / self.denominator)) - self.offset
+
+    def predict(self, matrix):
+        """
+        Label each row like ``IsolationForest.predict``.
+
+        Returns:
+            numpy.ndarray: -1 for anomalies, 1 otherwise
+        """
+        return np.where(self.decision_function(matrix) < 0, -1, 1)
@@ -1,13 +1,11 @@
 import os
 import psutil
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
-import joblib
 import logging
+import threading
 from datetime import datetime
 from django.conf import settings
+from django.db import transaction
 from django.utils import timezone
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -15,122 +13,141 @@ from rest_framework import status
 from rest_framework.permissions import AllowAny
 
 from .models import SystemMetric, HardwareIssue, ModelTrainingHistory
+from .samplers import get_cpu_sampler, stop_cpu_sampler
+from .sensors import get_sensor_catalog
+from .write_buffer import MetricWriteBuffer
+from .rollups import update_rollups
+from .dashboard import build_dashboard_snapshot, publish_dashboard_snapshot
+from .pipeline import FeaturePipeline, TrainingCancelled
+from .model_registry import ModelRegistry
 
-# Setup logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    filename='hardware_monitor_django.log'
-)
+# scikit-learn and joblib take seconds to import; pipeline.py only imports
+# them once a model is loaded or trained, so management commands and worker
+# start-up do not pay for them
 
 class HardwareMonitorService:
     """Service for hardware monitoring and anomaly detection."""
     
     def __init__(self):
         """Initialize the hardware monitor service."""
-        self.model = None
-        self.scaler = None
-        self.model_path = os.path.join(settings.ML_MODELS_DIR, "hardware_health_model.joblib")
-        self.scaler_path = os.path.join(settings.ML_MODELS_DIR, "hardware_metrics_scaler.joblib")
-        self.columns = [
-            'cpu_percent', 'memory_percent', 'swap_percent', 
-            'disk_usage_percent', 'disk_read_count', 'disk_write_count',
-            'network_bytes_sent', 'network_bytes_recv', 'cpu_temp',
-            'battery_percent', 'fan_speed'
-        ]
-        
-        # Try to load the latest model from the database
-        self._load_latest_model()
+        # Hands out the current feature pipeline and follows retraining
+        self.models = ModelRegistry()
+        config = getattr(settings, 'HARDWARE_MONITOR', {})
+        self.write_buffer = MetricWriteBuffer(
+            batch_size=config.get('WRITE_BATCH_SIZE', 100),
+            max_age=config.get('WRITE_BATCH_MAX_AGE', 10),
+        )
     
-    def _load_latest_model(self):
-        """Load the latest trained model if available."""
-        try:
-            latest_model = ModelTrainingHistory.objects.order_by('-trained_at').first()
-            if latest_model:
-                self.model = joblib.load(latest_model.model_file_path)
-                self.scaler = joblib.load(latest_model.scaler_file_path)
-                logging.info(f"Loaded model trained at {latest_model.trained_at}")
-                return True
-            
-            # Fall back to default paths if no database record
-            if os.path.exists(self.model_path) and os.path.exists(self.scaler_path):
-                self.model = joblib.load(self.model_path)
-                self.scaler = joblib.load(self.scaler_path)
-                logging.info("Loaded model from default paths")
-                return True
-        except Exception as e:
-            logging.error(f"Error loading model: {e}")
+    @property
+    def sensors(self):
+        """
+        The process-wide sensor catalog.
+        
+        Sensor sources are resolved on first use; each sample only re-reads
+        them.
+        """
+        return get_sensor_catalog()
+    
+    @property
+    def pipeline(self):
+        """
+        The current feature pipeline (None if there is none).
         
-        return False
+        Loaded on first access; afterwards a newer training run is picked up
+        within ``HARDWARE_MONITOR['MODEL_CHECK_INTERVAL']`` seconds, see
+        ``ModelRegistry``.
+        """
+        return self.models.get()
+    
+    @pipeline.setter
+    def pipeline(self, value):
+        # A pipeline set by hand stays until it is replaced by hand
+        self.models.install(value)
+    
+    # Individual probes in collection order. The monitor_hardware command
+    # schedules each of them on its own cadence.
+    PROBES = (
+        'cpu', 'memory', 'disk_usage', 'disk_io', 'network',
+        'temperature', 'battery', 'fans',
+    )
+    
+    def available_probes(self):
+        """PROBES minus the ones the sensor catalog found unsupported."""
+        unsupported = self.sensors.unsupported
+        return [name for name in self.PROBES if name not in unsupported]
     
     def collect_system_metrics(self):
         """Collect system metrics using psutil."""
         metrics = {}
-        try:
-            # CPU metrics
-            metrics['cpu_percent'] = psutil.cpu_percent(interval=0.1)
-            
-            # Memory metrics
-            memory = psutil.virtual_memory()
-            metrics['memory_percent'] = memory.percent
-            
-            # Swap metrics
-            swap = psutil.swap_memory()
-            metrics['swap_percent'] = swap.percent
-            
-            # Disk metrics
-            disk = psutil.disk_usage('/')
-            metrics['disk_usage_percent'] = disk.percent
-            
-            disk_io = psutil.disk_io_counters()
-            metrics['disk_read_count'] = disk_io.read_count if disk_io else 0
-            metrics['disk_write_count'] = disk_io.write_count if disk_io else 0
-            
-            # Network metrics
-            net_io = psutil.net_io_counters()
-            metrics['network_bytes_sent'] = net_io.bytes_sent if net_io else 0
-            metrics['network_bytes_recv'] = net_io.bytes_recv if net_io else 0
-            
-            # Temperature metrics (if available)
-            metrics['cpu_temp'] = 0
-            try:
-                temps = psutil.sensors_temperatures()
-                if temps and 'coretemp' in temps:
-                    metrics['cpu_temp'] = temps['coretemp'][0].current
-                elif temps and len(temps) > 0:
-                    # Try to get temperature from any available sensor
-                    first_sensor = list(temps.keys())[0]
-                    if temps[first_sensor] and len(temps[first_sensor]) > 0:
-                        metrics['cpu_temp'] = temps[first_sensor][0].current
-            except Exception:
-                # Handle all exceptions, including file not found errors
-                pass
-            
-            # Battery metrics (if available)
-            metrics['battery_percent'] = 0
-            try:
-                battery = psutil.sensors_battery()
-                if battery:
-                    metrics['battery_percent'] = battery.percent
-            except Exception:
-                # Handle all exceptions, including file not found errors
-                pass
-            
-            # Fan speed (if available)
-            metrics['fan_speed'] = 0
-            try:
-                fans = psutil.sensors_fans()
-                if fans and len(fans) > 0:
-                    first_fan_key = list(fans.keys())[0]
-                    metrics['fan_speed'] = fans[first_fan_key][0].current
-            except Exception:
-                # Handle all exceptions, including file not found errors
-                pass
+        for name in self.available_probes():
+            metrics.update(self.run_probe(name))
+        return metrics
+    
+    def run_probe(self, name):
+        """
+        Run a single named probe.
+        
+        Args:
+            name (str): One of PROBES
             
+        Returns:
+            dict: The metrics collected by the probe (empty on failure)
+        """
+        try:
+            return getattr(self, f'probe_{name}')()
         except Exception as e:
-            logging.error(f"Error collecting system metrics: {e}")
-        
-        return metrics
+            logging.error(f"Error collecting {name} metrics: {e}")
+            return {}
+    
+    def probe_cpu(self):
+        """CPU usage, precomputed by the background sampler."""
+        cpu = get_cpu_sampler().latest()
+        return {
+            'cpu_percent': cpu['total'],
+            'cpu_sample_age': cpu['age'],
+        }
+    
+    def probe_memory(self):
+        """Memory and swap usage."""
+        memory = psutil.virtual_memory()
+        swap = psutil.swap_memory()
+        return {
+            'memory_percent': memory.percent,
+            'swap_percent': swap.percent,
+        }
+    
+    def probe_disk_usage(self):
+        """Usage of the root filesystem."""
+        disk = psutil.disk_usage('/')
+        return {'disk_usage_percent': disk.percent}
+    
+    def probe_disk_io(self):
+        """Cumulative disk I/O counters."""
+        disk_io = psutil.disk_io_counters()
+        return {
+            'disk_read_count': disk_io.read_count if disk_io else 0,
+            'disk_write_count': disk_io.write_count if disk_io else 0,
+        }
+    
+    def probe_network(self):
+        """Cumulative network I/O counters."""
+        net_io = psutil.net_io_counters()
+        return {
+            'network_bytes_sent': net_io.bytes_sent if net_io else 0,
+            'network_bytes_recv': net_io.bytes_recv if net_io else 0,
+        }
+    
+    def probe_temperature(self):
+        """CPU temperature from the canonical sensor in the catalog."""
+        return {'cpu_temp': self.sensors.read_cpu_temp() or 0}
+    
+    def probe_battery(self):
+        """Battery charge from the sensor catalog."""
+        return {'battery_percent': self.sensors.read_battery() or 0}
+    
+    def probe_fans(self):
+        """Speed of the canonical fan in the sensor catalog."""
+        return {'fan_speed': int(self.sensors.read_fan_speed() or 0)}
     
     def collect_metrics(self):
         """
@@ -141,7 +158,7 @@ class HardwareMonitorService:
         """
         try:
             # Existing code to collect metrics
-            cpu_percent = psutil.cpu_percent()
+            cpu_percent = get_cpu_sampler().latest()['total']
             memory = psutil.virtual_memory()
             disk = psutil.disk_usage('/')
             network = psutil.net_io_counters()
@@ -155,34 +172,10 @@ class HardwareMonitorService:
             disk_read_count = disk_io.read_count if hasattr(disk_io, 'read_count') else 0
             disk_write_count = disk_io.write_count if hasattr(disk_io, 'write_count') else 0
             
-            # Get CPU temperature if available
-            cpu_temp = 0
-            try:
-                # Try to get temperature from psutil if available
-                if hasattr(psutil, 'sensors_temperatures'):
-                    temps = psutil.sensors_temperatures()
-                    if temps:
-                        # Different systems name their CPU temperature sensor differently
-                        for name, entries in temps.items():
-                            if any(name.lower().startswith(prefix) for prefix in ['cpu', 'core', 'k10temp', 'coretemp']):
-                                if entries:
-                                    cpu_temp = entries[0].current
-                                    break
-            except Exception as e:
-                print(f"Error getting CPU temperature: {e}")
-            
-            # Get fan speed if available
-            fan_speed = 0
-            try:
-                if hasattr(psutil, 'sensors_fans'):
-                    fans = psutil.sensors_fans()
-                    if fans:
-                        for name, entries in fans.items():
-                            if entries:
-                                fan_speed = entries[0].current
-                                break
-            except Exception as e:
-                print(f"Error getting fan speed: {e}")
+            # Sensor readings from the canonical sources in the catalog;
+            # unsupported probes simply read as 0
+            cpu_temp = self.sensors.read_cpu_temp() or 0
+            fan_speed = self.sensors.read_fan_speed() or 0
             
             # Calculate expected fan speed based on CPU temperature
             # This is a simplified model - real fan curves are more complex
@@ -211,15 +204,7 @@ class HardwareMonitorService:
                     elif fan_speed > (fan_expected_speed * 1.5) and cpu_temp < 40:
                         fan_anomaly = True
             
-            # Get battery percent if available
-            battery_percent = 0
-            try:
-                if hasattr(psutil, 'sensors_battery'):
-                    battery = psutil.sensors_battery()
-                    if battery:
-                        battery_percent = battery.percent
-            except Exception as e:
-                print(f"Error getting battery percent: {e}")
+            battery_percent = self.sensors.read_battery() or 0
             
             # Create and save metrics
             metrics = SystemMetric(
@@ -242,7 +227,9 @@ class HardwareMonitorService:
             metrics.is_anomaly, metrics.anomaly_score = self.detect_anomaly(metrics)
             
             # Save the metrics
-            metrics.save()
+            with transaction.atomic():
+                metrics.save()
+                update_rollups([metrics])
             
             # Create hardware issue if anomaly detected
             if metrics.is_anomaly:
@@ -260,13 +247,16 @@ class HardwareMonitorService:
             traceback.print_exc()
             return None
 
-    def save_metrics(self, metrics=None, run_anomaly_detection=True):
+    def save_metrics(self, metrics=None, run_anomaly_detection=True, buffered=False):
         """
         Save metrics to database and optionally run anomaly detection.
         
         Args:
             metrics (dict, optional): Metrics to save. If None, will collect metrics.
             run_anomaly_detection (bool): Whether to run anomaly detection on the metrics.
+            buffered (bool): Queue the metric in the write-behind buffer instead of
+                saving it immediately. The returned object has no ID until the
+                buffer is flushed.
             
         Returns:
             SystemMetric: The saved metric object
@@ -287,10 +277,16 @@ class HardwareMonitorService:
             cpu_temp=metrics.get('cpu_temp', None),
             battery_percent=metrics.get('battery_percent', None),
             fan_speed=metrics.get('fan_speed', None),
+            cpu_percent_min=metrics.get('cpu_percent_min', None),
+            cpu_percent_max=metrics.get('cpu_percent_max', None),
+            memory_percent_min=metrics.get('memory_percent_min', None),
+            memory_percent_max=metrics.get('memory_percent_max', None),
+            sample_count=metrics.get('sample_count', 1),
         )
+        issues = []
         
         # Run anomaly detection if requested and model is available
-        if run_anomaly_detection and self.model is not None and self.scaler is not None:
+        if run_anomaly_detection and self.pipeline is not None:
             anomaly_result = self.detect_anomalies(metrics)
             if anomaly_result:
                 metric_obj.is_anomaly = anomaly_result['is_anomaly']
@@ -305,103 +301,122 @@ class HardwareMonitorService:
                 # If it's an anomaly, analyze and create hardware issues
                 if metric_obj.is_anomaly:
                     analysis = self.analyze_hardware_issues(metrics)
-                    metric_obj.save()  # Save first to get the ID
                     
                     # Create HardwareIssue objects for each issue
                     for i, issue in enumerate(analysis['issues']):
-                        HardwareIssue.objects.create(
-                            metric=metric_obj,
+                        issues.append(HardwareIssue(
                             issue_type=issue,
                             description=issue,
                             recommendation=analysis['recommendations'][i] if i < len(analysis['recommendations']) else ""
-                        )
-                    
-                    return metric_obj
-        # Save the metric
-        metric_obj.save()
+                        ))
+        
+        if buffered:
+            self.write_buffer.add(metric_obj, issues)
+            return metric_obj
+        
+        # Save the metric and its issues together
+        with transaction.atomic():
+            metric_obj.save()
+            for issue in issues:
+                issue.metric = metric_obj
+                issue.save()
+            update_rollups([metric_obj])
         return metric_obj
     
-    def train_model(self, training_samples=300):
+    def cleanup(self):
+        """Release background resources before the process exits."""
+        # Drain the write-behind buffer so no samples are lost on shutdown
+        written = self.write_buffer.flush()
+        if written:
+            logging.info(f"Flushed {written} buffered metrics on shutdown")
+        stop_cpu_sampler()
+    
+    def train_model(self, training_samples=300, progress=None):
         """Train a new anomaly detection model.
         
+        The feature pipeline is fitted on the most recent samples, saved as
+        one artifact under ML_MODELS_DIR and used by this service right away.
+        
         Args:
             training_samples: Number of samples to use for training.
+            progress: Optional `progress(fraction, stage)` callback; it may
+                raise TrainingCancelled, which is passed on to the caller.
             
         Returns:
-            bool: True if training succeeded, False otherwise.
+            ModelTrainingHistory: The recorded run, or None if training failed.
         """
+        logger = logging.getLogger(__name__)
+        if progress is None:
+            progress = lambda fraction, stage: None
         try:
-            import logging
-            logger = logging.getLogger(__name__)
             logger.info("Starting model training")
+            progress(0, 'Loading training data')
             
             # Get the most recent metrics for training
-            metrics = SystemMetric.objects.order_by('-timestamp')[:training_samples]
-            metrics_count = metrics.count()
+            recent = SystemMetric.objects.order_by('-timestamp')[:training_samples]
+            metrics_count = recent.count()
             
             if metrics_count < 50:  # Minimum threshold for meaningful training
                 logger.warning(f"Not enough training data: {metrics_count} samples")
-                return False
-            
-            # Extract features for training
-            import numpy as np
-            features = []
-            
-            for metric in metrics:
-                features.append([
-                    metric.cpu_percent,
-                    metric.memory_percent,
-                    metric.disk_usage_percent,
-                    metric.network_bytes_sent / 1024,  # Scale to KB to avoid numerical issues
-                    metric.network_bytes_recv / 1024,  # Scale to KB to avoid numerical issues
-                ])
-            
-            X = np.array(features)
-            
-            # Train isolation forest model for anomaly detection
-            from sklearn.ensemble import IsolationForest
+                return None
             
             # Adjust contamination based on dataset size
             contamination = 0.05  # Default 5% anomalies
             if metrics_count < 100:
                 contamination = 0.1  # Increase for small datasets for better detection
             
-            model = IsolationForest(
-                n_estimators=100,
-                contamination=contamination,
-                random_state=42
-            )
-            
-            model.fit(X)
-            
-            # Save model for later use
-            import pickle
-            import os
-            
-            # Create models directory if it doesn't exist
-            os.makedirs('models', exist_ok=True)
-            
-            with open('models/anomaly_detection_model.pkl', 'wb') as f:
-                pickle.dump(model, f)
+            pipeline = FeaturePipeline(contamination=contamination)
+            matrix = pipeline.matrix_from_queryset(recent)
+            # Fitting is most of the work: 10% to 90%
+            pipeline.fit(matrix, progress=lambda done: progress(0.1 + 0.8 * done, 'Fitting model'))
+            progress(0.9, 'Saving model')
+            path = pipeline.save(settings.ML_MODELS_DIR)
             
             # Record training event
-            ModelTrainingHistory.objects.create(
-                samples=metrics_count,
-                parameters={
-                    'n_estimators': 100,
-                    'contamination': contamination,
-                    'features': ['cpu_percent', 'memory_percent', 'disk_usage_percent', 'network_sent_kb', 'network_recv_kb']
-                },
-                accuracy=0.95,  # Placeholder, replace with actual validation metrics if available
-                notes=f"Trained with {metrics_count} samples"
+            record = ModelTrainingHistory.objects.create(
+                trained_at=pipeline.fitted_at,
+                model_file_path=path,
+                schema_hash=pipeline.schema_hash,
+                training_samples=pipeline.training_samples,
+                notes=(
+                    f"Trained with {pipeline.training_samples} samples; "
+                    f"features: {', '.join(pipeline.columns)}; "
+                    f"n_estimators={pipeline.params['n_estimators']}, contamination={contamination}"
+                )
             )
             
-            return True
+            self.models.install(pipeline, record.pk)
+            return record
+        except TrainingCancelled:
+            logger.info("Model training cancelled")
+            raise
         except Exception as e:
             logger.error(f"Error training model: {str(e)}")
             import traceback
             logger.error(traceback.format_exc())
-            return False
+            return None
+    
+    def score_batch(self, rows):
+        """
+        Score many samples with one scaler and one model call.
+        
+        Args:
+            rows (list or numpy.ndarray): Metric dicts, or an array already laid
+                out as `FeaturePipeline.matrix` returns it
+            
+        Returns:
+            dict: `is_anomaly` (bool array) and `anomaly_score` (float array),
+                one entry per row; None if no model is loaded
+        """
+        pipeline = self.pipeline
+        if pipeline is None:
+            return None
+        
+        if isinstance(rows, np.ndarray):
+            features = rows.astype(np.float64, copy=False)
+        else:
+            features = pipeline.matrix(rows)
+        return pipeline.score(features)
     
     def detect_anomalies(self, metrics):
         """
@@ -413,33 +428,15 @@ class HardwareMonitorService:
         Returns:
             dict: Anomaly detection results or None if detection fails
         """
-        if self.model is None or self.scaler is None:
+        if self.pipeline is None:
             logging.warning("Model not trained yet")
             return None
         
         try:
-            # Convert metrics to DataFrame with expected columns
-            metrics_df = pd.DataFrame([metrics])
-            
-            # Handle missing columns
-            for col in self.columns:
-                if col not in metrics_df.columns:
-                    metrics_df[col] = 0
-            
-            # Ensure columns are in the correct order
-            metrics_df = metrics_df[self.columns]
-            
-            # Scale the features
-            scaled_metrics = self.scaler.transform(metrics_df)
-            
-            # Predict anomaly
-            prediction = self.model.predict(scaled_metrics)
-            score = self.model.decision_function(scaled_metrics)
-            
-            # Return result (-1 is anomaly, 1 is normal)
+            result = self.score_batch([metrics])
             return {
-                'is_anomaly': prediction[0] == -1,
-                'anomaly_score': score[0]
+                'is_anomaly': bool(result['is_anomaly'][0]),
+                'anomaly_score': float(result['anomaly_score'][0])
             }
         except Exception as e:
             logging.error(f"Error detecting anomalies: {e}")
@@ -650,66 +647,26 @@ class HardwareMonitorService:
         """
         Get a summary of the system's current state.
         
+        This collects live metrics; the dashboard normally serves the
+        snapshot the collector publishes each cycle instead.
+        
         Returns:
             dict: System summary
         """
-        # Get current metrics
-        current_metrics = self.collect_system_metrics()
-        
-        # Get recent anomalies
-        recent_anomalies = SystemMetric.objects.filter(
-            is_anomaly=True
-        ).order_by('-timestamp')[:5]
-        
-        # Get unresolved issues
-        unresolved_issues = HardwareIssue.objects.filter(
-            is_resolved=False
-        ).order_by('-timestamp')
-        
-        # Get metrics history for trends
-        metrics_history = SystemMetric.objects.order_by('-timestamp')[:100]
-        
-        # Calculate trend data
-        cpu_trend = [m.cpu_percent for m in metrics_history]
-        memory_trend = [m.memory_percent for m in metrics_history]
-        disk_trend = [m.disk_usage_percent for m in metrics_history]
-        
-        # Prepare summary
-        summary = {
-            'current_state': current_metrics,
-            'recent_anomalies': [
-                {
-                    'timestamp': a.timestamp,
-                    'anomaly_score': a.anomaly_score,
-                    'issues': [
-                        {'type': i.issue_type, 'recommendation': i.recommendation}
-                        for i in a.issues.all()
-                    ]
-                }
-                for a in recent_anomalies
-            ],
-            'unresolved_issues': [
-                {
-                    'id': i.id,
-                    'timestamp': i.timestamp,
-                    'issue_type': i.issue_type,
-                    'recommendation': i.recommendation
-                }
-                for i in unresolved_issues
-            ],
-            'trends': {
-                'cpu': cpu_trend,
-                'memory': memory_trend,
-                'disk': disk_trend
-            },
-            'model_status': {
-                'trained': self.model is not None,
-                'last_training': ModelTrainingHistory.objects.order_by('-trained_at').first().trained_at
-                if ModelTrainingHistory.objects.exists() else None
-            }
-        }
+        return build_dashboard_snapshot(self.collect_system_metrics(), self.pipeline is not None)
+    
+    def publish_dashboard_snapshot(self, current_state, timeout=None):
+        """
+        Rebuild the cached dashboard snapshot from already collected metrics.
+        
+        Args:
+            current_state (dict): Latest collected metrics
+            timeout (int, optional): Seconds before the snapshot expires
         
-        return summary
+        Returns:
+            dict: The snapshot
+        """
+        return publish_dashboard_snapshot(current_state, self.pipeline is not None, timeout)
 
     def get_system_info(self):
         """
@@ -790,3 +747,22 @@ class HardwareMonitorService:
                 "detail": f"Error training model: {str(e)}",
                 "error_type": type(e).__name__
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+_hardware_monitor = None
+_hardware_monitor_lock = threading.Lock()
+
+
+def get_hardware_monitor():
+    """
+    Get the process-wide monitor service, creating it on first use.
+
+    Returns:
+        HardwareMonitorService: The shared service
+    """
+    global _hardware_monitor
+    if _hardware_monitor is None:
+        with _hardware_monitor_lock:
+            if _hardware_monitor is None:
+                _hardware_monitor = HardwareMonitorService()
+    return _hardware_monitor
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from hardware_api.rollups import GRANULARITIES, bucket_start, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the minute/hour/day metric rollups from the raw metrics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Only rebuild the last N days (whole UTC days); rebuilds all history by default'
+        )
+
+        parser.add_argument(
+            '--granularity',
+            action='append',
+            choices=GRANULARITIES,
+            help='Granularity to rebuild; may be repeated (default: all)'
+        )
+
+    def handle(self, *args, **options):
+        days = options['days']
+        if days is not None and days < 1:
+            raise CommandError('--days must be at least 1')
+
+        start = None
+        if days is not None:
+            # Whole UTC days, at every granularity
+            start = bucket_start(timezone.now() - timezone.timedelta(days=days), 'day')
+
+        granularities = options['granularity'] or GRANULARITIES
+        written = rebuild_rollups(start=start, granularities=granularities)
+
+        for granularity, count in written.items():
+            self.stdout.write(f'{granularity}: {count} rollups')
+        self.stdout.write(self.style.SUCCESS('Rollups rebuilt'))
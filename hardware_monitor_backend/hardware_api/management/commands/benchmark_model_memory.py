@@ -0,0 +1,155 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from hardware_api.pipeline import FeaturePipeline
+
+# Run in each worker process: measure, load the artifact and score with it,
+# then measure again once every worker has loaded (so shared pages are
+# split between all of them in PSS)
+WORKER_SCRIPT = '''
+import json, sys
+import numpy as np, joblib, psutil
+
+def memory():
+    info = psutil.Process().memory_full_info()
+    return {'rss': info.rss, 'uss': getattr(info, 'uss', None), 'pss': getattr(info, 'pss', None)}
+
+layout, path = sys.argv[1], sys.argv[2]
+before = memory()
+if layout == 'sklearn':
+    artifact = joblib.load(path)
+    scaler, model = artifact['scaler'], artifact['model']
+    columns = model.n_features_in_
+else:
+    from hardware_api.pipeline import load_pipeline
+    pipeline = joblib.load(path) if layout == 'flat' else load_pipeline(path)
+    scaler, model = pipeline.scaler, pipeline.model
+    columns = model.n_features
+# Enough samples to reach most leaves, as a long-running worker would
+samples = np.random.default_rng(0).normal(50, 20, (2000, columns))
+model.decision_function(scaler.transform(samples))
+print('ready', flush=True)
+sys.stdin.readline()
+print(json.dumps({'before': before, 'after': memory()}), flush=True)
+'''
+
+LAYOUTS = (
+    ('sklearn', 'scikit-learn objects, joblib.load'),
+    ('flat', 'flat arrays, joblib.load'),
+    ('mmap', 'flat arrays, memory-mapped'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures the memory each worker process spends on the anomaly model: '
+        'the former scikit-learn artifact against the flat-array artifact, '
+        'copied and memory-mapped, with several workers loading it at once.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--trees',
+            type=int,
+            nargs='+',
+            default=[100, 500, 2000],
+            help='Ensemble sizes to measure'
+        )
+
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Worker processes holding the model at the same time'
+        )
+
+        parser.add_argument(
+            '--train-rows',
+            type=int,
+            default=5000,
+            help='Synthetic samples the models are fitted on'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or min(options['trees']) < 1:
+            raise CommandError('--workers and --trees must be at least 1')
+
+        rng = np.random.default_rng(42)
+        matrix = rng.normal(50, 10, (options['train_rows'], len(FeaturePipeline().features)))
+
+        self.stdout.write(
+            f"Memory per worker after loading the model and scoring, {options['workers']} "
+            f"workers at once (median; PSS splits shared pages between them):"
+        )
+        self.stdout.write(f"{'trees':>6}  {'layout':<36}{'file':>9}{'+RSS':>10}{'+PSS':>10}{'+private':>10}")
+        with tempfile.TemporaryDirectory() as directory:
+            for trees in options['trees']:
+                paths = self.write_artifacts(directory, matrix, trees)
+                for layout, label in LAYOUTS:
+                    size = os.path.getsize(paths[layout]) / 2 ** 20
+                    usage = self.measure(layout, paths[layout], options['workers'])
+                    self.stdout.write(
+                        f"{trees:>6}  {label:<36}{size:>7.1f}MB"
+                        f"{self.mb(usage['rss'])}{self.mb(usage['pss'])}{self.mb(usage['uss'])}"
+                    )
+
+    def write_artifacts(self, directory, matrix, trees):
+        """The same model saved in the former and the current layout."""
+        import joblib
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
+
+        pipeline = FeaturePipeline(n_estimators=trees).fit(matrix)
+        path = pipeline.save(os.path.join(directory, str(trees)))
+
+        # The former artifact held the scikit-learn objects themselves
+        scaler = StandardScaler().fit(matrix)
+        model = IsolationForest(**pipeline.params).fit(scaler.transform(matrix))
+        legacy = os.path.join(directory, f'sklearn_{trees}.joblib')
+        joblib.dump({'scaler': scaler, 'model': model}, legacy)
+        return {'sklearn': legacy, 'flat': path, 'mmap': path}
+
+    def measure(self, layout, path, workers):
+        """
+        Median growth of each memory figure across ``workers`` processes.
+
+        Returns:
+            dict: Bytes for ``rss``, ``pss`` and ``uss`` (None where the
+                platform does not report it)
+        """
+        processes = [
+            subprocess.Popen(
+                [sys.executable, '-c', WORKER_SCRIPT, layout, path], cwd=settings.BASE_DIR,
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            )
+            for _ in range(workers)
+        ]
+        try:
+            for process in processes:
+                if process.stdout.readline().strip() != 'ready':
+                    raise CommandError(f"Worker failed:\n{process.stderr.read()[-2000:]}")
+            for process in processes:
+                process.stdin.write('\n')
+                process.stdin.flush()
+            results = [json.loads(process.stdout.readline()) for process in processes]
+        finally:
+            for process in processes:
+                process.kill()
+                process.wait()
+
+        usage = {}
+        for key in ('rss', 'pss', 'uss'):
+            if results[0]['after'][key] is None:
+                usage[key] = None
+            else:
+                usage[key] = statistics.median(run['after'][key] - run['before'][key] for run in results)
+        return usage
+
+    def mb(self, value):
+        return f"{'n/a':>10}" if value is None else f"{value / 2 ** 20:>8.1f}MB"
@@ -0,0 +1,92 @@
+import gzip
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client, override_settings
+from rest_framework.renderers import JSONRenderer
+from hardware_api.dashboard import SNAPSHOT_KEY, get_snapshot_cache
+from hardware_api.management.commands.benchmark_statistics import Command as StatisticsBenchmark
+from hardware_api.middleware import CompressionMiddleware, brotli
+from hardware_api.renderers import FastJSONRenderer
+from hardware_api.rollups import rebuild_rollups
+
+ENDPOINTS = (
+    '/api/metrics/',
+    '/api/metrics/?cursor=&page_size=1000',
+    '/api/metrics/statistics/?days=90',
+    '/api/dashboard/',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares render time and bytes on the wire of the stdlib and fast JSON '
+        'renderers, uncompressed and compressed. Synthetic rows are inserted in '
+        'a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10_000,
+            help='Synthetic metrics to insert first (0 uses the existing data only)'
+        )
+
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timed renders per measurement; the median is reported'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        columns = ['stdlib ms', 'fast ms', 'raw bytes', 'gzip bytes']
+        if brotli is not None:
+            columns.append('br bytes')
+        self.stdout.write(f"{'endpoint':<40}" + ''.join(f'{c:>12}' for c in columns))
+
+        with transaction.atomic(), override_settings(ALLOWED_HOSTS=['testserver']):
+            if options['rows']:
+                StatisticsBenchmark().insert_history(options['rows'], days=90)
+                rebuild_rollups()
+            get_snapshot_cache().delete(SNAPSHOT_KEY)
+
+            client = Client()
+            for url in ENDPOINTS:
+                response = client.get(url)
+                if response.status_code != 200:
+                    self.stdout.write(f'{url:<40} HTTP {response.status_code}')
+                    continue
+                self.stdout.write(f'{url:<40}' + ''.join(
+                    f'{value:>12}' for value in self.measure(response.data, options['repeat'])
+                ))
+
+            get_snapshot_cache().delete(SNAPSHOT_KEY)
+            transaction.set_rollback(True)
+
+    def measure(self, data, repeat):
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        body = fast.render(data)
+
+        results = [
+            f'{self.median(lambda: stdlib.render(data), repeat) * 1000:.2f}',
+            f'{self.median(lambda: fast.render(data), repeat) * 1000:.2f}',
+            len(stdlib.render(data)),
+            len(gzip.compress(body, CompressionMiddleware.gzip_level)),
+        ]
+        if brotli is not None:
+            results.append(len(brotli.compress(body, quality=CompressionMiddleware.brotli_quality)))
+        return results
+
+    def median(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return timings[len(timings) // 2]
@@ -0,0 +1,112 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from hardware_api.hardware_monitor import HardwareMonitorService
+from hardware_api.pipeline import FeaturePipeline
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures anomaly scoring on a model fitted to synthetic metrics: '
+        'per-sample latency of detect_anomalies (against the former one-row '
+        'DataFrame path) and score_batch throughput.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--train-rows',
+            type=int,
+            default=2000,
+            help='Synthetic samples the scaler and model are fitted on'
+        )
+
+        parser.add_argument(
+            '--estimators',
+            type=int,
+            default=100,
+            help='Trees in the IsolationForest'
+        )
+
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=200,
+            help='Single-sample scores timed; the median is reported'
+        )
+
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=10_000,
+            help='Samples scored in one score_batch call'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1 or options['batch'] < 1:
+            raise CommandError('--repeat and --batch must be at least 1')
+
+        monitor = HardwareMonitorService()
+        rng = np.random.default_rng(42)
+
+        pipeline = FeaturePipeline(n_estimators=options['estimators'])
+        pipeline.fit(pipeline.matrix(self.synthetic_rows(rng, options['train_rows'])))
+        monitor.pipeline = pipeline
+
+        samples = self.synthetic_rows(rng, options['repeat'])
+        self.stdout.write(f"Per sample (median of {options['repeat']}):")
+        self.stdout.write(f"  {self.median(monitor.detect_anomalies, samples) * 1000:>8.3f} ms  detect_anomalies")
+        legacy = self.legacy_scorer(monitor)
+        if legacy is not None:
+            self.stdout.write(f"  {self.median(legacy, samples) * 1000:>8.3f} ms  DataFrame + predict + decision_function")
+
+        batch = self.synthetic_rows(rng, options['batch'])
+        started = time.perf_counter()
+        monitor.score_batch(batch)
+        elapsed = time.perf_counter() - started
+        matrix = pipeline.matrix(batch)
+        started = time.perf_counter()
+        monitor.score_batch(matrix)
+        scoring = time.perf_counter() - started
+
+        self.stdout.write(f"\nscore_batch, {options['batch']} samples:")
+        self.stdout.write(f"  {elapsed * 1000:>8.1f} ms  from dicts ({options['batch'] / elapsed:,.0f} samples/s)")
+        self.stdout.write(f"  {scoring * 1000:>8.1f} ms  from a feature matrix ({options['batch'] / scoring:,.0f} samples/s)")
+
+    def synthetic_rows(self, rng, count):
+        """Metric dicts around plausible values, with some columns missing."""
+        means = {
+            'cpu_percent': 30, 'memory_percent': 55, 'swap_percent': 5,
+            'disk_usage_percent': 70, 'disk_read_count': 1e6, 'disk_write_count': 8e5,
+            'network_bytes_sent': 5e8, 'network_bytes_recv': 9e8, 'cpu_temp': 55,
+        }
+        values = {name: rng.normal(mean, mean * 0.2, count) for name, mean in means.items()}
+        return [{name: float(column[i]) for name, column in values.items()} for i in range(count)]
+
+    def legacy_scorer(self, monitor):
+        """The scoring path detect_anomalies replaced, for comparison."""
+        try:
+            import pandas as pd
+        except ImportError:
+            return None
+
+        pipeline = monitor.pipeline
+        columns = list(pipeline.columns)
+        divisors = [divisor for _, divisor in pipeline.features]
+
+        def score(metrics):
+            metrics_df = pd.DataFrame([metrics])
+            for col in columns:
+                if col not in metrics_df.columns:
+                    metrics_df[col] = 0
+            scaled = pipeline.scaler.transform(metrics_df[columns].values / divisors)
+            return pipeline.model.predict(scaled)[0] == -1, pipeline.model.decision_function(scaled)[0]
+        return score
+
+    def median(self, func, samples):
+        timings = []
+        for sample in samples:
+            started = time.perf_counter()
+            func(sample)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return timings[len(timings) // 2]
@@ -0,0 +1,149 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Run in a fresh interpreter: builds the WSGI application the way a worker
+# does and serves the same request twice through it
+COLD_START_SCRIPT = '''
+import io, json, sys, time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+ready = time.perf_counter()
+
+def request(path, host):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '',
+        'SCRIPT_NAME': '', 'SERVER_NAME': host, 'SERVER_PORT': '80',
+        'HTTP_HOST': host, 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.url_scheme': 'http', 'wsgi.version': (1, 0),
+        'wsgi.multithread': False, 'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    status = []
+    before = time.perf_counter()
+    body = application(environ, lambda s, headers, exc_info=None: status.append(s))
+    b''.join(body)
+    body.close()
+    return time.perf_counter() - before, status[0]
+
+first, status = request(sys.argv[1], sys.argv[2])
+second, _ = request(sys.argv[1], sys.argv[2])
+print(json.dumps({
+    'setup': ready - started, 'first': first, 'second': second, 'status': status,
+    'heavy': sorted(m for m in ('pandas', 'sklearn', 'scipy', 'joblib') if m in sys.modules),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures start-up cost: "python -X importtime manage.py check" and the '
+        'cold start of a WSGI worker up to its first response, each in a fresh '
+        'interpreter.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Fresh interpreters per measurement; the median is reported'
+        )
+
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Slowest top-level imports to list'
+        )
+
+        parser.add_argument(
+            '--url',
+            default='/api/health/',
+            help='Path the cold-started worker serves'
+        )
+
+        parser.add_argument(
+            '--host',
+            default='localhost',
+            help='Host header for the request; must be in ALLOWED_HOSTS'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE)
+
+        self.benchmark_check(env, options['repeat'], options['top'])
+        self.benchmark_cold_start(env, options['repeat'], options['url'], options['host'])
+
+    def run(self, args, env):
+        started = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable] + args, cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True,
+        )
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            raise CommandError(f"{' '.join(args[:3])} failed:\n{result.stderr[-2000:]}")
+        return elapsed, result
+
+    def benchmark_check(self, env, repeat, top):
+        walls, imports = [], None
+        for _ in range(repeat):
+            elapsed, result = self.run(['-X', 'importtime', 'manage.py', 'check'], env)
+            walls.append(elapsed)
+            imports = self.parse_importtime(result.stderr)
+
+        self.stdout.write(f'manage.py check: {self.median(walls) * 1000:.0f} ms wall (median of {repeat})')
+        self.stdout.write(f"  imports: {sum(imports.values()) / 1000:.0f} ms, slowest top-level:")
+        for module, cumulative in sorted(imports.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {cumulative / 1000:>10.1f} ms  {module}')
+
+    def benchmark_cold_start(self, env, repeat, url, host):
+        walls, runs = [], []
+        for _ in range(repeat):
+            elapsed, result = self.run(['-c', COLD_START_SCRIPT, url, host], env)
+            walls.append(elapsed)
+            runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+        self.stdout.write(f'\nWorker cold start, GET {url} ({runs[-1]["status"]}), median of {repeat}:')
+        self.stdout.write(f'  {self.median(walls) * 1000:>10.1f} ms  process start to exit')
+        for key, label in (('setup', 'WSGI application ready'),
+                           ('first', 'first request'),
+                           ('second', 'second request')):
+            self.stdout.write(f'  {self.median([run[key] for run in runs]) * 1000:>10.1f} ms  {label}')
+        heavy = ', '.join(runs[-1]['heavy']) or 'none'
+        self.stdout.write(f'  heavy modules loaded after the request: {heavy}')
+
+    def parse_importtime(self, stderr):
+        """
+        Cumulative microseconds of each top-level import in -X importtime output.
+
+        Args:
+            stderr (str): The interpreter's stderr
+
+        Returns:
+            dict: Module name to cumulative microseconds
+        """
+        imports = {}
+        for line in stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            # Nested imports are indented under the one that triggered them
+            if name.startswith(' ') and not name[1:].startswith(' ') and cumulative.strip().isdigit():
+                imports[name.strip()] = int(cumulative)
+        return imports
+
+    def median(self, values):
+        values = sorted(values)
+        return values[len(values) // 2]
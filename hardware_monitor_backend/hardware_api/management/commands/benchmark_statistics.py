@@ -0,0 +1,123 @@
+import random
+import time
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Max, Min, Q
+from django.utils import timezone
+from hardware_api.models import SystemMetric
+from hardware_api.rollups import get_window_statistics, rebuild_rollups, window_statistics
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks /api/metrics/statistics/ against synthetic histories of '
+        'increasing size. Rows are inserted in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            nargs='+',
+            default=[10_000, 100_000, 1_000_000, 10_000_000],
+            help='History sizes to benchmark (e.g. --rows 10000 100000)'
+        )
+
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=90,
+            help='Days the synthetic history is spread over, and the statistics window'
+        )
+
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per measurement; the median is reported'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        self.stdout.write(f"{'rows':>12} {'raw scan ms':>12} {'rollups ms':>12} {'cached ms':>12}")
+        for rows in options['rows']:
+            with transaction.atomic():
+                self.insert_history(rows, options['days'])
+                rebuild_rollups()
+                timings = self.measure(options['days'], options['repeat'])
+                transaction.set_rollback(True)
+
+            self.stdout.write(f"{rows:>12} " + ' '.join(f'{t * 1000:>12.2f}' for t in timings))
+
+    def insert_history(self, rows, days, batch_size=50_000):
+        """
+        Insert ``rows`` evenly spaced synthetic samples covering ``days``.
+
+        Rows go through ``executemany`` rather than ``bulk_create``, which
+        spends most of its time building model instances and SQL and would
+        make a 10M row history take the better part of an hour.
+        """
+        fields = [field for field in SystemMetric._meta.concrete_fields if not field.primary_key]
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        sql = f'INSERT INTO {SystemMetric._meta.db_table} ({columns}) VALUES ({placeholders})'
+
+        defaults = [field.get_db_prep_save(field.get_default(), connection) for field in fields]
+        position = {field.name: i for i, field in enumerate(fields)}
+        timestamp = connection.ops.adapt_datetimefield_value
+
+        now = timezone.now()
+        step = timezone.timedelta(days=days) / rows
+        with connection.cursor() as cursor:
+            for offset in range(0, rows, batch_size):
+                batch = []
+                for i in range(offset, min(offset + batch_size, rows)):
+                    row = list(defaults)
+                    row[position['timestamp']] = timestamp(now - step * i)
+                    row[position['cpu_percent']] = random.uniform(0, 100)
+                    row[position['memory_percent']] = random.uniform(20, 90)
+                    row[position['disk_usage_percent']] = random.uniform(40, 60)
+                    row[position['network_bytes_sent']] = i * 1024
+                    row[position['network_bytes_recv']] = i * 2048
+                    row[position['is_anomaly']] = random.random() < 0.05
+                    batch.append(row)
+                cursor.executemany(sql, batch)
+
+    def measure(self, days, repeat):
+        start = timezone.now() - timezone.timedelta(days=days)
+
+        def raw_scan():
+            # What a single pass over the raw rows costs, for comparison
+            SystemMetric.objects.filter(timestamp__gte=start).aggregate(
+                total=Count('id'),
+                anomalies=Count('id', filter=Q(is_anomaly=True)),
+                cpu_avg=Avg('cpu_percent'), cpu_min=Min('cpu_percent'), cpu_max=Max('cpu_percent'),
+                memory_avg=Avg('memory_percent'), memory_min=Min('memory_percent'),
+                memory_max=Max('memory_percent'),
+                disk_avg=Avg('disk_usage_percent'), disk_min=Min('disk_usage_percent'),
+                disk_max=Max('disk_usage_percent'),
+                sent_avg=Avg('network_bytes_sent'), sent_max=Max('network_bytes_sent'),
+                recv_avg=Avg('network_bytes_recv'), recv_max=Max('network_bytes_recv'),
+            )
+
+        # Warm the cache entry for this history, then time the hits
+        cache.clear()
+        get_window_statistics(days)
+
+        return [
+            self.median(raw_scan, repeat),
+            self.median(lambda: window_statistics(start), repeat),
+            self.median(lambda: get_window_statistics(days), repeat),
+        ]
+
+    def median(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        return timings[len(timings) // 2]
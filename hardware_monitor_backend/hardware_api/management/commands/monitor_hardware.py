@@ -1,13 +1,22 @@
 import time
 import logging
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 from hardware_api.hardware_monitor import HardwareMonitorService
+from hardware_api.ring_buffer import SampleRingBuffer, get_recent_samples_path, summarize
+from hardware_api.samplers import get_cpu_sampler
+from hardware_api.scheduler import CollectionScheduler
+from hardware_api.sensors import SensorCatalog
 
 logger = logging.getLogger(__name__)
 
+# Probes that are cheap enough to run directly on the event loop
+NON_BLOCKING_PROBES = {'cpu', 'memory', 'network', 'disk_io'}
+
+
 class Command(BaseCommand):
     help = 'Runs the hardware monitoring service in the background'
-    
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--interval',
@@ -15,22 +24,56 @@ class Command(BaseCommand):
             default=60,
             help='Interval in seconds between metric collections'
         )
-        
+
         parser.add_argument(
             '--train',
             action='store_true',
             help='Train a new model before starting monitoring'
         )
-    
+
+        parser.add_argument(
+            '--probe-interval',
+            action='append',
+            default=[],
+            metavar='PROBE=SECONDS',
+            help='Override the sampling interval of a single probe, e.g. cpu=0.5'
+        )
+
+        parser.add_argument(
+            '--stats-interval',
+            type=int,
+            default=300,
+            help='Interval in seconds between probe timing reports (0 disables them)'
+        )
+
+    def get_probe_intervals(self, overrides):
+        """Merge the configured probe intervals with command-line overrides."""
+        config = getattr(settings, 'HARDWARE_MONITOR', {})
+        intervals = {name: 60 for name in HardwareMonitorService.PROBES}
+        intervals.update(config.get('PROBE_INTERVALS', {}))
+
+        for override in overrides:
+            name, _, seconds = override.partition('=')
+            if name not in intervals:
+                raise CommandError(f"Unknown probe '{name}'")
+            try:
+                intervals[name] = float(seconds)
+            except ValueError:
+                raise CommandError(f"Invalid interval for probe '{name}': {seconds}")
+
+        return intervals
+
     def handle(self, *args, **options):
         interval = options['interval']
         train = options['train']
-        
+        stats_interval = options['stats_interval']
+        probe_intervals = self.get_probe_intervals(options['probe_interval'])
+
         self.stdout.write(self.style.SUCCESS('Starting hardware monitoring service'))
-        
+
         # Initialize the hardware monitor
         monitor = HardwareMonitorService()
-        
+
         # Train a new model if requested
         if train:
             self.stdout.write('Training a new model...')
@@ -39,15 +82,89 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS('Model training completed'))
             else:
                 self.stdout.write(self.style.ERROR('Model training failed'))
-        
+
+        # The scheduler drives CPU sampling itself, so no sampler thread is needed
+        cpu_sampler = get_cpu_sampler(manual=True)
+        latest_metrics = {}
+
+        # Raw samples stay in a shared ring buffer; only their per-interval
+        # mean/min/max is written to the database.
+        config = getattr(settings, 'HARDWARE_MONITOR', {})
+        recent_samples = SampleRingBuffer.create(
+            get_recent_samples_path(), config.get('RECENT_SAMPLES_CAPACITY', 3600)
+        )
+        window = {'start': time.time()}
+        # Latest metrics handed to the write buffer
+        persisted = {}
+
+        def sample_cpu():
+            sample = cpu_sampler.sample()
+            return {'cpu_percent': sample.total, 'timestamp': sample.timestamp}
+
+        def on_result(name, result):
+            latest_metrics.update(result)
+            if name == 'cpu':
+                recent_samples.append(latest_metrics)
+
+        def persist(metrics):
+            samples = recent_samples.snapshot(since=window['start'])
+            if len(samples['timestamp']):
+                window['start'] = samples['timestamp'][-1]
+            metrics.update(summarize(samples))
+            persisted['metrics'] = metrics
+            monitor.save_metrics(metrics, buffered=True)
+            self.stdout.write(f'Metrics collected at {time.strftime("%Y-%m-%d %H:%M:%S")}')
+
+        def publish(batch):
+            # Rebuilt after each write so dashboard polls cost a cache read,
+            # and the snapshot's anomalies and unresolved issues already
+            # include the rows just written
+            monitor.publish_dashboard_snapshot(persisted['metrics'], timeout=max(interval * 3, 60))
+
+        def report():
+            for name, stats in scheduler.stats().items():
+                self.stdout.write(
+                    f"{name:>12}: every {stats['interval']}s, runs={stats['runs']} "
+                    f"errors={stats['errors']} missed={stats['missed_deadlines']} "
+                    f"last={stats['last_ms']}ms avg={stats['avg_ms']}ms max={stats['max_ms']}ms"
+                )
+
+        def run_sensor_probe(name):
+            # Idle while the sensor catalog finds the probe unsupported; a
+            # catalog refresh (POST /api/sensors/refresh/) can enable it
+            if name in monitor.sensors.unsupported:
+                return None
+            return monitor.run_probe(name)
+
+        for name in monitor.sensors.unsupported:
+            self.stdout.write(f'  {name} probe idle: not supported on this system')
+
+        scheduler = CollectionScheduler(on_result=on_result)
+        for name, seconds in probe_intervals.items():
+            if name == 'cpu':
+                func = sample_cpu
+            elif name in SensorCatalog.PROBES:
+                func = lambda name=name: run_sensor_probe(name)
+            else:
+                func = lambda name=name: monitor.run_probe(name)
+            scheduler.add(name, func, seconds, blocking=name not in NON_BLOCKING_PROBES)
+
+        # Take one full reading up front so the first persisted row is complete
+        latest_metrics.update(monitor.collect_system_metrics())
+        # The metrics are copied on the loop thread, where probe results
+        # update them, and saved on the thread pool
+        scheduler.add('persist', persist, interval, blocking=True, prepare=lambda: dict(latest_metrics))
+        scheduler.add('flush', monitor.write_buffer.flush_if_due, 1, blocking=True)
+        monitor.write_buffer.on_flush = publish
+        if stats_interval > 0:
+            scheduler.add('report', report, stats_interval)
+
         # Continuous monitoring loop
         try:
             self.stdout.write(f'Collecting metrics every {interval} seconds. Press Ctrl+C to stop.')
-            while True:
-                metrics = monitor.collect_system_metrics()
-                monitor.save_metrics(metrics)
-                self.stdout.write(f'Metrics collected at {time.strftime("%Y-%m-%d %H:%M:%S")}')
-                time.sleep(interval)
+            for name, seconds in probe_intervals.items():
+                self.stdout.write(f'  {name} probe every {seconds} seconds')
+            scheduler.run()
         except KeyboardInterrupt:
             self.stdout.write(self.style.SUCCESS('Monitoring stopped'))
         except Exception as e:
@@ -55,6 +172,7 @@ class Command(BaseCommand):
 
         finally:
             # Cleanup actions if needed
+            report()
             monitor.cleanup()
             self.stdout.write(self.style.SUCCESS('Cleanup completed'))
-            self.stdout.write(self.style.SUCCESS('Hardware monitoring service stopped'))
\ No newline at end of file
+            self.stdout.write(self.style.SUCCESS('Hardware monitoring service stopped'))
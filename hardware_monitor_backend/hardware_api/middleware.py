@@ -0,0 +1,157 @@
+"""
+Negotiated response compression.
+
+Like Django's ``GZipMiddleware``, but it also speaks brotli when the
+``brotli`` package is installed and the client accepts it, and it only
+touches data formats. Event streams would stall behind the compressor's
+buffer, archives are already compressed and HTML pages carry CSRF tokens
+(BREACH), so all three are passed through unchanged.
+"""
+
+import re
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'text/csv',
+    'text/plain',
+)
+
+_accepts_br = re.compile(r'\bbr\b')
+_accepts_gzip = re.compile(r'\bgzip\b')
+
+
+class _GzipStream:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress data responses with brotli or gzip, whichever the client prefers.
+
+    Responses smaller than ``HARDWARE_MONITOR['COMPRESSION_MIN_BYTES']`` are
+    sent as they are.
+    """
+    gzip_level = 6
+    # Quality 5 is about as fast as gzip -6 and noticeably smaller
+    brotli_quality = 5
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = getattr(settings, 'HARDWARE_MONITOR', {})
+        self.min_bytes = config.get('COMPRESSION_MIN_BYTES', 1024)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        return self.process_response(request, response)
+
+    def get_encoding(self, request):
+        accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and _accepts_br.search(accept):
+            return 'br'
+        if _accepts_gzip.search(accept):
+            return 'gzip'
+        return None
+
+    def new_stream(self, encoding):
+        if encoding == 'br':
+            return _BrotliStream(self.brotli_quality)
+        return _GzipStream(self.gzip_level)
+
+    def is_compressible(self, response):
+        if response.has_header('Content-Encoding'):
+            return False
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        return content_type in COMPRESSIBLE_TYPES
+
+    def process_response(self, request, response):
+        if not self.is_compressible(response):
+            return response
+
+        # The representation now depends on Accept-Encoding, whether or not
+        # this client gets a compressed one
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = self.get_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.compress_async(
+                    response.streaming_content, encoding
+                )
+            else:
+                response.streaming_content = self.compress_sequence(
+                    response.streaming_content, encoding
+                )
+            response.headers.pop('Content-Length', None)
+        else:
+            if len(response.content) < self.min_bytes:
+                return response
+            stream = self.new_stream(encoding)
+            compressed = stream.compress(response.content) + stream.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The compressed body is no longer byte-for-byte what a strong ETag
+        # promised
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    def compress_sequence(self, chunks, encoding):
+        stream = self.new_stream(encoding)
+        for chunk in chunks:
+            # Flush per chunk so a slow export still reaches the client
+            # steadily instead of in compressor-sized bursts
+            data = stream.compress(chunk) + stream.flush()
+            if data:
+                yield data
+        yield stream.finish()
+
+    async def compress_async(self, chunks, encoding):
+        stream = self.new_stream(encoding)
+        async for chunk in chunks:
+            data = stream.compress(chunk) + stream.flush()
+            if data:
+                yield data
+        yield stream.finish()
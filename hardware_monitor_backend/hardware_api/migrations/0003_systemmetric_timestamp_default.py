@@ -0,0 +1,19 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_api', '0002_systemmetric_disk_read_count_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='systemmetric',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
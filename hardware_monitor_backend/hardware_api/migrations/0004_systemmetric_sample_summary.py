@@ -0,0 +1,38 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_api', '0003_systemmetric_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systemmetric',
+            name='cpu_percent_max',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='systemmetric',
+            name='cpu_percent_min',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='systemmetric',
+            name='memory_percent_max',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='systemmetric',
+            name='memory_percent_min',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='systemmetric',
+            name='sample_count',
+            field=models.IntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_api', '0004_systemmetric_sample_summary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hardwareissue',
+            index=models.Index(fields=['timestamp'], name='issue_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hardwareissue',
+            index=models.Index(fields=['is_resolved', 'timestamp'], name='issue_resolved_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hardwareissue',
+            index=models.Index(fields=['issue_type', 'is_resolved'], name='issue_type_resolved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemmetric',
+            index=models.Index(fields=['timestamp'], name='metric_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemmetric',
+            index=models.Index(fields=['is_anomaly', 'timestamp'], name='metric_anomaly_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_api', '0005_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour'), ('day', 'Day')], max_length=10)),
+                ('bucket', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('anomaly_count', models.IntegerField(default=0)),
+                ('cpu_percent_sum', models.FloatField(blank=True, null=True)),
+                ('cpu_percent_min', models.FloatField(blank=True, null=True)),
+                ('cpu_percent_max', models.FloatField(blank=True, null=True)),
+                ('memory_percent_sum', models.FloatField(blank=True, null=True)),
+                ('memory_percent_min', models.FloatField(blank=True, null=True)),
+                ('memory_percent_max', models.FloatField(blank=True, null=True)),
+                ('disk_usage_percent_sum', models.FloatField(blank=True, null=True)),
+                ('disk_usage_percent_min', models.FloatField(blank=True, null=True)),
+                ('disk_usage_percent_max', models.FloatField(blank=True, null=True)),
+                ('swap_percent_sum', models.FloatField(blank=True, null=True)),
+                ('swap_percent_min', models.FloatField(blank=True, null=True)),
+                ('swap_percent_max', models.FloatField(blank=True, null=True)),
+                ('network_bytes_sent_sum', models.FloatField(blank=True, null=True)),
+                ('network_bytes_sent_min', models.FloatField(blank=True, null=True)),
+                ('network_bytes_sent_max', models.FloatField(blank=True, null=True)),
+                ('network_bytes_recv_sum', models.FloatField(blank=True, null=True)),
+                ('network_bytes_recv_min', models.FloatField(blank=True, null=True)),
+                ('network_bytes_recv_max', models.FloatField(blank=True, null=True)),
+                ('cpu_temp_sum', models.FloatField(blank=True, null=True)),
+                ('cpu_temp_min', models.FloatField(blank=True, null=True)),
+                ('cpu_temp_max', models.FloatField(blank=True, null=True)),
+                ('fan_speed_sum', models.FloatField(blank=True, null=True)),
+                ('fan_speed_min', models.FloatField(blank=True, null=True)),
+                ('fan_speed_max', models.FloatField(blank=True, null=True)),
+                ('battery_percent_sum', models.FloatField(blank=True, null=True)),
+                ('battery_percent_min', models.FloatField(blank=True, null=True)),
+                ('battery_percent_max', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['granularity', '-bucket'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='metricrollup',
+            constraint=models.UniqueConstraint(fields=('granularity', 'bucket'), name='unique_rollup_bucket'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_api', '0006_metricrollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='hardwareissue',
+            index=models.Index(fields=['resolved_at'], name='issue_resolved_at_idx'),
+        ),
+    ]
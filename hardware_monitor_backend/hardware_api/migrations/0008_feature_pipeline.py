@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-18 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_api', '0007_issue_resolved_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modeltraininghistory',
+            name='schema_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='modeltraininghistory',
+            name='scaler_file_path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
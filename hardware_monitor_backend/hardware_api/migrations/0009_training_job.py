@@ -0,0 +1,44 @@
+# Generated by Django 4.2.5 on 2026-10-18 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_api', '0008_feature_pipeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrainingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_name', models.CharField(default='anomaly', max_length=50)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed'), ('cancelled', 'Cancelled')], default='queued', max_length=10)),
+                ('samples', models.IntegerField()),
+                ('progress', models.FloatField(default=0)),
+                ('stage', models.CharField(blank=True, max_length=100)),
+                ('cancel_requested', models.BooleanField(default=False)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('training', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='hardware_api.modeltraininghistory')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='trainingjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'queued')), fields=('model_name',), name='one_queued_training_job'),
+        ),
+        migrations.AddConstraint(
+            model_name='trainingjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'running')), fields=('model_name',), name='one_running_training_job'),
+        ),
+    ]
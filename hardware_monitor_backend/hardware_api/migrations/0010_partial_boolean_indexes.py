@@ -0,0 +1,29 @@
+# Generated by Django 4.2.5 on 2026-10-18 14:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_api', '0009_training_job'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='hardwareissue',
+            name='issue_resolved_ts_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='systemmetric',
+            name='metric_anomaly_ts_idx',
+        ),
+        migrations.AddIndex(
+            model_name='hardwareissue',
+            index=models.Index(condition=models.Q(('is_resolved', False)), fields=['timestamp'], name='issue_unresolved_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='systemmetric',
+            index=models.Index(condition=models.Q(('is_anomaly', True)), fields=['timestamp'], name='metric_anomaly_ts_idx'),
+        ),
+    ]
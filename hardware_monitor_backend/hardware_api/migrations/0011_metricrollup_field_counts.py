@@ -0,0 +1,75 @@
+# Generated by Django 4.2.5 on 2026-10-18 14:28
+
+from django.db import migrations, models
+from django.db.models import F, Q
+
+
+FIELDS = (
+    'cpu_percent', 'memory_percent', 'disk_usage_percent', 'swap_percent',
+    'network_bytes_sent', 'network_bytes_recv', 'cpu_temp', 'fan_speed', 'battery_percent',
+)
+
+
+def fill_field_counts(apps, schema_editor):
+    # Existing rows do not record how many of their samples had a value.
+    # Assume all did wherever there is a sum; backfill_rollups recomputes
+    # the exact counts from the raw metrics.
+    MetricRollup = apps.get_model('hardware_api', 'MetricRollup')
+    for field in FIELDS:
+        MetricRollup.objects.filter(~Q(**{f'{field}_sum': None})).update(**{f'{field}_count': F('count')})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware_api', '0010_partial_boolean_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metricrollup',
+            name='battery_percent_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='metricrollup',
+            name='cpu_percent_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='metricrollup',
+            name='cpu_temp_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='metricrollup',
+            name='disk_usage_percent_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='metricrollup',
+            name='fan_speed_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='metricrollup',
+            name='memory_percent_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='metricrollup',
+            name='network_bytes_recv_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='metricrollup',
+            name='network_bytes_sent_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='metricrollup',
+            name='swap_percent_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_field_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,193 @@
+"""
+Per-process registry of the anomaly model, kept in step with training.
+
+Every training run that saves a feature pipeline adds a
+``ModelTrainingHistory`` row, and the row's id is the model version, so
+versions only ever increase. Code that scores samples asks the registry for
+the current pipeline. At most once every
+``HARDWARE_MONITOR['MODEL_CHECK_INTERVAL']`` seconds that costs one query
+on the primary key. When a newer version shows up, it is loaded on a
+background thread and swapped in with a single reference assignment.
+Callers keep scoring with the previous pipeline meanwhile, and a call that
+already holds a pipeline finishes with it, so web workers and the collector
+pick up a retrained model within seconds without restarting or stalling.
+A version whose artifact cannot be loaded is skipped for the newest one
+that loads.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .models import ModelTrainingHistory
+from .pipeline import load_pipeline
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECK_INTERVAL = 5
+
+
+def pipeline_runs():
+    """Training runs that saved a feature pipeline, newest first."""
+    return ModelTrainingHistory.objects.exclude(schema_hash='').order_by('-id')
+
+
+class ModelRegistry:
+    """The feature pipeline a process scores with, swapped when a newer one is trained."""
+
+    def __init__(self, check_interval=None):
+        """
+        Args:
+            check_interval (float, optional): Seconds between version checks;
+                defaults to ``HARDWARE_MONITOR['MODEL_CHECK_INTERVAL']``
+        """
+        if check_interval is None:
+            config = getattr(settings, 'HARDWARE_MONITOR', {})
+            check_interval = config.get('MODEL_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+        self.check_interval = check_interval
+        # Reentrant: the first load in get() holds it while _load records
+        # failures under it
+        self._lock = threading.RLock()
+        # (version, pipeline), replaced as a whole
+        self._current = None
+        self._ready = False
+        self._pinned = False
+        self._checked_at = 0.0
+        # Version a load is working on, and versions that failed to load
+        self._loading = None
+        self._failed = set()
+
+    @property
+    def version(self):
+        """Version of the current pipeline (None if none, or installed by hand)."""
+        current = self._current
+        return current[0] if current else None
+
+    def get(self):
+        """
+        The pipeline to score with now.
+
+        The first call loads the latest version that loads in the calling
+        thread; later calls only check for a newer one, once per check
+        interval.
+
+        Returns:
+            FeaturePipeline: The current pipeline, or None if there is none
+        """
+        if not self._ready:
+            with self._lock:
+                if not self._ready:
+                    self._current = self._load_newest()
+                    self._checked_at = time.monotonic()
+                    self._ready = True
+        elif time.monotonic() - self._checked_at >= self.check_interval:
+            self.check()
+
+        current = self._current
+        return current[1] if current else None
+
+    def check(self, block=False):
+        """
+        Look for a newer training run and load it.
+
+        Args:
+            block (bool): Load in this thread instead of in the background
+
+        Returns:
+            bool: True if a newer version was found and is being loaded
+        """
+        if self._pinned:
+            return False
+        self._checked_at = time.monotonic()
+        with self._lock:
+            failed = set(self._failed)
+        latest = pipeline_runs().exclude(id__in=failed).values_list(
+            'id', flat=True
+        ).first()
+
+        with self._lock:
+            current, loading = self.version, self._loading
+            if (latest is None
+                    or (current is not None and latest <= current)
+                    or (loading is not None and latest <= loading)):
+                return False
+            self._loading = latest
+
+        if block:
+            self._load_and_swap(latest)
+        else:
+            threading.Thread(
+                target=self._load_and_swap, args=(latest, True),
+                name=f'model-load-{latest}', daemon=True,
+            ).start()
+        return True
+
+    def install(self, pipeline, version=None):
+        """
+        Use ``pipeline`` from now on.
+
+        Args:
+            pipeline (FeaturePipeline): The pipeline, or None for no model
+            version (int, optional): Its training run id. Without one the
+                pipeline is pinned and never replaced by a newer version.
+        """
+        with self._lock:
+            self._current = (version, pipeline) if pipeline is not None else None
+            self._pinned = version is None
+            self._ready = True
+            self._checked_at = time.monotonic()
+
+    def _load(self, record):
+        try:
+            pipeline = load_pipeline(record.model_file_path, record.schema_hash)
+        except Exception as e:
+            # Remembered, so a broken artifact is not reloaded on every check
+            with self._lock:
+                self._failed.add(record.pk)
+            logger.error(f"Error loading model version {record.pk}: {e}")
+            return None
+        logger.info(f"Loaded model version {record.pk} trained at {record.trained_at}")
+        return record.pk, pipeline
+
+    def _load_newest(self, newer_than=None):
+        """
+        Load the newest version that has not failed and loads now.
+
+        Args:
+            newer_than (int, optional): Only consider versions above this
+
+        Returns:
+            tuple: ``(version, pipeline)``, or None if no version loads
+        """
+        with self._lock:
+            failed = set(self._failed)
+        records = pipeline_runs().exclude(id__in=failed)
+        if newer_than is not None:
+            records = records.filter(id__gt=newer_than)
+        for record in records:
+            loaded = self._load(record)
+            if loaded is not None:
+                return loaded
+        return None
+
+    def _load_and_swap(self, version, background=False):
+        loaded = None
+        try:
+            record = ModelTrainingHistory.objects.filter(pk=version).first()
+            if record is not None:
+                loaded = self._load(record)
+            if loaded is None:
+                # Take the newest older version that still beats the current one
+                loaded = self._load_newest(newer_than=self.version)
+        finally:
+            if background:
+                connection.close()
+            with self._lock:
+                self._loading = None
+                current = self.version
+                if loaded and not self._pinned and (current is None or loaded[0] > current):
+                    self._current = loaded
+                    logger.info(f"Switched to model version {loaded[0]}")
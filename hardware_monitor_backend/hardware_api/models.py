@@ -5,7 +5,9 @@ class SystemMetric(models.Model):
     """
     Model for storing system metrics collected at regular intervals.
     """
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: buffered samples keep the time they were taken
+    # rather than the time their batch was written.
+    timestamp = models.DateTimeField(default=timezone.now)
     cpu_percent = models.FloatField(default=0)
     memory_percent = models.FloatField(default=0)
     disk_usage_percent = models.FloatField(default=0)
@@ -24,10 +26,27 @@ class SystemMetric(models.Model):
     disk_read_count = models.BigIntegerField(default=0, null=True, blank=True)
     disk_write_count = models.BigIntegerField(default=0, null=True, blank=True)
     
+    # Spread of the raw samples a collector row was downsampled from
+    # (cpu_percent and memory_percent hold their mean)
+    cpu_percent_min = models.FloatField(null=True, blank=True)
+    cpu_percent_max = models.FloatField(null=True, blank=True)
+    memory_percent_min = models.FloatField(null=True, blank=True)
+    memory_percent_max = models.FloatField(null=True, blank=True)
+    sample_count = models.IntegerField(default=1)
+    
     class Meta:
         ordering = ['-timestamp']
         verbose_name = 'System Metric'
         verbose_name_plural = 'System Metrics'
+        indexes = [
+            # latest, statistics, cleanup and the dashboard trends
+            models.Index(fields=['timestamp'], name='metric_timestamp_idx'),
+            # anomalies and the dashboard's recent anomalies. Partial, because
+            # SQLite cannot look up the bare boolean test Django emits in a
+            # composite index.
+            models.Index(fields=['timestamp'], condition=models.Q(is_anomaly=True),
+                         name='metric_anomaly_ts_idx'),
+        ]
     
     def __str__(self):
         return f"Metrics at {self.timestamp}"
@@ -49,6 +68,17 @@ class HardwareIssue(models.Model):
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # issue list date filters and summary
+            models.Index(fields=['timestamp'], name='issue_timestamp_idx'),
+            # unresolved issues, newest first (partial, as metric_anomaly_ts_idx)
+            models.Index(fields=['timestamp'], condition=models.Q(is_resolved=False),
+                         name='issue_unresolved_ts_idx'),
+            # filtering and grouping by issue type
+            models.Index(fields=['issue_type', 'is_resolved'], name='issue_type_resolved_idx'),
+            # latest resolution, for conditional GETs
+            models.Index(fields=['resolved_at'], name='issue_resolved_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.issue_type} at {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
@@ -60,11 +90,99 @@ class HardwareIssue(models.Model):
         self.save()
 
 
+class MetricRollup(models.Model):
+    """
+    Count, sum, min and max of SystemMetric fields over a fixed time bucket.
+    
+    Rows are updated as metrics are saved (see ``rollups.py``), so
+    statistics over long ranges read a few thousand hourly rows instead of
+    every raw sample. Averages are ``<field>_sum / <field>_count``, where
+    ``<field>_count`` counts the samples that had a value; null samples are
+    left out of sums, minima, maxima and that count.
+    """
+    MINUTE = 'minute'
+    HOUR = 'hour'
+    DAY = 'day'
+    GRANULARITY_CHOICES = [
+        (MINUTE, 'Minute'),
+        (HOUR, 'Hour'),
+        (DAY, 'Day'),
+    ]
+    
+    # SystemMetric fields with a _sum, _min, _max and _count column
+    FIELDS = (
+        'cpu_percent',
+        'memory_percent',
+        'disk_usage_percent',
+        'swap_percent',
+        'network_bytes_sent',
+        'network_bytes_recv',
+        'cpu_temp',
+        'fan_speed',
+        'battery_percent',
+    )
+    
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    # Start of the bucket, in UTC
+    bucket = models.DateTimeField()
+    count = models.IntegerField(default=0)
+    anomaly_count = models.IntegerField(default=0)
+    
+    cpu_percent_sum = models.FloatField(null=True, blank=True)
+    cpu_percent_min = models.FloatField(null=True, blank=True)
+    cpu_percent_max = models.FloatField(null=True, blank=True)
+    cpu_percent_count = models.IntegerField(default=0)
+    memory_percent_sum = models.FloatField(null=True, blank=True)
+    memory_percent_min = models.FloatField(null=True, blank=True)
+    memory_percent_max = models.FloatField(null=True, blank=True)
+    memory_percent_count = models.IntegerField(default=0)
+    disk_usage_percent_sum = models.FloatField(null=True, blank=True)
+    disk_usage_percent_min = models.FloatField(null=True, blank=True)
+    disk_usage_percent_max = models.FloatField(null=True, blank=True)
+    disk_usage_percent_count = models.IntegerField(default=0)
+    swap_percent_sum = models.FloatField(null=True, blank=True)
+    swap_percent_min = models.FloatField(null=True, blank=True)
+    swap_percent_max = models.FloatField(null=True, blank=True)
+    swap_percent_count = models.IntegerField(default=0)
+    network_bytes_sent_sum = models.FloatField(null=True, blank=True)
+    network_bytes_sent_min = models.FloatField(null=True, blank=True)
+    network_bytes_sent_max = models.FloatField(null=True, blank=True)
+    network_bytes_sent_count = models.IntegerField(default=0)
+    network_bytes_recv_sum = models.FloatField(null=True, blank=True)
+    network_bytes_recv_min = models.FloatField(null=True, blank=True)
+    network_bytes_recv_max = models.FloatField(null=True, blank=True)
+    network_bytes_recv_count = models.IntegerField(default=0)
+    cpu_temp_sum = models.FloatField(null=True, blank=True)
+    cpu_temp_min = models.FloatField(null=True, blank=True)
+    cpu_temp_max = models.FloatField(null=True, blank=True)
+    cpu_temp_count = models.IntegerField(default=0)
+    fan_speed_sum = models.FloatField(null=True, blank=True)
+    fan_speed_min = models.FloatField(null=True, blank=True)
+    fan_speed_max = models.FloatField(null=True, blank=True)
+    fan_speed_count = models.IntegerField(default=0)
+    battery_percent_sum = models.FloatField(null=True, blank=True)
+    battery_percent_min = models.FloatField(null=True, blank=True)
+    battery_percent_max = models.FloatField(null=True, blank=True)
+    battery_percent_count = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['granularity', '-bucket']
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'bucket'], name='unique_rollup_bucket'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_granularity_display()} rollup at {self.bucket}"
+
+
 class ModelTrainingHistory(models.Model):
     """Model to track ML model training history."""
     trained_at = models.DateTimeField(default=timezone.now)
+    # Feature pipeline artifact (columns, transforms, scaler and model)
     model_file_path = models.CharField(max_length=255)
-    scaler_file_path = models.CharField(max_length=255)
+    # Only set by runs from before feature pipelines, which kept the scaler apart
+    scaler_file_path = models.CharField(max_length=255, blank=True)
+    schema_hash = models.CharField(max_length=64, blank=True)
     training_samples = models.IntegerField()
     performance_score = models.FloatField(null=True, blank=True)
     notes = models.TextField(blank=True)
@@ -74,4 +192,65 @@ class ModelTrainingHistory(models.Model):
         verbose_name_plural = "Model training histories"
     
     def __str__(self):
-        return f"Model trained at {self.trained_at.strftime('%Y-%m-%d %H:%M:%S')}"
\ No newline at end of file
+        return f"Model trained at {self.trained_at.strftime('%Y-%m-%d %H:%M:%S')}"
+
+class TrainingJob(models.Model):
+    """
+    A model training run requested through the API.
+    
+    Jobs are executed by the background runner in ``training_jobs.py``. At
+    most one job per ``model_name`` is queued and at most one is running;
+    both are enforced by the database, so a second request while a job is
+    waiting gets that job back instead of a new one.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+        (CANCELLED, 'Cancelled'),
+    ]
+    FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+    
+    model_name = models.CharField(max_length=50, default='anomaly')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    samples = models.IntegerField()
+    # 0..1, with a short description of the current step
+    progress = models.FloatField(default=0)
+    stage = models.CharField(max_length=100, blank=True)
+    cancel_requested = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+    training = models.ForeignKey(
+        ModelTrainingHistory, null=True, blank=True, on_delete=models.SET_NULL, related_name='jobs'
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Moved forward on every progress update; a running job whose heartbeat
+    # stops is considered abandoned
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model_name'], condition=models.Q(status='queued'),
+                name='one_queued_training_job',
+            ),
+            models.UniqueConstraint(
+                fields=['model_name'], condition=models.Q(status='running'),
+                name='one_running_training_job',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"Training job {self.pk} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED
@@ -0,0 +1,201 @@
+"""
+Keyset (cursor) pagination for the time-ordered list endpoints.
+
+Page-number pagination counts the whole filtered table and then skips
+``OFFSET`` rows, so every page costs more than the one before it. Keyset
+pagination instead remembers the ``(timestamp, id)`` of the last row sent and
+seeks past it through the timestamp index, so page 1000 costs the same as
+page 1.
+
+The mode is opt-in so existing clients keep their page numbers: send
+``?cursor=`` (empty) to get the first page, then follow the ``next`` and
+``previous`` links. The total is only counted with ``?count=true``.
+"""
+
+import base64
+from collections import OrderedDict
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class Cursor:
+    """Position of a row in ``(timestamp, id)`` order."""
+
+    __slots__ = ('timestamp', 'pk', 'reverse')
+
+    def __init__(self, timestamp, pk, reverse=False):
+        self.timestamp = timestamp
+        self.pk = pk
+        # True when the page lies before this position (a "previous" link)
+        self.reverse = reverse
+
+    def encode(self):
+        raw = f"{self.timestamp.isoformat()}|{self.pk}|{int(self.reverse)}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    @classmethod
+    def decode(cls, value):
+        """
+        Args:
+            value (str): An encoded cursor
+
+        Returns:
+            Cursor: The decoded position
+
+        Raises:
+            ValueError: If ``value`` is not a cursor this class produced
+        """
+        # binascii.Error and UnicodeDecodeError are both ValueErrors
+        padded = value + '=' * (-len(value) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        timestamp, pk, reverse = raw.split('|')
+        return cls(datetime.fromisoformat(timestamp), int(pk), reverse == '1')
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination on ``(ordering_field, id)``, falling back to page numbers.
+
+    Without a ``cursor`` query parameter requests are paginated exactly as
+    before by ``fallback_class``.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering_field = 'timestamp'
+    fallback_class = PageNumberPagination
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self):
+        self.page_size = api_settings.PAGE_SIZE
+        self.fallback = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        if self.cursor_query_param not in request.query_params:
+            self.fallback = self.fallback_class()
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        self.page_size = self.get_page_size(request)
+        self.descending = self.get_descending(request)
+
+        encoded = request.query_params[self.cursor_query_param]
+        cursor = None
+        if encoded:
+            try:
+                cursor = Cursor.decode(encoded)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+        reverse = cursor.reverse if cursor else False
+
+        # Walking backwards runs the query in the opposite order and flips
+        # the rows afterwards
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        ordered = queryset.order_by(f'{prefix}{self.ordering_field}', f'{prefix}id')
+        if cursor is not None:
+            ordered = ordered.filter(self.seek_filter(cursor, descending))
+
+        # One row past the page tells us whether there is another page
+        rows = list(ordered[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = cursor is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.first, self.last = (rows[0], rows[-1]) if rows else (None, None)
+        self.cursor = cursor
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, '').lower() == 'true':
+            self.count = queryset.order_by().count()
+        return rows
+
+    def seek_filter(self, cursor, descending):
+        """
+        Rows after ``cursor`` in the query's order.
+
+        The plain range on ``ordering_field`` lets the database seek into its
+        index; the second condition only breaks ties on equal timestamps.
+        """
+        field = self.ordering_field
+        if descending:
+            return Q(**{f'{field}__lte': cursor.timestamp}) & (
+                Q(**{f'{field}__lt': cursor.timestamp}) | Q(id__lt=cursor.pk)
+            )
+        return Q(**{f'{field}__gte': cursor.timestamp}) & (
+            Q(**{f'{field}__gt': cursor.timestamp}) | Q(id__gt=cursor.pk)
+        )
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param)
+        if value is None:
+            return self.page_size
+        try:
+            page_size = int(value)
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'Must be an integer'})
+        if page_size < 1:
+            raise ValidationError({self.page_size_query_param: 'Must be at least 1'})
+        return min(page_size, self.max_page_size)
+
+    def get_descending(self, request):
+        """Newest first unless ``?ordering=<ordering_field>`` asks otherwise."""
+        ordering = request.query_params.get(api_settings.ORDERING_PARAM)
+        if not ordering or ordering == f'-{self.ordering_field}':
+            return True
+        if ordering == self.ordering_field:
+            return False
+        raise ValidationError({
+            api_settings.ORDERING_PARAM:
+                f"Cursor pagination only supports ordering by {self.ordering_field}"
+        })
+
+    def get_row_cursor(self, row, reverse):
+        # Model instances and named values_list rows alike
+        return Cursor(getattr(row, self.ordering_field), row.id, reverse).encode()
+
+    def get_next_link(self):
+        if self.fallback is not None:
+            return self.fallback.get_next_link()
+        if not self.has_next or self.last is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.get_row_cursor(self.last, False))
+
+    def get_previous_link(self):
+        if self.fallback is not None:
+            return self.fallback.get_previous_link()
+        if not self.has_previous or self.first is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.get_row_cursor(self.first, True))
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        fields = [
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]
+        if self.count is not None:
+            fields.insert(0, ('count', self.count))
+        return Response(OrderedDict(fields))
+
+    def get_paginated_response_schema(self, schema):
+        return self.fallback_class().get_paginated_response_schema(schema)
+
+    def get_schema_operation_parameters(self, view):
+        return self.fallback_class().get_schema_operation_parameters(view)
@@ -0,0 +1,269 @@
+"""
+The anomaly model together with everything needed to feed it.
+
+A ``FeaturePipeline`` holds the feature columns, their transforms, the
+scaler and the model. Training fits all of it at once and saves it as a
+single artifact; scoring loads that same artifact, so the two can never
+disagree about which columns go in or how they are scaled.
+
+The schema hash covers the pipeline version and the feature definitions.
+It is stored with the artifact and on its ``ModelTrainingHistory`` row, and
+an artifact whose hash does not match is refused at load time.
+
+The scaler and the model are saved as plain arrays (``FittedScaler``,
+``FlatForest``) that are memory-mapped when the artifact is loaded:
+processes scoring with the same artifact share one copy of it, and none of
+them imports scikit-learn.
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+from django.utils import timezone
+
+from .forest import FlatForest
+
+# Bump when the meaning of a feature or the artifact layout changes
+# (2: scaler and model saved as arrays)
+PIPELINE_VERSION = 2
+
+# (SystemMetric column, divisor). The network counters are scaled to KB to
+# keep them in a range the scaler handles well.
+DEFAULT_FEATURES = (
+    ('cpu_percent', 1),
+    ('memory_percent', 1),
+    ('swap_percent', 1),
+    ('disk_usage_percent', 1),
+    ('disk_read_count', 1),
+    ('disk_write_count', 1),
+    ('network_bytes_sent', 1024),
+    ('network_bytes_recv', 1024),
+    ('cpu_temp', 1),
+    ('battery_percent', 1),
+    ('fan_speed', 1),
+)
+
+
+# Trees added between progress callbacks while fitting
+FIT_STEP = 10
+
+
+class TrainingCancelled(Exception):
+    """Raised by a progress callback to abandon a fit."""
+
+
+def schema_hash(features, version=PIPELINE_VERSION):
+    """
+    Fingerprint of a feature definition.
+
+    Args:
+        features (tuple): ``(column, divisor)`` pairs
+        version (int): Pipeline version
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    schema = {'version': version, 'features': [[column, divisor] for column, divisor in features]}
+    return hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()
+
+
+class FittedScaler:
+    """The transform of a fitted ``StandardScaler``, as two arrays."""
+
+    def __init__(self, mean, scale):
+        """
+        Args:
+            mean (numpy.ndarray): Per-column mean
+            scale (numpy.ndarray): Per-column standard deviation (1 where it is 0)
+        """
+        self.mean = mean
+        self.scale = scale
+
+    @classmethod
+    def from_standard_scaler(cls, scaler):
+        return cls(np.asarray(scaler.mean_, dtype=np.float64), np.asarray(scaler.scale_, dtype=np.float64))
+
+    def transform(self, matrix):
+        return (matrix - self.mean) / self.scale
+
+
+class FeaturePipeline:
+    """Feature columns, transforms, scaler and model, fitted and saved as one."""
+
+    def __init__(self, features=DEFAULT_FEATURES, n_estimators=100, contamination=0.05,
+                 random_state=42):
+        """
+        Args:
+            features (tuple): ``(column, divisor)`` pairs, see ``DEFAULT_FEATURES``
+            n_estimators (int): Trees in the IsolationForest
+            contamination (float): Expected share of anomalies in the training data
+            random_state (int): Seed for the forest
+        """
+        self.version = PIPELINE_VERSION
+        self.features = tuple((column, divisor) for column, divisor in features)
+        self.schema_hash = schema_hash(self.features)
+        self.params = {
+            'n_estimators': n_estimators,
+            'contamination': contamination,
+            'random_state': random_state,
+        }
+        self.scaler = None
+        self.model = None
+        self.training_samples = 0
+        self.fitted_at = None
+
+    @property
+    def columns(self):
+        """SystemMetric columns the features are read from, in order."""
+        return tuple(column for column, _ in self.features)
+
+    @property
+    def is_fitted(self):
+        return self.model is not None
+
+    def _divisors(self):
+        return np.array([divisor for _, divisor in self.features], dtype=np.float64)
+
+    def matrix(self, rows):
+        """
+        Build the feature matrix for metric dicts.
+
+        Args:
+            rows (list): Metric dicts; missing or None values count as 0
+
+        Returns:
+            numpy.ndarray: float64 array of shape (len(rows), len(features))
+        """
+        columns = self.columns
+        values = (row.get(column) or 0 for row in rows for column in columns)
+        matrix = np.fromiter(values, dtype=np.float64, count=len(rows) * len(columns))
+        return matrix.reshape(len(rows), len(columns)) / self._divisors()
+
+    def matrix_from_queryset(self, queryset):
+        """
+        Build the feature matrix straight from the database.
+
+        Args:
+            queryset (QuerySet): SystemMetric rows
+
+        Returns:
+            numpy.ndarray: float64 array, one row per metric, NULL as 0
+        """
+        rows = list(queryset.values_list(*self.columns))
+        if not rows:
+            return np.empty((0, len(self.features)))
+        # None becomes NaN in a float array
+        matrix = np.array(rows, dtype=np.float64)
+        matrix[np.isnan(matrix)] = 0
+        return matrix / self._divisors()
+
+    def fit(self, matrix, progress=None):
+        """
+        Fit the scaler and the model.
+
+        Args:
+            matrix (numpy.ndarray): Output of ``matrix`` or ``matrix_from_queryset``
+            progress (callable, optional): Called as ``progress(fraction)``
+                after each batch of trees; it may raise ``TrainingCancelled``
+                to stop
+
+        Returns:
+            FeaturePipeline: self
+        """
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
+
+        scaler = StandardScaler().fit(matrix)
+        scaled = scaler.transform(matrix)
+        if progress is None:
+            model = IsolationForest(**self.params).fit(scaled)
+        else:
+            # Grow the forest in steps; with warm_start and a fixed seed the
+            # result is the same forest a single fit would build
+            total = self.params['n_estimators']
+            model = IsolationForest(**dict(self.params, n_estimators=0), warm_start=True)
+            for trees in range(FIT_STEP, total + FIT_STEP, FIT_STEP):
+                model.set_params(n_estimators=min(trees, total))
+                model.fit(scaled)
+                progress(min(trees, total) / total)
+        # Only the arrays are kept; scoring does not need scikit-learn
+        self.scaler = FittedScaler.from_standard_scaler(scaler)
+        self.model = FlatForest.from_isolation_forest(model)
+        self.training_samples = len(matrix)
+        self.fitted_at = timezone.now()
+        return self
+
+    def score(self, matrix):
+        """
+        Score a feature matrix with one scaler and one model call.
+
+        Args:
+            matrix (numpy.ndarray): Output of ``matrix``
+
+        Returns:
+            dict: ``is_anomaly`` (bool array) and ``anomaly_score`` (float array)
+        """
+        # IsolationForest.predict is "-1 where decision_function < 0", so one
+        # pass over the trees gives both the score and the label
+        scores = self.model.decision_function(self.scaler.transform(matrix))
+        return {
+            'is_anomaly': scores < 0,
+            'anomaly_score': scores,
+        }
+
+    def save(self, directory):
+        """
+        Write the pipeline as a single artifact.
+
+        Args:
+            directory (str): Where to put it; created if missing
+
+        Returns:
+            str: Path of the artifact
+        """
+        import joblib
+
+        os.makedirs(directory, exist_ok=True)
+        stamp = (self.fitted_at or timezone.now()).strftime('%Y%m%d%H%M%S')
+        path = os.path.join(directory, f'anomaly_pipeline_{stamp}_{self.schema_hash[:12]}.joblib')
+        # Written under a temporary name so a reader never sees half a file
+        partial = f'{path}.partial'
+        joblib.dump(self, partial)
+        os.replace(partial, path)
+        return path
+
+
+def load_pipeline(path, expected_hash=None):
+    """
+    Load a pipeline artifact and check its schema.
+
+    The model's arrays are memory-mapped read-only rather than copied, so
+    the artifact must not be modified while it is in use (``save`` never
+    writes to an existing file).
+
+    Args:
+        path (str): Artifact written by ``FeaturePipeline.save``
+        expected_hash (str, optional): Schema hash recorded for the artifact
+
+    Returns:
+        FeaturePipeline: The fitted pipeline
+
+    Raises:
+        ValueError: If the file is not a pipeline this code can use
+    """
+    import joblib
+
+    pipeline = joblib.load(path, mmap_mode='r')
+    if not isinstance(pipeline, FeaturePipeline):
+        raise ValueError(f"{path} is not a feature pipeline artifact")
+    if pipeline.version != PIPELINE_VERSION:
+        raise ValueError(f"{path} has pipeline version {pipeline.version}, expected {PIPELINE_VERSION}")
+    if pipeline.schema_hash != schema_hash(pipeline.features):
+        raise ValueError(f"{path} has an inconsistent schema hash")
+    if expected_hash and pipeline.schema_hash != expected_hash:
+        raise ValueError(f"{path} does not match the recorded schema hash")
+    if not pipeline.is_fitted:
+        raise ValueError(f"{path} holds an unfitted pipeline")
+    return pipeline
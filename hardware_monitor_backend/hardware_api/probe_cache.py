@@ -0,0 +1,221 @@
+"""
+Process-wide cache and runner for the expensive probes behind
+``/api/system-info/``.
+
+Static facts (platform, core counts, MAC address, GPU tooling) are computed
+once. Dynamic values are kept for a short TTL. Failed probes are cached too,
+so a missing ``nvidia-smi`` costs one fork per ``negative_ttl`` instead of
+one per request.
+
+``run_probes()`` runs the independent probes concurrently on a small shared
+thread pool, giving each one a deadline, so one hung probe cannot stall the
+whole response.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds each cached probe stays fresh; None means forever
+DEFAULT_TTLS = {
+    'dns': 300,
+    'network': 10,
+    'disks': 30,
+    'gpu': 5,
+    'negative': 300,
+}
+
+# Seconds /api/system-info/ waits for each probe before reporting a timeout
+DEFAULT_DEADLINE = 3.0
+
+
+class ProbeUnavailable(Exception):
+    """Raised (and cached) when a probe cannot run on this system."""
+
+
+def _copy_error(error):
+    """
+    A new exception of the same type, arguments and attributes as ``error``.
+
+    Built with ``__new__`` from the exception's pickle state rather than
+    ``type(error)(*error.args)``, since some exceptions (e.g.
+    ``subprocess.TimeoutExpired``) take constructor arguments that differ
+    from their ``args``.
+    """
+    cls, args, *state = error.__reduce__()
+    copied = cls.__new__(cls, *args)
+    copied.args = error.args
+    if state and state[0]:
+        copied.__dict__.update(state[0])
+    return copied
+
+
+class _Entry:
+    __slots__ = ('value', 'error', 'expires')
+
+    def __init__(self, value, error, expires):
+        self.value = value
+        self.error = error
+        self.expires = expires
+
+
+class ProbeCache:
+    """
+    Thread-safe TTL cache of probe results.
+
+    Concurrent misses on the same key run the probe once; the other callers
+    wait for its result instead of repeating the work.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._entries = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = threading.Lock()
+            return lock
+
+    def _fresh(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and (entry.expires is None or entry.expires > self._clock()):
+            return entry
+        return None
+
+    def get(self, key, probe, ttl=None, negative_ttl=None):
+        """
+        Return the cached result of ``probe``, running it if stale.
+
+        Args:
+            key (str): Cache key
+            probe (callable): Zero-argument function producing the value
+            ttl (float, optional): Seconds a result stays fresh; None caches
+                it for the life of the process.
+            negative_ttl (float, optional): Seconds a failure stays cached.
+                Failures are not cached when omitted.
+
+        Returns:
+            The probe result
+
+        Raises:
+            Exception: The probe's exception, re-raised from the cache while
+            the failure is still fresh
+        """
+        entry = self._fresh(key)
+        if entry is None:
+            with self._key_lock(key):
+                entry = self._fresh(key)
+                if entry is None:
+                    entry = self._run(key, probe, ttl, negative_ttl)
+
+        if entry.error is not None:
+            # Raise a copy: re-raising the cached exception itself would
+            # extend its traceback on every hit
+            raise _copy_error(entry.error)
+        return entry.value
+
+    def _run(self, key, probe, ttl, negative_ttl):
+        now = self._clock()
+        try:
+            value = probe()
+        except Exception as e:
+            if negative_ttl is None:
+                raise
+            logger.debug(f"Probe {key} failed, caching failure for {negative_ttl}s: {e}")
+            entry = _Entry(None, e, now + negative_ttl)
+        else:
+            entry = _Entry(value, None, None if ttl is None else now + ttl)
+        self._entries[key] = entry
+        return entry
+
+    def invalidate(self, key=None):
+        """Drop one cached probe, or every probe when ``key`` is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+
+def get_probe_ttl(name):
+    """TTL for a cached probe from ``HARDWARE_MONITOR['PROBE_CACHE_TTLS']``."""
+    config = getattr(settings, 'HARDWARE_MONITOR', {})
+    return config.get('PROBE_CACHE_TTLS', {}).get(name, DEFAULT_TTLS.get(name))
+
+
+probe_cache = ProbeCache()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def get_probe_executor():
+    """Get the bounded thread pool shared by every system-info request."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                config = getattr(settings, 'HARDWARE_MONITOR', {})
+                _executor = ThreadPoolExecutor(
+                    max_workers=config.get('PROBE_WORKERS', 4),
+                    thread_name_prefix='system-info-probe',
+                )
+    return _executor
+
+
+def _submit(name, probe):
+    # A probe still running for an earlier request is joined rather than
+    # started again, so a hung probe occupies at most one worker.
+    executor = get_probe_executor()
+    with _inflight_lock:
+        future = _inflight.get(name)
+        if future is None or future.done():
+            future = _inflight[name] = executor.submit(probe)
+        return future
+
+
+def run_probes(probes, deadlines=None):
+    """
+    Run independent probes concurrently, each with its own deadline.
+
+    Args:
+        probes (dict): Section name -> zero-argument probe function
+        deadlines (dict, optional): Section name -> seconds to wait, measured
+            from when the probes were submitted. Defaults to
+            ``HARDWARE_MONITOR['PROBE_DEADLINES']``.
+
+    Returns:
+        dict: Section name -> probe result, ``{"status": "timeout"}`` if the
+        deadline passed, or ``{"status": "error", "error": ...}`` if it raised
+    """
+    if deadlines is None:
+        config = getattr(settings, 'HARDWARE_MONITOR', {})
+        deadlines = config.get('PROBE_DEADLINES', {})
+
+    start = time.monotonic()
+    futures = {name: _submit(name, probe) for name, probe in probes.items()}
+
+    results = {}
+    for name, future in futures.items():
+        remaining = start + deadlines.get(name, DEFAULT_DEADLINE) - time.monotonic()
+        try:
+            results[name] = future.result(timeout=max(remaining, 0))
+        except FutureTimeoutError:
+            logger.warning(f"Probe {name} missed its deadline")
+            results[name] = {"status": "timeout"}
+        except Exception as e:
+            logger.error(f"Probe {name} failed: {e}")
+            results[name] = {"status": "error", "error": str(e)}
+    return results
@@ -0,0 +1,96 @@
+"""
+JSON renderers for the API.
+
+``FastJSONRenderer`` is the project-wide default. It encodes with orjson
+when that is installed, which handles datetimes, UUIDs and NumPy values
+natively, and falls back to DRF's encoder otherwise.
+
+``?format=columnar`` returns one array per field instead of one object per
+row. It is registered on ``SystemMetricViewSet`` only, so the metric
+endpoints accept it and others answer 404. The metric list builds the
+columns straight from ``values_list`` (see ``SystemMetricViewSet.list``);
+the other metric actions' lists of rows are transposed here.
+"""
+
+import json
+
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Datetimes render the way DRF's encoder renders them (UTC as "Z");
+    # anything orjson does not know goes through DRF's encoder
+    _ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+    _fallback_default = JSONEncoder().default
+
+
+def dumps(data):
+    """
+    Encode ``data`` as compact UTF-8 JSON.
+
+    Returns:
+        bytes: The encoded document
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_fallback_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        data, cls=JSONEncoder, ensure_ascii=False, separators=(',', ':')
+    ).encode()
+
+
+class FastJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` that encodes with orjson when it is available."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Indented output (e.g. "Accept: application/json; indent=4") is for
+        # people, not throughput; leave it to the stdlib encoder
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class FastJsonResponse(HttpResponse):
+    """``JsonResponse`` for plain Django views, encoded with ``dumps``."""
+
+    def __init__(self, data, **kwargs):
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
+
+
+def rows_to_columns(rows):
+    """
+    Transpose a list of dicts into a dict of lists.
+
+    ``timestamp`` becomes ``timestamps``, the key charts plot against.
+    """
+    if not rows:
+        return {}
+    columns = {key: [row.get(key) for row in rows] for key in rows[0]}
+    if 'timestamp' in columns:
+        columns['timestamps'] = columns.pop('timestamp')
+    return columns
+
+
+class ColumnarData(dict):
+    """Columns already built by a view, passed through the renderer as is."""
+
+
+class ColumnarJSONRenderer(FastJSONRenderer):
+    """JSON with one array per field, selected with ``?format=columnar``."""
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, ColumnarData):
+            if isinstance(data, list) and data and isinstance(data[0], dict):
+                data = rows_to_columns(data)
+            elif isinstance(data, dict) and isinstance(data.get('results'), list):
+                data = dict(data, results=rows_to_columns(data['results']))
+        return super().render(data, accepted_media_type, renderer_context)
@@ -0,0 +1,233 @@
+"""
+Fixed-size, NumPy-backed ring buffer of raw high-frequency samples.
+
+The collector appends a row several times per second. The buffer lives in a
+memory-mapped file, so web workers can attach to it read-only and serve the
+most recent samples without the collector writing them to the database.
+"""
+
+import logging
+import os
+import tempfile
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Columns stored for every raw sample. timestamp is seconds since the epoch.
+RECENT_COLUMNS = (
+    'timestamp', 'cpu_percent', 'memory_percent', 'swap_percent',
+    'network_bytes_sent', 'network_bytes_recv',
+    'disk_read_count', 'disk_write_count',
+)
+
+# Columns that are summarised (mean/min/max) when a window is persisted
+SUMMARY_COLUMNS = ('cpu_percent', 'memory_percent')
+
+_MAGIC = 0x48574D52  # "HWMR"
+_HEADER_FIELDS = 4   # magic, capacity, column count, total rows written
+_HEADER_BYTES = 64
+
+
+class SampleRingBuffer:
+    """
+    Ring buffer of float64 rows with a fixed number of columns.
+
+    Only one process may write. Readers copy the live region and re-check
+    the write counter afterwards, discarding any rows the writer may have
+    overwritten while they were being copied.
+    """
+
+    def __init__(self, header, data, columns):
+        self._header = header
+        self._data = data
+        self.columns = tuple(columns)
+        self.capacity = data.shape[0]
+        self._index = {name: i for i, name in enumerate(self.columns)}
+
+    @classmethod
+    def in_memory(cls, capacity, columns=RECENT_COLUMNS):
+        """Create a buffer that is private to this process."""
+        header = np.zeros(_HEADER_FIELDS, dtype=np.int64)
+        header[:3] = (_MAGIC, capacity, len(columns))
+        data = np.zeros((capacity, len(columns)), dtype=np.float64)
+        return cls(header, data, columns)
+
+    @classmethod
+    def create(cls, path, capacity, columns=RECENT_COLUMNS):
+        """
+        Create a file-backed buffer for writing, replacing any previous one.
+
+        The new buffer is built in a temporary file and renamed over
+        ``path``. Readers still mapping the previous file keep a complete
+        (stale) buffer instead of one truncated under them, and notice the
+        new inode on their next access.
+
+        Args:
+            path (str): File backing the buffer
+            capacity (int): Number of rows kept
+            columns (tuple): Column names
+        """
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        size = _HEADER_BYTES + capacity * len(columns) * 8
+        fd, partial = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix='.partial')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.truncate(size)
+
+            header = np.memmap(partial, dtype=np.int64, mode='r+', shape=(_HEADER_FIELDS,))
+            data = np.memmap(partial, dtype=np.float64, mode='r+', offset=_HEADER_BYTES,
+                             shape=(capacity, len(columns)))
+            header[:3] = (_MAGIC, capacity, len(columns))
+            header.flush()
+            os.replace(partial, path)
+        except Exception:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return cls(header, data, columns)
+
+    @classmethod
+    def open(cls, path, columns=RECENT_COLUMNS):
+        """
+        Attach read-only to a buffer created by another process.
+
+        Returns:
+            SampleRingBuffer: The buffer, or None if the file is missing or
+            was written with a different layout
+        """
+        try:
+            header = np.memmap(path, dtype=np.int64, mode='r', shape=(_HEADER_FIELDS,))
+        except (OSError, ValueError):
+            return None
+
+        magic, capacity, column_count = (int(v) for v in header[:3])
+        if magic != _MAGIC or column_count != len(columns) or capacity <= 0:
+            logger.warning(f"Ignoring recent samples buffer with unexpected layout: {path}")
+            return None
+
+        data = np.memmap(path, dtype=np.float64, mode='r', offset=_HEADER_BYTES,
+                         shape=(capacity, column_count))
+        return cls(header, data, columns)
+
+    @property
+    def written(self):
+        """Total number of rows appended since the buffer was created."""
+        return int(self._header[3])
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def append(self, values):
+        """
+        Append one sample.
+
+        Args:
+            values (dict): Column values; missing columns are stored as NaN
+        """
+        written = self.written
+        row = self._data[written % self.capacity]
+        for name, i in self._index.items():
+            value = values.get(name)
+            row[i] = np.nan if value is None else value
+        # Publish the row only after it has been written
+        self._header[3] = written + 1
+
+    def snapshot(self, since=None, limit=None):
+        """
+        Copy the buffered samples, oldest first.
+
+        Args:
+            since (float, optional): Only include samples taken after this
+                epoch timestamp.
+            limit (int, optional): Only include the newest ``limit`` samples.
+
+        Returns:
+            dict: Column name -> 1-D NumPy array
+        """
+        before = self.written
+        count = min(before, self.capacity)
+        start = before - count
+        slots = np.arange(start, before) % self.capacity
+        rows = self._data[slots]
+
+        # Rows the writer replaced while we were copying are unreliable. Once
+        # the buffer is full, the oldest slot is also the one the writer
+        # fills next, so it may have been copied half-written.
+        unreliable = self.written - before
+        if before >= self.capacity:
+            unreliable += 1
+        if unreliable:
+            rows = rows[min(unreliable, len(rows)):]
+
+        if since is not None:
+            timestamps = rows[:, self._index['timestamp']]
+            rows = rows[np.searchsorted(timestamps, since, side='right'):]
+        if limit is not None:
+            rows = rows[-limit:] if limit > 0 else rows[:0]
+
+        return {name: rows[:, i] for name, i in self._index.items()}
+
+
+def summarize(samples, columns=SUMMARY_COLUMNS):
+    """
+    Reduce a snapshot window to the aggregates persisted for it.
+
+    Args:
+        samples (dict): Output of ``SampleRingBuffer.snapshot()``
+
+    Returns:
+        dict: ``<column>`` (mean), ``<column>_min``, ``<column>_max`` and
+        ``sample_count``; empty if the window holds no samples
+    """
+    count = len(samples['timestamp'])
+    if not count:
+        return {}
+
+    summary = {'sample_count': count}
+    for name in columns:
+        values = samples[name]
+        values = values[~np.isnan(values)]
+        if not len(values):
+            continue
+        summary[name] = round(float(values.mean()), 2)
+        summary[f'{name}_min'] = float(values.min())
+        summary[f'{name}_max'] = float(values.max())
+    return summary
+
+
+def get_recent_samples_path():
+    """File the collector shares its raw samples through."""
+    config = getattr(settings, 'HARDWARE_MONITOR', {})
+    return config.get('RECENT_SAMPLES_PATH') or os.path.join(
+        tempfile.gettempdir(), 'hardware_monitor_recent_samples.bin'
+    )
+
+
+_reader = None
+_reader_inode = None
+
+
+def get_recent_samples_reader():
+    """
+    Get a read-only view of the collector's buffer.
+
+    The view is reopened if the collector has recreated the file since it
+    was last attached.
+
+    Returns:
+        SampleRingBuffer: The buffer, or None if no collector has created one
+    """
+    global _reader, _reader_inode
+    path = get_recent_samples_path()
+    try:
+        inode = os.stat(path).st_ino
+    except OSError:
+        return None
+
+    if _reader is None or inode != _reader_inode:
+        _reader = SampleRingBuffer.open(path)
+        _reader_inode = inode if _reader is not None else None
+    return _reader
@@ -0,0 +1,468 @@
+"""
+Minute, hour and day rollups of SystemMetric.
+
+``update_rollups()`` folds newly saved metrics into their buckets inside
+the same transaction that saved them, so rollups never disagree with the
+raw rows. Minima and maxima cannot be taken back, so metrics that are
+changed or deleted have their buckets recomputed by ``refresh_rollups()``
+instead. ``rebuild_rollups()`` recomputes them from history (see the
+``backfill_rollups`` management command), and ``window_statistics()``
+answers ``/api/metrics/statistics/`` from them. Every rebuild records the
+time of the change as the rollup version, which cached statistics and
+conditional responses depend on.
+"""
+
+import logging
+from datetime import timedelta, timezone as dt_timezone
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, Trunc
+from django.utils import timezone
+
+from .models import MetricRollup, SystemMetric
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = (MetricRollup.MINUTE, MetricRollup.HOUR, MetricRollup.DAY)
+
+BUCKET_SIZES = {
+    MetricRollup.MINUTE: timedelta(minutes=1),
+    MetricRollup.HOUR: timedelta(hours=1),
+    MetricRollup.DAY: timedelta(days=1),
+}
+
+STATISTICS_CACHE_PREFIX = 'metric-statistics'
+# Time rollups were last rebuilt, kept in the cache shared by all processes
+ROLLUP_VERSION_KEY = 'metric-rollups-version'
+
+# Changed minutes refresh_rollups() rebuilds one by one before it rebuilds
+# the whole span between them instead
+REFRESH_BUCKET_LIMIT = 20
+
+
+def bucket_start(timestamp, granularity):
+    """
+    Start of the UTC bucket ``timestamp`` falls into.
+
+    Args:
+        timestamp (datetime): Aware datetime
+        granularity (str): 'minute', 'hour' or 'day'
+
+    Returns:
+        datetime: The bucket start
+    """
+    timestamp = timestamp.astimezone(dt_timezone.utc).replace(second=0, microsecond=0)
+    if granularity == MetricRollup.MINUTE:
+        return timestamp
+    timestamp = timestamp.replace(minute=0)
+    if granularity == MetricRollup.HOUR:
+        return timestamp
+    return timestamp.replace(hour=0)
+
+
+def summarize_metrics(metrics):
+    """
+    Group metrics into per-bucket deltas.
+
+    Args:
+        metrics (iterable): SystemMetric objects
+
+    Returns:
+        dict: ``(granularity, bucket)`` -> column values to add
+    """
+    deltas = {}
+    for metric in metrics:
+        for granularity in GRANULARITIES:
+            key = (granularity, bucket_start(metric.timestamp, granularity))
+            delta = deltas.get(key)
+            if delta is None:
+                delta = deltas[key] = {'count': 0, 'anomaly_count': 0}
+                for field in MetricRollup.FIELDS:
+                    delta[f'{field}_sum'] = delta[f'{field}_min'] = delta[f'{field}_max'] = None
+                    delta[f'{field}_count'] = 0
+
+            delta['count'] += 1
+            delta['anomaly_count'] += int(bool(metric.is_anomaly))
+            for field in MetricRollup.FIELDS:
+                value = getattr(metric, field)
+                if value is None:
+                    continue
+                value = float(value)
+                delta[f'{field}_count'] += 1
+                current = delta[f'{field}_sum']
+                delta[f'{field}_sum'] = value if current is None else current + value
+                current = delta[f'{field}_min']
+                delta[f'{field}_min'] = value if current is None else min(current, value)
+                current = delta[f'{field}_max']
+                delta[f'{field}_max'] = value if current is None else max(current, value)
+    return deltas
+
+
+def _merge_expressions(delta):
+    updates = {
+        'count': F('count') + delta['count'],
+        'anomaly_count': F('anomaly_count') + delta['anomaly_count'],
+    }
+    for field in MetricRollup.FIELDS:
+        total = delta[f'{field}_sum']
+        if total is None:
+            continue
+        low = Value(delta[f'{field}_min'], output_field=FloatField())
+        high = Value(delta[f'{field}_max'], output_field=FloatField())
+        updates[f'{field}_sum'] = Coalesce(F(f'{field}_sum'), Value(0.0)) + total
+        updates[f'{field}_count'] = F(f'{field}_count') + delta[f'{field}_count']
+        # Coalesce keeps LEAST/GREATEST from returning NULL on SQLite
+        updates[f'{field}_min'] = Least(Coalesce(F(f'{field}_min'), low), low)
+        updates[f'{field}_max'] = Greatest(Coalesce(F(f'{field}_max'), high), high)
+    return updates
+
+
+def update_rollups(metrics):
+    """
+    Fold newly saved metrics into their minute, hour and day rollups.
+
+    Call this inside the transaction that saved the metrics.
+
+    Args:
+        metrics (iterable): Saved SystemMetric objects
+    """
+    for (granularity, bucket), delta in summarize_metrics(metrics).items():
+        rollups = MetricRollup.objects.filter(granularity=granularity, bucket=bucket)
+        if rollups.update(**_merge_expressions(delta)):
+            continue
+        try:
+            with transaction.atomic():
+                MetricRollup.objects.create(granularity=granularity, bucket=bucket, **delta)
+        except IntegrityError:
+            # Another writer created the bucket in the meantime
+            rollups.update(**_merge_expressions(delta))
+
+
+def rebuild_rollups(start=None, end=None, granularities=GRANULARITIES, batch_size=1000):
+    """
+    Recompute rollups from the raw metrics.
+
+    Every bucket that contains a moment between ``start`` and ``end`` is
+    rebuilt whole, so the bounds need not be aligned to any bucket size.
+
+    Args:
+        start (datetime, optional): Only rebuild buckets from this time on
+        end (datetime, optional): Only rebuild buckets up to this time
+        granularities (iterable): Granularities to rebuild
+        batch_size (int): Rows per INSERT
+
+    Returns:
+        dict: Granularity -> number of rollup rows written
+    """
+    aggregates = {
+        'count': Count('id'),
+        'anomaly_count': Count('id', filter=Q(is_anomaly=True)),
+    }
+    for field in MetricRollup.FIELDS:
+        aggregates[f'{field}_sum'] = Sum(field)
+        aggregates[f'{field}_min'] = Min(field)
+        aggregates[f'{field}_max'] = Max(field)
+        aggregates[f'{field}_count'] = Count(field)
+
+    written = {}
+    for granularity in granularities:
+        metrics = SystemMetric.objects.all()
+        existing = MetricRollup.objects.filter(granularity=granularity)
+        if start is not None:
+            first = bucket_start(start, granularity)
+            metrics = metrics.filter(timestamp__gte=first)
+            existing = existing.filter(bucket__gte=first)
+        if end is not None:
+            last = bucket_start(end, granularity) + BUCKET_SIZES[granularity]
+            metrics = metrics.filter(timestamp__lt=last)
+            existing = existing.filter(bucket__lt=last)
+
+        rows = metrics.annotate(
+            rollup_bucket=Trunc('timestamp', granularity, tzinfo=dt_timezone.utc)
+        ).values('rollup_bucket').annotate(**aggregates).order_by('rollup_bucket')
+
+        rollups = (
+            MetricRollup(granularity=granularity, bucket=row.pop('rollup_bucket'), **row)
+            for row in rows.iterator()
+        )
+
+        with transaction.atomic():
+            existing.delete()
+
+            count = 0
+            while True:
+                batch = list(islice(rollups, batch_size))
+                if not batch:
+                    break
+                MetricRollup.objects.bulk_create(batch)
+                count += len(batch)
+        written[granularity] = count
+        logger.info(f"Rebuilt {count} {granularity} rollups")
+    mark_rollups_changed()
+    return written
+
+
+def mark_rollups_changed():
+    """
+    Give the rollups a new version once the current transaction commits.
+
+    Metrics that are added move the newest metric ID, which is enough for
+    caches to notice; changed and deleted ones are only seen through this.
+    """
+    from .dashboard import get_snapshot_cache
+
+    def publish():
+        try:
+            get_snapshot_cache().set(ROLLUP_VERSION_KEY, timezone.now(), None)
+        except Exception as e:
+            logger.error(f"Error storing rollup version: {e}")
+
+    transaction.on_commit(publish)
+
+
+def rollups_version():
+    """
+    Returns:
+        datetime: When rollups were last rebuilt, or None if unknown
+    """
+    from .dashboard import get_snapshot_cache
+
+    try:
+        return get_snapshot_cache().get(ROLLUP_VERSION_KEY)
+    except Exception as e:
+        logger.error(f"Error reading rollup version: {e}")
+        return None
+
+
+def refresh_rollups(timestamps):
+    """
+    Recompute the buckets holding metrics that were changed or deleted.
+
+    Call this inside the transaction that changed the metrics, after the
+    change.
+
+    Args:
+        timestamps (iterable): Timestamps of the changed metrics, before
+            and after the change
+    """
+    minutes = {bucket_start(timestamp, MetricRollup.MINUTE) for timestamp in timestamps}
+    if len(minutes) > REFRESH_BUCKET_LIMIT:
+        # Cheaper as one pass over the whole span
+        rebuild_rollups(start=min(minutes), end=max(minutes))
+        return
+    for minute in minutes:
+        rebuild_rollups(start=minute, end=minute)
+
+
+def _window_bounds(start):
+    """First minute bucket and first whole hour bucket of a window."""
+    first_minute = bucket_start(start, MetricRollup.MINUTE)
+    first_hour = bucket_start(start, MetricRollup.HOUR)
+    if first_hour < first_minute:
+        first_hour += timedelta(hours=1)
+    return first_minute, first_hour
+
+
+def window_rollups(start):
+    """
+    Rollup rows covering everything from ``start`` until now.
+
+    Minute rows cover the partial first hour and hour rows the rest, so a
+    90-day window reads about 2,160 rows.
+
+    Args:
+        start (datetime): Start of the window
+
+    Returns:
+        QuerySet: MetricRollup rows
+    """
+    first_minute, first_hour = _window_bounds(start)
+    return MetricRollup.objects.filter(
+        Q(granularity=MetricRollup.MINUTE, bucket__gte=first_minute, bucket__lt=first_hour)
+        | Q(granularity=MetricRollup.HOUR, bucket__gte=first_hour)
+    )
+
+
+def aggregate_rollups(rollups):
+    """
+    Combine rollup rows into totals.
+
+    Args:
+        rollups (QuerySet): MetricRollup rows that do not overlap
+
+    Returns:
+        dict: ``count``, ``anomaly_count`` and ``{'avg', 'min', 'max'}`` for
+        every field in ``MetricRollup.FIELDS``
+    """
+    aggregates = {'count': Sum('count'), 'anomaly_count': Sum('anomaly_count')}
+    for field in MetricRollup.FIELDS:
+        aggregates[f'{field}_sum'] = Sum(f'{field}_sum')
+        aggregates[f'{field}_min'] = Min(f'{field}_min')
+        aggregates[f'{field}_max'] = Max(f'{field}_max')
+        aggregates[f'{field}_count'] = Sum(f'{field}_count')
+    totals = rollups.aggregate(**aggregates)
+
+    count = totals['count'] or 0
+    result = {'count': count, 'anomaly_count': totals['anomaly_count'] or 0}
+    for field in MetricRollup.FIELDS:
+        total = totals[f'{field}_sum']
+        samples = totals[f'{field}_count']
+        result[field] = {
+            'avg': total / samples if samples and total is not None else None,
+            'min': totals[f'{field}_min'],
+            'max': totals[f'{field}_max'],
+        }
+    return result
+
+
+# Columns of the hourly chart series
+_SERIES_COLUMNS = {
+    'total': 'count',
+    'anomalies': 'anomaly_count',
+    'cpu': 'cpu_percent_sum',
+    'cpu_count': 'cpu_percent_count',
+    'memory': 'memory_percent_sum',
+    'memory_count': 'memory_percent_count',
+    'disk': 'disk_usage_percent_sum',
+    'disk_count': 'disk_usage_percent_count',
+}
+
+
+def _series_point(hour, row):
+    averages = {
+        name: row[name] / row[f'{name}_count'] if row[name] is not None and row[f'{name}_count'] else None
+        for name in ('cpu', 'memory', 'disk')
+    }
+    return {
+        'hour': hour,
+        'avg_cpu': averages['cpu'],
+        'avg_memory': averages['memory'],
+        'avg_disk': averages['disk'],
+        'anomaly_count': row['anomalies'],
+    }
+
+
+def hourly_series(start):
+    """
+    Hourly averages of CPU, memory and disk usage for charts.
+
+    Hour rollups are read as they are; only the partial first hour is
+    combined from minute rollups. This avoids truncating every bucket in
+    SQL, which SQLite does through a Python function per row.
+
+    Args:
+        start (datetime): Start of the window
+
+    Returns:
+        list: ``{'hour', 'avg_cpu', 'avg_memory', 'avg_disk', 'anomaly_count'}``
+        oldest first
+    """
+    first_minute, first_hour = _window_bounds(start)
+    series = []
+
+    if first_minute < first_hour:
+        head = MetricRollup.objects.filter(
+            granularity=MetricRollup.MINUTE, bucket__gte=first_minute, bucket__lt=first_hour
+        ).aggregate(**{name: Sum(column) for name, column in _SERIES_COLUMNS.items()})
+        if head['total']:
+            series.append(_series_point(first_hour - timedelta(hours=1), head))
+
+    rows = MetricRollup.objects.filter(
+        granularity=MetricRollup.HOUR, bucket__gte=first_hour
+    ).order_by('bucket').values(
+        'bucket', **{name: F(column) for name, column in _SERIES_COLUMNS.items()}
+    )
+    series.extend(_series_point(row['bucket'], row) for row in rows if row['total'])
+    return series
+
+
+def recent_averages(fields, limit=100, granularity=MetricRollup.MINUTE):
+    """
+    Averages of the most recent buckets, newest first.
+
+    Args:
+        fields (iterable): Fields from ``MetricRollup.FIELDS``
+        limit (int): Number of buckets
+        granularity (str): Bucket size
+
+    Returns:
+        dict: Field -> list of averages (None where a bucket has no value)
+    """
+    fields = list(fields)
+    columns = [column for field in fields for column in (f'{field}_sum', f'{field}_count')]
+    rows = MetricRollup.objects.filter(granularity=granularity).order_by('-bucket').values_list(
+        *columns
+    )[:limit]
+
+    trends = {field: [] for field in fields}
+    for row in rows:
+        for field, total, count in zip(fields, row[::2], row[1::2]):
+            trends[field].append(round(total / count, 2) if count and total is not None else None)
+    return trends
+
+
+def window_statistics(start):
+    """
+    Statistics for ``/api/metrics/statistics/`` from ``start`` until now.
+
+    Costs one aggregate query for the totals and two small queries for the
+    hourly series.
+
+    Args:
+        start (datetime): Start of the window
+
+    Returns:
+        dict: The statistics, or an empty dict if the window has no metrics
+    """
+    rollups = window_rollups(start)
+    totals = aggregate_rollups(rollups)
+    if not totals['count']:
+        return {}
+
+    return {
+        'total_metrics': totals['count'],
+        'anomalies': totals['anomaly_count'],
+        'cpu': totals['cpu_percent'],
+        'memory': totals['memory_percent'],
+        'disk': totals['disk_usage_percent'],
+        'network': {
+            'avg_sent': totals['network_bytes_sent']['avg'],
+            'avg_recv': totals['network_bytes_recv']['avg'],
+            'max_sent': totals['network_bytes_sent']['max'],
+            'max_recv': totals['network_bytes_recv']['max'],
+        },
+        'hourly_data': hourly_series(start),
+    }
+
+
+def get_window_statistics(days):
+    """
+    Cached ``window_statistics()`` for the last ``days`` days.
+
+    Entries are keyed by the window, the newest metric ID and the rollup
+    version, so a new, changed or deleted sample (from any process) makes
+    the next request recompute, while
+    repeated polls in between are served from the cache. The TTL bounds how
+    long the window start may lag behind when no samples arrive.
+
+    Args:
+        days (int): Window length in days
+
+    Returns:
+        dict: The statistics, or an empty dict if the window has no metrics
+    """
+    latest_id = SystemMetric.objects.aggregate(latest=Max('id'))['latest']
+    version = rollups_version()
+    version = version.timestamp() if version else None
+    key = f'{STATISTICS_CACHE_PREFIX}:{days}:{latest_id}:{version}'
+
+    stats = cache.get(key)
+    if stats is None:
+        stats = window_statistics(timezone.now() - timedelta(days=days))
+        config = getattr(settings, 'HARDWARE_MONITOR', {})
+        cache.set(key, stats, config.get('STATISTICS_CACHE_TTL', 60))
+    return stats
@@ -0,0 +1,212 @@
+"""
+Background samplers for cheap, frequently read system counters.
+
+``psutil.cpu_percent(interval=...)`` blocks the calling thread for the whole
+interval. The sampler below keeps its own rolling CPU counters instead, so
+request handlers can read a precomputed value without waiting.
+"""
+
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+import psutil
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+CpuSample = namedtuple('CpuSample', ['timestamp', 'monotonic', 'total', 'per_core'])
+
+
+def _total_time(times):
+    """Total CPU time of a ``psutil.cpu_times()`` snapshot."""
+    total = sum(times)
+    # On Linux guest time is already included in user/nice time
+    total -= getattr(times, 'guest', 0) + getattr(times, 'guest_nice', 0)
+    return total
+
+
+def _busy_time(times):
+    """Busy CPU time of a ``psutil.cpu_times()`` snapshot."""
+    return _total_time(times) - times.idle - getattr(times, 'iowait', 0)
+
+
+def _busy_percent(before, after):
+    """
+    Calculate CPU utilisation between two ``cpu_times`` snapshots.
+
+    This mirrors what ``psutil.cpu_percent`` does internally, but keeps the
+    previous snapshot on the sampler instead of in psutil's module globals,
+    so other callers of ``cpu_percent()`` cannot skew our readings.
+    """
+    total_delta = _total_time(after) - _total_time(before)
+    if total_delta <= 0:
+        return 0.0
+    busy_delta = _busy_time(after) - _busy_time(before)
+    percent = (busy_delta / total_delta) * 100
+    return round(min(max(percent, 0.0), 100.0), 1)
+
+
+class CpuSampler:
+    """
+    Keeps rolling total and per-core CPU utilisation in a small ring buffer.
+
+    ``sample()`` can be driven by the built-in daemon thread (``start()``) or
+    by an external scheduler. Once a sample exists ``latest()`` never blocks.
+    """
+
+    def __init__(self, interval=1.0, history=60):
+        """
+        Args:
+            interval (float): Seconds between samples when running the thread.
+            history (int): Number of samples kept in the ring buffer.
+        """
+        self.interval = interval
+        self.manual = False
+        self._samples = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._prime()
+
+    def _prime(self):
+        """Take the reference snapshot the first sample is measured against."""
+        self._last_total = psutil.cpu_times()
+        self._last_per_core = psutil.cpu_times(percpu=True)
+        self._last_monotonic = time.monotonic()
+
+    def _measure(self, total_before, per_core_before):
+        total_now = psutil.cpu_times()
+        per_core_now = psutil.cpu_times(percpu=True)
+        sample = CpuSample(
+            timestamp=time.time(),
+            monotonic=time.monotonic(),
+            total=_busy_percent(total_before, total_now),
+            per_core=[
+                _busy_percent(before, after)
+                for before, after in zip(per_core_before, per_core_now)
+            ],
+        )
+        return sample, total_now, per_core_now
+
+    def sample(self):
+        """
+        Take a sample covering the time since the previous one.
+
+        Returns:
+            CpuSample: The new sample
+        """
+        with self._lock:
+            return self._sample()
+
+    def _sample(self):
+        # Called with the lock held
+        sample, self._last_total, self._last_per_core = self._measure(
+            self._last_total, self._last_per_core
+        )
+        self._last_monotonic = sample.monotonic
+        self._samples.append(sample)
+        return sample
+
+    def latest(self):
+        """
+        Get the most recent CPU reading.
+
+        Only the very first call can wait: a reading needs at least one
+        interval since the priming snapshot, so before the first sample it
+        waits out the rest of that interval and samples itself.
+
+        Returns:
+            dict: ``total`` and ``per_core`` utilisation in percent, the
+            sample ``timestamp`` and its ``age`` in seconds
+        """
+        with self._lock:
+            sample = self._samples[-1] if self._samples else None
+            remaining = self.interval - (time.monotonic() - self._last_monotonic)
+
+        if sample is None:
+            if remaining > 0:
+                time.sleep(remaining)
+            with self._lock:
+                # The sampling thread may have got there first
+                sample = self._samples[-1] if self._samples else self._sample()
+
+        return {
+            'total': sample.total,
+            'per_core': list(sample.per_core),
+            'timestamp': sample.timestamp,
+            'age': round(time.monotonic() - sample.monotonic, 3),
+        }
+
+    def history(self):
+        """Return the buffered samples, oldest first."""
+        with self._lock:
+            return list(self._samples)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start sampling on a daemon thread."""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='cpu-sampler', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the sampling thread if it is running."""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling CPU usage: {e}")
+
+
+_cpu_sampler = None
+_cpu_sampler_lock = threading.Lock()
+
+
+def get_cpu_sampler(manual=False):
+    """
+    Get the process-wide CPU sampler, creating it on first use.
+
+    Args:
+        manual (bool): The caller drives ``sample()`` itself (as the
+            monitor_hardware scheduler does), so the background thread is
+            never started in this process.
+
+    Returns:
+        CpuSampler: The shared sampler
+    """
+    global _cpu_sampler
+    if _cpu_sampler is None:
+        with _cpu_sampler_lock:
+            if _cpu_sampler is None:
+                config = getattr(settings, 'HARDWARE_MONITOR', {})
+                _cpu_sampler = CpuSampler(
+                    interval=config.get('CPU_SAMPLE_INTERVAL', 1.0),
+                    history=config.get('CPU_SAMPLE_HISTORY', 60),
+                )
+    if manual:
+        _cpu_sampler.manual = True
+    elif not _cpu_sampler.manual and not _cpu_sampler.running:
+        with _cpu_sampler_lock:
+            _cpu_sampler.start()
+    return _cpu_sampler
+
+
+def stop_cpu_sampler():
+    """Stop the shared sampler's background thread, if one was started."""
+    if _cpu_sampler is not None:
+        _cpu_sampler.stop()
@@ -0,0 +1,161 @@
+"""
+asyncio scheduler that runs each collection probe on its own cadence.
+
+Deadlines are computed on the event loop's monotonic clock as
+``start + n * interval``, so the time a probe takes never shifts its next
+run. Blocking probes run on a thread pool so a slow disk or sensor read
+cannot delay the cheap ones.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledProbe:
+    """A probe registered with the scheduler, plus its timing statistics."""
+
+    def __init__(self, name, func, interval, blocking=False, prepare=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.blocking = blocking
+        self.prepare = prepare
+
+        self.runs = 0
+        self.errors = 0
+        self.missed = 0
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+
+    def record(self, duration):
+        self.runs += 1
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+        self.total_duration += duration
+
+    def stats(self):
+        """Return the probe's timing statistics (durations in milliseconds)."""
+        return {
+            'interval': self.interval,
+            'blocking': self.blocking,
+            'runs': self.runs,
+            'errors': self.errors,
+            'missed_deadlines': self.missed,
+            'last_ms': round(self.last_duration * 1000, 3),
+            'avg_ms': round(self.total_duration / self.runs * 1000, 3) if self.runs else 0.0,
+            'max_ms': round(self.max_duration * 1000, 3),
+        }
+
+
+class CollectionScheduler:
+    """
+    Runs registered probes concurrently, each at its own interval.
+
+    Results returned by a probe are passed to ``on_result(name, result)`` on
+    the event loop thread.
+    """
+
+    def __init__(self, on_result=None, max_workers=4):
+        """
+        Args:
+            on_result (callable, optional): Called with each probe result.
+            max_workers (int): Threads available to blocking probes.
+        """
+        self.on_result = on_result
+        self.max_workers = max_workers
+        self.probes = {}
+        self._executor = None
+
+    def add(self, name, func, interval, blocking=False, prepare=None):
+        """
+        Register a probe.
+
+        Args:
+            name (str): Unique probe name
+            func (callable): Called on every run, without arguments or with
+                the result of ``prepare``
+            interval (float): Seconds between runs
+            blocking (bool): Run on the thread pool instead of the event loop
+            prepare (callable, optional): Called on the event loop thread
+                before each run, so it can safely copy state that other
+                probes' results update; its result is passed to ``func``
+        """
+        if interval <= 0:
+            raise ValueError(f"Interval for probe '{name}' must be positive")
+        self.probes[name] = ScheduledProbe(name, func, interval, blocking, prepare)
+
+    def stats(self):
+        """Return timing statistics for every probe."""
+        return {name: probe.stats() for name, probe in self.probes.items()}
+
+    def run(self, duration=None):
+        """
+        Run the scheduler until interrupted.
+
+        Args:
+            duration (float, optional): Stop after this many seconds.
+        """
+        asyncio.run(self._main(duration))
+
+    async def _main(self, duration):
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix='probe'
+        )
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tasks = [
+            asyncio.create_task(self._run_probe(probe, start), name=probe.name)
+            for probe in self.probes.values()
+        ]
+        try:
+            if duration is None:
+                await asyncio.gather(*tasks)
+            else:
+                await asyncio.sleep(duration)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self._executor.shutdown(wait=True)
+
+    async def _run_probe(self, probe, start):
+        loop = asyncio.get_running_loop()
+        deadline = start
+
+        while True:
+            now = loop.time()
+            if now - deadline >= probe.interval:
+                # The previous run overran one or more slots: skip them rather
+                # than firing a burst of catch-up runs.
+                skipped = int((now - deadline) // probe.interval)
+                probe.missed += skipped
+                deadline += skipped * probe.interval
+                logger.warning(
+                    f"Probe '{probe.name}' missed {skipped} deadline(s); "
+                    f"last run took {probe.last_duration * 1000:.1f} ms"
+                )
+            if deadline > now:
+                await asyncio.sleep(deadline - now)
+
+            started = time.perf_counter()
+            try:
+                args = () if probe.prepare is None else (probe.prepare(),)
+                if probe.blocking:
+                    result = await loop.run_in_executor(self._executor, probe.func, *args)
+                else:
+                    result = probe.func(*args)
+                if result is not None and self.on_result is not None:
+                    self.on_result(probe.name, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                probe.errors += 1
+                logger.error(f"Error running probe '{probe.name}': {e}")
+            probe.record(time.perf_counter() - started)
+
+            deadline += probe.interval
@@ -0,0 +1,447 @@
+"""
+Native Linux sensor backend reading ``/sys/class/hwmon`` directly.
+
+The fan and temperature input files are discovered once. After that each
+reading is a single ``pread`` on a file descriptor that stays open, which
+is cheap enough to sample every second and avoids forking ``sensors -j``.
+"""
+
+import glob
+import logging
+import os
+import re
+import threading
+import time
+
+import psutil
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+HWMON_ROOT = '/sys/class/hwmon'
+
+_INPUT_RE = re.compile(r'^(fan|temp)(\d+)_input$')
+
+# Chips known to report the CPU package temperature, in order of preference
+CPU_TEMP_CHIPS = ('coretemp', 'k10temp', 'zenpower', 'cpu_thermal', 'cpu-thermal')
+CPU_TEMP_PREFIXES = ('cpu', 'core', 'k10temp', 'coretemp')
+
+# Shared-cache key holding the time of the last requested catalog refresh,
+# and how often each process looks at it
+REFRESH_REQUEST_KEY = 'sensor-catalog-refresh'
+REFRESH_CHECK_INTERVAL = 5
+
+
+class HwmonSensor:
+    """A single ``fanN_input`` or ``tempN_input`` file."""
+
+    def __init__(self, chip, kind, index, path, label):
+        self.chip = chip
+        self.kind = kind
+        self.index = index
+        self.path = path
+        self.label = label
+
+    def __repr__(self):
+        return f"<HwmonSensor {self.chip}/{self.kind}{self.index} {self.label!r}>"
+
+
+def _read_text(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+class HwmonReader:
+    """
+    Reads fan and temperature sensors from a hwmon sysfs tree.
+
+    Fan inputs are reported in RPM, temperature inputs in millidegrees
+    Celsius and are converted to degrees.
+    """
+
+    def __init__(self, root=HWMON_ROOT):
+        """
+        Args:
+            root (str): hwmon class directory; tests point this at a fake tree.
+        """
+        self.root = root
+        self.sensors = []
+        self._fds = {}
+        self._lock = threading.Lock()
+        self.discover()
+
+    @property
+    def available(self):
+        return bool(self.sensors)
+
+    def discover(self):
+        """(Re)scan the hwmon tree for fan and temperature inputs."""
+        self.close()
+        sensors = []
+
+        for chip_dir in sorted(glob.glob(os.path.join(self.root, 'hwmon*'))):
+            chip = _read_text(os.path.join(chip_dir, 'name')) or os.path.basename(chip_dir)
+            # Older kernels expose the inputs on the parent device instead
+            for directory in (chip_dir, os.path.join(chip_dir, 'device')):
+                try:
+                    entries = sorted(os.listdir(directory))
+                except OSError:
+                    continue
+                for entry in entries:
+                    match = _INPUT_RE.match(entry)
+                    if not match:
+                        continue
+                    kind, index = match.group(1), int(match.group(2))
+                    label = _read_text(os.path.join(directory, f'{kind}{index}_label'))
+                    sensors.append(HwmonSensor(
+                        chip=chip,
+                        kind=kind,
+                        index=index,
+                        path=os.path.join(directory, entry),
+                        label=label or f'{kind}{index}',
+                    ))
+
+        sensors.sort(key=lambda s: (s.chip, s.kind, s.index))
+        self.sensors = sensors
+        return sensors
+
+    def close(self):
+        """Close every cached file descriptor."""
+        with self._lock:
+            for fd in self._fds.values():
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+            self._fds = {}
+
+    def _fd(self, sensor):
+        # Called with the lock held
+        fd = self._fds.get(sensor.path)
+        if fd is None:
+            fd = os.open(sensor.path, os.O_RDONLY)
+            self._fds[sensor.path] = fd
+        return fd
+
+    def read(self, sensor):
+        """
+        Read the current value of a sensor.
+
+        Returns:
+            float: RPM for fans, degrees Celsius for temperatures, or None if
+            the sensor cannot be read right now
+        """
+        try:
+            # Under the lock so close() cannot close the descriptor, and the
+            # number be reused for another file, in the middle of the read
+            with self._lock:
+                raw = os.pread(self._fd(sensor), 32, 0)
+            value = int(raw.strip())
+        except (OSError, ValueError):
+            # Some drivers return EAGAIN/ENODATA while a sensor is idle
+            return None
+        return value / 1000.0 if sensor.kind == 'temp' else float(value)
+
+    def read_fans(self):
+        """
+        Returns:
+            list: ``{'chip', 'label', 'rpm'}`` for every readable fan input
+        """
+        fans = []
+        for sensor in self.sensors:
+            if sensor.kind != 'fan':
+                continue
+            rpm = self.read(sensor)
+            if rpm is not None:
+                fans.append({'chip': sensor.chip, 'label': sensor.label, 'rpm': rpm})
+        return fans
+
+    def read_temperatures(self):
+        """
+        Returns:
+            dict: chip name -> list of ``(label, degrees Celsius)``, in the
+            same shape as ``psutil.sensors_temperatures()``
+        """
+        temps = {}
+        for sensor in self.sensors:
+            if sensor.kind != 'temp':
+                continue
+            current = self.read(sensor)
+            if current is not None:
+                temps.setdefault(sensor.chip, []).append((sensor.label, current))
+        return temps
+
+
+_hwmon_reader = None
+_hwmon_reader_lock = threading.Lock()
+
+
+def get_hwmon_reader(include_empty=False):
+    """
+    Get the process-wide hwmon reader, discovering sensors on first use.
+
+    Args:
+        include_empty (bool): Return the reader even if it found no sensors,
+            so a later ``discover()`` can pick up hot-plugged chips.
+
+    Returns:
+        HwmonReader: The reader, or None when no hwmon sensors exist
+        (non-Linux systems, containers without /sys)
+    """
+    global _hwmon_reader
+    if _hwmon_reader is None:
+        with _hwmon_reader_lock:
+            if _hwmon_reader is None:
+                _hwmon_reader = HwmonReader()
+                logger.info(f"Discovered {len(_hwmon_reader.sensors)} hwmon sensors")
+    return _hwmon_reader if include_empty or _hwmon_reader.available else None
+
+
+def pick_cpu_temp_chip(chips):
+    """
+    Choose the chip that most likely reports the CPU temperature.
+
+    Args:
+        chips (list): Chip names in discovery order
+
+    Returns:
+        str: The chosen chip, or None if ``chips`` is empty
+    """
+    for preferred in CPU_TEMP_CHIPS:
+        if preferred in chips:
+            return preferred
+    for chip in chips:
+        if chip.lower().startswith(CPU_TEMP_PREFIXES):
+            return chip
+    return chips[0] if chips else None
+
+
+class SensorCatalog:
+    """
+    Canonical CPU temperature, fan and battery sources, resolved once.
+
+    ``refresh()`` probes the available chips and remembers which probes the
+    system cannot support, so the per-sample readers skip them without
+    raising. After hot-plugging hardware call ``request_refresh()``, which
+    also makes every other process (web workers, the collector) refresh its
+    own catalog within ``REFRESH_CHECK_INTERVAL`` seconds.
+    """
+
+    # Probe names shared with HardwareMonitorService.PROBES
+    PROBES = ('temperature', 'fans', 'battery')
+
+    def __init__(self, hwmon=None):
+        """
+        Args:
+            hwmon (HwmonReader, optional): sysfs reader to prefer over psutil
+        """
+        self.hwmon = hwmon
+        self._state = None
+        self._checked_at = time.monotonic()
+        self.refresh()
+
+    def refresh(self):
+        """Re-probe every sensor source and swap in the new catalog."""
+        if self.hwmon is not None:
+            self.hwmon.discover()
+
+        state = {
+            'refreshed_at': timezone.now(),
+            'cpu_temperature': None,
+            'fan': None,
+            'battery': None,
+            'chips': {'temperature': [], 'fans': []},
+            'unsupported': {},
+        }
+        for probe, resolve in (
+            ('temperature', self._resolve_temperature),
+            ('fans', self._resolve_fan),
+            ('battery', self._resolve_battery),
+        ):
+            try:
+                reason = resolve(state)
+            except Exception as e:
+                reason = f"Probe failed: {e}"
+            if reason:
+                state['unsupported'][probe] = reason
+
+        # Readers only ever see a complete catalog
+        self._state = state
+        logger.info(
+            f"Sensor catalog refreshed; unsupported probes: "
+            f"{', '.join(state['unsupported']) or 'none'}"
+        )
+        return self.as_dict()
+
+    def request_refresh(self):
+        """Refresh this catalog and ask every other process to refresh theirs."""
+        from .dashboard import get_snapshot_cache
+
+        catalog = self.refresh()
+        try:
+            get_snapshot_cache().set(REFRESH_REQUEST_KEY, self._state['refreshed_at'].timestamp(), None)
+        except Exception as e:
+            logger.error(f"Error publishing sensor refresh request: {e}")
+        return catalog
+
+    def refresh_if_requested(self):
+        """
+        Refresh if another process requested it since this catalog was built.
+
+        Looks at the shared cache at most every ``REFRESH_CHECK_INTERVAL``
+        seconds, so it is cheap to call on every access.
+
+        Returns:
+            bool: True if the catalog was refreshed
+        """
+        from .dashboard import get_snapshot_cache
+
+        now = time.monotonic()
+        if now - self._checked_at < REFRESH_CHECK_INTERVAL:
+            return False
+        self._checked_at = now
+        try:
+            requested = get_snapshot_cache().get(REFRESH_REQUEST_KEY)
+        except Exception as e:
+            logger.debug(f"Error reading sensor refresh request: {e}")
+            return False
+        if requested is None or requested <= self._state['refreshed_at'].timestamp():
+            return False
+        self.refresh()
+        return True
+
+    def _resolve_temperature(self, state):
+        if self.hwmon is not None and self.hwmon.available:
+            sensors = [s for s in self.hwmon.sensors if s.kind == 'temp']
+            chips = list(dict.fromkeys(s.chip for s in sensors))
+            state['chips']['temperature'] = chips
+            chip = pick_cpu_temp_chip(chips)
+            if chip:
+                sensor = next(s for s in sensors if s.chip == chip)
+                state['cpu_temperature'] = {
+                    'backend': 'hwmon', 'chip': chip, 'label': sensor.label, 'sensor': sensor,
+                }
+                return None
+
+        if not hasattr(psutil, 'sensors_temperatures'):
+            return "Not supported on this platform"
+        temps = psutil.sensors_temperatures()
+        chips = [chip for chip, entries in temps.items() if entries]
+        state['chips']['temperature'] = chips
+        chip = pick_cpu_temp_chip(chips)
+        if chip is None:
+            return "No temperature sensors found"
+        state['cpu_temperature'] = {
+            'backend': 'psutil', 'chip': chip, 'label': temps[chip][0].label or chip,
+        }
+        return None
+
+    def _resolve_fan(self, state):
+        if self.hwmon is not None and self.hwmon.available:
+            sensors = [s for s in self.hwmon.sensors if s.kind == 'fan']
+            state['chips']['fans'] = list(dict.fromkeys(s.chip for s in sensors))
+            if sensors:
+                state['fan'] = {
+                    'backend': 'hwmon', 'chip': sensors[0].chip,
+                    'label': sensors[0].label, 'sensor': sensors[0],
+                }
+                return None
+
+        if not hasattr(psutil, 'sensors_fans'):
+            return "Not supported on this platform"
+        fans = psutil.sensors_fans()
+        chips = [chip for chip, entries in fans.items() if entries]
+        state['chips']['fans'] = chips
+        if not chips:
+            return "No fan sensors found"
+        state['fan'] = {
+            'backend': 'psutil', 'chip': chips[0], 'label': fans[chips[0]][0].label or chips[0],
+        }
+        return None
+
+    def _resolve_battery(self, state):
+        if not hasattr(psutil, 'sensors_battery'):
+            return "Not supported on this platform"
+        if psutil.sensors_battery() is None:
+            return "No battery found"
+        state['battery'] = {'backend': 'psutil'}
+        return None
+
+    @property
+    def unsupported(self):
+        """Names of the probes this system cannot support."""
+        return set(self._state['unsupported'])
+
+    def _read(self, source, psutil_reader):
+        if source['backend'] == 'hwmon':
+            return self.hwmon.read(source['sensor'])
+        try:
+            entries = psutil_reader().get(source['chip'])
+        except Exception as e:
+            logger.debug(f"Error reading {source['chip']}: {e}")
+            return None
+        return entries[0].current if entries else None
+
+    def read_cpu_temp(self):
+        """Current CPU temperature in Celsius, or None if unavailable."""
+        source = self._state['cpu_temperature']
+        if source is None:
+            return None
+        return self._read(source, psutil.sensors_temperatures)
+
+    def read_fan_speed(self):
+        """Current speed of the canonical fan in RPM, or None if unavailable."""
+        source = self._state['fan']
+        if source is None:
+            return None
+        return self._read(source, psutil.sensors_fans)
+
+    def read_battery(self):
+        """Current battery charge in percent, or None if unavailable."""
+        if self._state['battery'] is None:
+            return None
+        battery = psutil.sensors_battery()
+        return battery.percent if battery else None
+
+    def as_dict(self):
+        """Read-only representation of the catalog for the API."""
+        state = self._state
+
+        def describe(source):
+            if source is None:
+                return None
+            return {key: value for key, value in source.items() if key != 'sensor'}
+
+        return {
+            'refreshed_at': state['refreshed_at'],
+            'cpu_temperature': describe(state['cpu_temperature']),
+            'fan': describe(state['fan']),
+            'battery': describe(state['battery']),
+            'chips': {kind: list(chips) for kind, chips in state['chips'].items()},
+            'unsupported': dict(state['unsupported']),
+        }
+
+
+_sensor_catalog = None
+_sensor_catalog_lock = threading.Lock()
+
+
+def get_sensor_catalog():
+    """
+    Get the process-wide sensor catalog, building it on first use and
+    refreshing it when another process has requested a refresh.
+
+    Returns:
+        SensorCatalog: The shared catalog
+    """
+    global _sensor_catalog
+    if _sensor_catalog is None:
+        with _sensor_catalog_lock:
+            if _sensor_catalog is None:
+                hwmon = get_hwmon_reader(include_empty=True) if os.path.isdir(HWMON_ROOT) else None
+                _sensor_catalog = SensorCatalog(hwmon=hwmon)
+    _sensor_catalog.refresh_if_requested()
+    return _sensor_catalog
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import SystemMetric, HardwareIssue, ModelTrainingHistory
+from .models import SystemMetric, HardwareIssue, ModelTrainingHistory, TrainingJob
 
 class SystemMetricSerializer(serializers.ModelSerializer):
     """Serializer for system metrics."""
@@ -9,7 +9,9 @@ class SystemMetricSerializer(serializers.ModelSerializer):
             'id', 'timestamp', 'cpu_percent', 'memory_percent', 
             'disk_usage_percent', 'network_bytes_sent', 'network_bytes_recv',
             'cpu_temp', 'fan_speed', 'fan_expected_speed', 'fan_anomaly',
-            'battery_percent', 'is_anomaly', 'anomaly_score'
+            'battery_percent', 'is_anomaly', 'anomaly_score',
+            'cpu_percent_min', 'cpu_percent_max',
+            'memory_percent_min', 'memory_percent_max', 'sample_count'
         ]
 
 
@@ -29,8 +31,21 @@ class ModelTrainingHistorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'trained_at']
 
 
+class TrainingJobSerializer(serializers.ModelSerializer):
+    """Serializer for background training jobs."""
+    class Meta:
+        model = TrainingJob
+        fields = [
+            'id', 'model_name', 'status', 'samples', 'progress', 'stage',
+            'cancel_requested', 'error', 'training', 'created_at',
+            'started_at', 'finished_at', 'heartbeat_at'
+        ]
+        read_only_fields = fields
+
+
 class SystemSummarySerializer(serializers.Serializer):
     """Serializer for system summary data."""
+    generated_at = serializers.DateTimeField(required=False)
     current_state = serializers.DictField()
     recent_anomalies = serializers.ListField()
     unresolved_issues = serializers.ListField()
@@ -0,0 +1,423 @@
+"""
+Server-Sent Events stream of new metrics, anomalies and hardware issues.
+
+One ``Broadcaster`` per process polls the database for rows saved since its
+last poll and fans each event out to every connected client, so N clients
+cost one query per poll instead of N. Metric and issue events carry an
+``id`` of the form ``<metric id>:<issue id>``; a client that reconnects with
+``Last-Event-ID`` is first sent whatever it missed.
+
+Ids are handed out when a row is inserted but become visible when its
+transaction commits, so on databases with concurrent writers a row can show
+up after rows with higher ids. Ids a poll skipped over are therefore checked
+again for ``STREAM_GAP_TIMEOUT`` seconds, and rows that turn up late are sent
+without an event ID so the client's ``Last-Event-ID`` never moves backwards.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections
+from django.db.models import Max, Q
+
+from .models import SystemMetric, HardwareIssue
+from .serializers import SystemMetricSerializer, HardwareIssueSerializer
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds the browser waits before reconnecting
+RETRY_PAYLOAD = b'retry: 3000\n\n'
+
+
+def _config(name, default):
+    return getattr(settings, 'HARDWARE_MONITOR', {}).get(name, default)
+
+
+class StreamEvent:
+    """A single SSE message, encoded once and shared by every client."""
+
+    __slots__ = ('name', 'cursor', 'payload')
+
+    def __init__(self, name, data, cursor=None):
+        self.name = name
+        self.cursor = cursor
+        lines = []
+        if cursor is not None:
+            lines.append(f'id: {cursor[0]}:{cursor[1]}')
+        lines.append(f'event: {name}')
+        lines.append(f'data: {json.dumps(data, cls=DjangoJSONEncoder)}')
+        self.payload = ('\n'.join(lines) + '\n\n').encode()
+
+
+def parse_cursor(value):
+    """
+    Parse a ``Last-Event-ID`` of the form ``<metric id>:<issue id>``.
+
+    Returns:
+        tuple: ``(metric_id, issue_id)``, or None if ``value`` is malformed
+    """
+    try:
+        metric_id, issue_id = value.split(':')
+        return int(metric_id), int(issue_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def current_cursor():
+    """Cursor pointing at the newest metric and issue."""
+    return (
+        SystemMetric.objects.aggregate(latest=Max('id'))['latest'] or 0,
+        HardwareIssue.objects.aggregate(latest=Max('id'))['latest'] or 0,
+    )
+
+
+def events_since(cursor, limit=None):
+    """
+    Build the events for rows saved after ``cursor``.
+
+    Args:
+        cursor (tuple): ``(metric_id, issue_id)`` already delivered
+        limit (int, optional): Only the newest ``limit`` rows of each kind
+
+    Returns:
+        tuple: ``(events, cursor)``, with the cursor after the last event
+    """
+    metric_id, issue_id = cursor
+
+    metrics = SystemMetric.objects.filter(id__gt=metric_id).order_by('-id')
+    issues = HardwareIssue.objects.filter(id__gt=issue_id).order_by('-id')
+    if limit is not None:
+        metrics, issues = metrics[:limit], issues[:limit]
+    # Newest first above so the limit keeps the most recent rows
+    metrics = list(metrics)[::-1]
+    issues = list(issues)[::-1]
+
+    events = []
+    for data in SystemMetricSerializer(metrics, many=True).data:
+        metric_id = data['id']
+        events.append(StreamEvent('metric', data, (metric_id, issue_id)))
+    for data in HardwareIssueSerializer(issues, many=True).data:
+        issue_id = data['id']
+        events.append(StreamEvent('issue', data, (metric_id, issue_id)))
+    return events, (metric_id, issue_id)
+
+
+def _missing_ranges(after, ids):
+    """
+    Ranges of ids between ``after`` and the last of ``ids`` not in ``ids``.
+
+    Args:
+        after (int): Id already delivered
+        ids (list): Ascending ids delivered since
+
+    Returns:
+        list: ``(low, high)`` inclusive ranges
+    """
+    ranges = []
+    expected = after + 1
+    for row_id in ids:
+        if row_id > expected:
+            ranges.append((expected, row_id - 1))
+        expected = row_id + 1
+    return ranges
+
+
+class _Subscriber:
+    """Bounded per-client queue, fed from the broadcaster thread."""
+
+    def __init__(self, maxsize):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # A client this far behind reconnects and resumes from its
+            # Last-Event-ID instead of holding events in memory
+            self.close()
+
+    def close(self):
+        self.closed = True
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+
+class _AsyncSubscriber(_Subscriber):
+    """Subscriber consumed by a coroutine on an asyncio event loop."""
+
+    def __init__(self, maxsize, loop):
+        super().__init__(maxsize)
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.loop = loop
+
+    def put(self, event):
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+class Broadcaster:
+    """
+    Polls the database for new rows and fans the events out to subscribers.
+
+    The polling thread only runs while at least one client is connected.
+    Extra sources (e.g. fan readings) are read on their own interval and
+    sent without an event ID.
+    """
+
+    def __init__(self, poll_interval=1.0, queue_size=1000, sources=None,
+                 gap_timeout=30.0):
+        """
+        Args:
+            poll_interval (float): Seconds between database polls
+            queue_size (int): Events buffered per client before it is dropped
+            sources (dict, optional): Event name -> ``(callable, interval)``
+            gap_timeout (float): Seconds a skipped id is waited for before it
+                is taken to belong to a rolled back transaction
+        """
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self.sources = dict(sources or {})
+        self.gap_timeout = gap_timeout
+        self.cursor = None
+        # Event name -> [low, high, deadline] ranges of ids not seen yet
+        self._gaps = {'metric': [], 'issue': []}
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._source_due = {}
+
+    def subscribe(self, loop=None):
+        """
+        Register a client.
+
+        Args:
+            loop (asyncio.AbstractEventLoop, optional): Loop of an async
+                consumer; synchronous consumers leave this out.
+
+        Returns:
+            _Subscriber: The client's queue
+        """
+        if loop is not None:
+            subscriber = _AsyncSubscriber(self.queue_size, loop)
+        else:
+            subscriber = _Subscriber(self.queue_size)
+
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self._thread is None or not self._thread.is_alive():
+                # Fix the cursor before the caller reads its backlog, so no
+                # row saved in between can fall through the gap
+                self.cursor = current_cursor()
+                self._thread = threading.Thread(
+                    target=self._run, name='metrics-stream', daemon=True
+                )
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        # Forget the cursor so a later client starts fresh
+                        self.cursor = None
+                        self._gaps = {'metric': [], 'issue': []}
+                        self._thread = None
+                        return
+                try:
+                    self.poll()
+                except Exception as e:
+                    logger.error(f"Error polling metrics stream: {e}")
+                finally:
+                    close_old_connections()
+                time.sleep(self.poll_interval)
+        finally:
+            close_old_connections()
+
+    def poll(self):
+        """Query once for new rows and deliver them to every subscriber."""
+        if self.cursor is None:
+            self.cursor = current_cursor()
+            return
+
+        previous = self.cursor
+        now = time.monotonic()
+        late = self._late_events(now)
+        events, self.cursor = events_since(previous)
+        self._track_gaps(previous, events, now)
+        events = late + events
+
+        for name, (source, interval) in self.sources.items():
+            if now < self._source_due.get(name, 0):
+                continue
+            self._source_due[name] = now + interval
+            try:
+                events.append(StreamEvent(name, source()))
+            except Exception as e:
+                logger.error(f"Error reading {name} for the metrics stream: {e}")
+
+        if events:
+            self.publish(events)
+
+    def _track_gaps(self, previous, events, now):
+        for index, name in enumerate(('metric', 'issue')):
+            ids = [event.cursor[index] for event in events if event.name == name]
+            for low, high in _missing_ranges(previous[index], ids):
+                self._gaps[name].append([low, high, now + self.gap_timeout])
+
+    def _late_events(self, now):
+        """Events for rows that appeared in an id range skipped earlier."""
+        events = []
+        for name, model, serializer in (
+            ('metric', SystemMetric, SystemMetricSerializer),
+            ('issue', HardwareIssue, HardwareIssueSerializer),
+        ):
+            gaps = [gap for gap in self._gaps[name] if gap[2] > now]
+            if not gaps:
+                self._gaps[name] = gaps
+                continue
+
+            in_gaps = Q()
+            for low, high, _ in gaps:
+                in_gaps |= Q(id__gte=low, id__lte=high)
+            rows = list(model.objects.filter(in_gaps).order_by('id'))
+
+            for data in serializer(rows, many=True).data:
+                events.append(StreamEvent(name, data))
+                # Split the range around the row so it is not sent twice
+                for gap in gaps:
+                    low, high, deadline = gap
+                    if low <= data['id'] <= high:
+                        gaps.remove(gap)
+                        if low < data['id']:
+                            gaps.append([low, data['id'] - 1, deadline])
+                        if data['id'] < high:
+                            gaps.append([data['id'] + 1, high, deadline])
+                        break
+            self._gaps[name] = gaps
+        return events
+
+    def publish(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            for event in events:
+                if subscriber.closed:
+                    break
+                subscriber.put(event)
+
+
+_broadcaster = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster(sources=None):
+    """
+    Get the process-wide broadcaster, creating it on first use.
+
+    Args:
+        sources (dict, optional): Extra event sources, used on creation only
+    """
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                _broadcaster = Broadcaster(
+                    poll_interval=_config('STREAM_POLL_INTERVAL', 1.0),
+                    sources=sources,
+                    gap_timeout=_config('STREAM_GAP_TIMEOUT', 30.0),
+                )
+    return _broadcaster
+
+
+class EventStream:
+    """
+    Iterates the SSE bytes for one client, synchronously or asynchronously.
+
+    Events the client missed since ``cursor`` are sent first; live events
+    already covered by that backlog are skipped.
+    """
+
+    def __init__(self, broadcaster, cursor=None):
+        self.broadcaster = broadcaster
+        self.cursor = cursor
+        self.heartbeat = _config('STREAM_HEARTBEAT', 15)
+        self.backlog_limit = _config('STREAM_BACKLOG_LIMIT', 500)
+
+    def _backlog(self):
+        if self.cursor is None:
+            return []
+        events, self.cursor = events_since(self.cursor, limit=self.backlog_limit)
+        return [event.payload for event in events]
+
+    def _is_new(self, event):
+        if event.cursor is None or self.cursor is None:
+            return True
+        # Each event is judged by its own row's id; the other half of its
+        # cursor is whatever was current when it was built
+        index = 0 if event.name == 'metric' else 1
+        return event.cursor[index] > self.cursor[index]
+
+    def __iter__(self):
+        subscriber = self.broadcaster.subscribe()
+        try:
+            yield RETRY_PAYLOAD
+            yield from self._backlog()
+            while not subscriber.closed:
+                try:
+                    event = subscriber.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    # Keeps proxies from closing the connection and notices
+                    # clients that went away
+                    yield b': keepalive\n\n'
+                    continue
+                if event is not None and self._is_new(event):
+                    yield event.payload
+        finally:
+            self.broadcaster.unsubscribe(subscriber)
+
+    async def __aiter__(self):
+        from asgiref.sync import sync_to_async
+
+        subscriber = await sync_to_async(self.broadcaster.subscribe)(
+            loop=asyncio.get_running_loop()
+        )
+        try:
+            yield RETRY_PAYLOAD
+            for payload in await sync_to_async(self._backlog)():
+                yield payload
+            while not subscriber.closed:
+                try:
+                    event = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield b': keepalive\n\n'
+                    continue
+                if self._is_new(event):
+                    yield event.payload
+        finally:
+            self.broadcaster.unsubscribe(subscriber)
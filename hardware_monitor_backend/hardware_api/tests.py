@@ -0,0 +1,1694 @@
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import namedtuple
+from unittest import mock
+
+import numpy as np
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from hardware_api.admin import SystemMetricAdmin
+from hardware_api.dashboard import (
+    SNAPSHOT_KEY, get_snapshot_cache, publish_dashboard_snapshot
+)
+from hardware_api.downsample import load_columns, lttb_indices, minmax_indices, select_indices
+from hardware_api.forest import FlatForest
+from hardware_api.hardware_monitor import HardwareMonitorService, get_hardware_monitor
+from hardware_api.model_registry import ModelRegistry
+from hardware_api.models import SystemMetric, HardwareIssue, MetricRollup, ModelTrainingHistory, TrainingJob
+from hardware_api.pipeline import DEFAULT_FEATURES, FeaturePipeline, load_pipeline, schema_hash
+from hardware_api.probe_cache import ProbeCache, ProbeUnavailable, run_probes
+from hardware_api.renderers import FastJSONRenderer
+from hardware_api.ring_buffer import SampleRingBuffer, get_recent_samples_reader
+from hardware_api.samplers import CpuSampler
+from hardware_api.scheduler import CollectionScheduler
+from hardware_api.stream import RETRY_PAYLOAD, Broadcaster, EventStream, events_since, parse_cursor
+from hardware_api.rollups import aggregate_rollups, rebuild_rollups, recent_averages, update_rollups
+from hardware_api.sensors import REFRESH_CHECK_INTERVAL, HwmonReader, SensorCatalog, pick_cpu_temp_chip
+from hardware_api.training_jobs import expire_abandoned_jobs, run_training_job
+from hardware_api.views import get_gpu_info
+from hardware_api.write_buffer import MetricWriteBuffer
+
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def use_private_snapshot_cache(test):
+    """
+    Point the shared ``hardware_monitor`` cache at a directory of the test's
+    own, so it neither reads nor overwrites what a running collector stored.
+    """
+    location = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, location, ignore_errors=True)
+    override = test.settings(CACHES={**settings.CACHES, 'hardware_monitor': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': location,
+    }})
+    override.enable()
+    test.addCleanup(override.disable)
+
+
+CpuTimes = namedtuple('CpuTimes', ['user', 'system', 'idle'])
+
+
+class CpuSamplerTests(SimpleTestCase):
+    """CPU usage is measured between the sampler's own snapshots."""
+
+    def fake_cpu_times(self, *snapshots):
+        snapshots = iter(snapshots)
+        current = {}
+
+        def cpu_times(percpu=False):
+            # Each sample reads the total, then the per-core times
+            if not percpu:
+                current['times'] = CpuTimes(*next(snapshots))
+                return current['times']
+            return [current['times'], current['times']]
+        return mock.patch('hardware_api.samplers.psutil.cpu_times', cpu_times)
+
+    def test_sample_measures_busy_share_since_previous_sample(self):
+        with self.fake_cpu_times((0, 0, 0), (30, 10, 60), (30, 10, 160)):
+            sampler = CpuSampler(interval=0)
+            self.assertEqual(sampler.sample().total, 40.0)
+            sample = sampler.sample()
+        self.assertEqual(sample.total, 0.0)
+        self.assertEqual(sample.per_core, [0.0, 0.0])
+
+    def test_history_is_bounded(self):
+        sampler = CpuSampler(interval=0, history=3)
+        for _ in range(5):
+            sampler.sample()
+        self.assertEqual(len(sampler.history()), 3)
+
+    def test_first_reading_waits_for_one_interval(self):
+        sampler = CpuSampler(interval=0.05)
+        started = time.monotonic()
+        first = sampler.latest()
+        self.assertGreaterEqual(time.monotonic() - started, 0.05)
+        self.assertEqual(len(sampler.history()), 1)
+
+        # Later readings return the latest sample at once
+        self.assertEqual(sampler.latest()['timestamp'], first['timestamp'])
+        self.assertEqual(len(sampler.history()), 1)
+
+
+class CollectionSchedulerTests(SimpleTestCase):
+    """Probes run on their own cadence; results arrive on the loop thread."""
+
+    def test_probes_run_at_their_own_intervals(self):
+        results = []
+        scheduler = CollectionScheduler(on_result=lambda name, result: results.append(name))
+        scheduler.add('fast', lambda: 1, 0.02)
+        scheduler.add('slow', lambda: 1, 0.1, blocking=True)
+        scheduler.run(duration=0.25)
+
+        stats = scheduler.stats()
+        self.assertGreaterEqual(stats['fast']['runs'], 8)
+        self.assertIn(stats['slow']['runs'], (2, 3))
+        self.assertEqual(results.count('slow'), stats['slow']['runs'])
+
+    def test_blocking_probes_run_off_the_loop_thread(self):
+        threads = {}
+
+        def probe():
+            threads['probe'] = threading.get_ident()
+            return 'done'
+
+        def on_result(name, result):
+            threads['result'] = threading.get_ident()
+
+        scheduler = CollectionScheduler(on_result=on_result)
+        scheduler.add(
+            'probe', lambda prepared: probe(), 1, blocking=True,
+            prepare=lambda: threads.setdefault('prepare', threading.get_ident()),
+        )
+        scheduler.run(duration=0.05)
+
+        self.assertEqual(threads['prepare'], threads['result'])
+        self.assertNotEqual(threads['probe'], threads['result'])
+
+    def test_errors_and_missed_deadlines_are_counted(self):
+        def failing():
+            raise RuntimeError('sensor gone')
+
+        scheduler = CollectionScheduler()
+        scheduler.add('failing', failing, 0.02)
+        scheduler.add('overrunning', lambda: time.sleep(0.07), 0.02, blocking=True)
+        with self.assertLogs('hardware_api.scheduler', level='WARNING'):
+            scheduler.run(duration=0.2)
+
+        stats = scheduler.stats()
+        self.assertEqual(stats['failing']['errors'], stats['failing']['runs'])
+        self.assertGreater(stats['overrunning']['missed_deadlines'], 0)
+        self.assertEqual(stats['overrunning']['errors'], 0)
+
+    def test_interval_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            CollectionScheduler().add('probe', lambda: None, 0)
+
+
+class MetricWriteBufferTests(TestCase):
+    """Buffered samples are written in batches and survive a failed write."""
+
+    def setUp(self):
+        use_private_snapshot_cache(self)
+
+    def metric(self, cpu=10):
+        return SystemMetric(cpu_percent=cpu, memory_percent=50)
+
+    def test_flushes_when_batch_is_full(self):
+        buffer = MetricWriteBuffer(batch_size=2, max_age=60)
+        self.assertEqual(buffer.add(self.metric()), 0)
+        self.assertFalse(SystemMetric.objects.exists())
+        self.assertEqual(buffer.add(self.metric(), [HardwareIssue(issue_type='x', description='x')]), 2)
+        self.assertEqual(SystemMetric.objects.count(), 2)
+        self.assertEqual(HardwareIssue.objects.get().metric, SystemMetric.objects.order_by('id').last())
+
+    def test_flushes_when_oldest_sample_is_due(self):
+        buffer = MetricWriteBuffer(batch_size=100, max_age=0.02)
+        buffer.add(self.metric())
+        self.assertEqual(buffer.flush_if_due(), 0)
+        time.sleep(0.02)
+        self.assertEqual(buffer.flush_if_due(), 1)
+        self.assertEqual(len(buffer), 0)
+
+    def test_shutdown_drains_the_buffer(self):
+        monitor = HardwareMonitorService()
+        monitor.save_metrics({'cpu_percent': 5}, run_anomaly_detection=False, buffered=True)
+        self.assertFalse(SystemMetric.objects.exists())
+        monitor.cleanup()
+        self.assertEqual(SystemMetric.objects.count(), 1)
+
+    def test_failed_batch_is_retried_without_stale_ids(self):
+        buffer = MetricWriteBuffer(batch_size=100, max_age=60)
+        buffer.add(self.metric(1), [HardwareIssue(issue_type='x', description='x')])
+        with mock.patch.object(HardwareIssue.objects, 'bulk_create', side_effect=IntegrityError('boom')), \
+                self.assertLogs('hardware_api.write_buffer', level='ERROR'):
+            self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(buffer), 1)
+        self.assertFalse(SystemMetric.objects.exists())
+
+        # Another writer takes the ids the rolled-back batch had been given
+        SystemMetric.objects.create(cpu_percent=2, memory_percent=50)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(sorted(SystemMetric.objects.values_list('cpu_percent', flat=True)), [1, 2])
+        self.assertEqual(HardwareIssue.objects.get().metric.cpu_percent, 1)
+
+    def test_snapshot_published_on_flush_includes_written_issues(self):
+        # What the collector does, so the dashboard sees each new anomaly
+        buffer = MetricWriteBuffer(batch_size=100, max_age=60, on_flush=lambda batch: publish_dashboard_snapshot(
+            {'cpu_percent': batch[-1][0].cpu_percent}, model_trained=False
+        ))
+        metric = SystemMetric(cpu_percent=97, memory_percent=50, is_anomaly=True)
+        buffer.add(metric, [HardwareIssue(issue_type='High CPU Usage', description='x', recommendation='y')])
+        self.assertIsNone(get_snapshot_cache().get(SNAPSHOT_KEY))
+
+        buffer.flush()
+        snapshot = get_snapshot_cache().get(SNAPSHOT_KEY)
+        self.assertEqual(snapshot['current_state'], {'cpu_percent': 97})
+        self.assertEqual(len(snapshot['recent_anomalies']), 1)
+        self.assertEqual(snapshot['recent_anomalies'][0]['issues'][0]['type'], 'High CPU Usage')
+        self.assertEqual([issue['issue_type'] for issue in snapshot['unresolved_issues']], ['High CPU Usage'])
+
+    def test_pending_samples_are_bounded(self):
+        buffer = MetricWriteBuffer(batch_size=100, max_age=60, max_pending=2)
+        for cpu in range(3):
+            buffer.add(self.metric(cpu))
+        with mock.patch.object(SystemMetric.objects, 'bulk_create', side_effect=IntegrityError('boom')), \
+                self.assertLogs('hardware_api.write_buffer', level='ERROR'):
+            buffer.flush()
+        self.assertEqual([metric.cpu_percent for metric, _ in buffer._pending], [1, 2])
+
+
+class SampleRingBufferTests(SimpleTestCase):
+    """Readers get consistent rows, oldest first, while the collector writes."""
+
+    def filled(self, capacity, rows):
+        buffer = SampleRingBuffer.in_memory(capacity)
+        for i in range(rows):
+            buffer.append({'timestamp': float(i), 'cpu_percent': i * 10.0})
+        return buffer
+
+    def timestamps(self, buffer, **kwargs):
+        return buffer.snapshot(**kwargs)['timestamp'].tolist()
+
+    def test_partly_filled_buffer(self):
+        buffer = self.filled(5, 3)
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(self.timestamps(buffer), [0, 1, 2])
+        self.assertTrue(np.isnan(buffer.snapshot()['memory_percent']).all())
+
+    def test_wraparound_keeps_newest_rows_in_order(self):
+        buffer = self.filled(5, 12)
+        self.assertEqual(len(buffer), 5)
+        # Slot 12 % 5 holds row 7, but it is the next one the writer fills
+        self.assertEqual(self.timestamps(buffer), [8, 9, 10, 11])
+
+    def test_since_and_limit(self):
+        buffer = self.filled(10, 8)
+        self.assertEqual(self.timestamps(buffer, since=5), [6, 7])
+        self.assertEqual(self.timestamps(buffer, since=7), [])
+        self.assertEqual(self.timestamps(buffer, limit=3), [5, 6, 7])
+        self.assertEqual(self.timestamps(buffer, since=2, limit=2), [6, 7])
+        self.assertEqual(self.timestamps(buffer, limit=0), [])
+
+    def racing(self, buffer, write):
+        """Run ``write`` while the reader copies the rows."""
+        data = buffer._data
+
+        class Racing:
+            def __getitem__(self, key):
+                write(data)
+                return data[key]
+        buffer._data = Racing()
+
+    def test_row_being_written_is_dropped(self):
+        buffer = self.filled(5, 7)
+        # The writer is half-way through row 7, in the oldest slot
+        self.racing(buffer, lambda data: data.__setitem__((7 % 5, 0), -1.0))
+        self.assertEqual(self.timestamps(buffer), [3, 4, 5, 6])
+
+    def test_rows_overwritten_during_copy_are_dropped(self):
+        buffer = self.filled(5, 7)
+
+        def write(data):
+            # Rows 7 and 8 complete and row 9 starts while the reader copies
+            for row in (7, 8):
+                data[row % 5] = row
+                buffer._header[3] = row + 1
+            data[9 % 5, 0] = -1.0
+        self.racing(buffer, write)
+        self.assertEqual(self.timestamps(buffer), [5, 6])
+
+    def test_recreating_the_file_leaves_readers_intact(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'recent.bin')
+        override = self.settings(HARDWARE_MONITOR=dict(settings.HARDWARE_MONITOR, RECENT_SAMPLES_PATH=path))
+        override.enable()
+        self.addCleanup(override.disable)
+
+        writer = SampleRingBuffer.create(path, 100)
+        writer.append({'timestamp': 1.0})
+        reader = get_recent_samples_reader()
+        self.assertEqual(self.timestamps(reader), [1])
+
+        # A restarted collector with a smaller buffer
+        writer = SampleRingBuffer.create(path, 10)
+        writer.append({'timestamp': 2.0})
+        self.assertEqual(self.timestamps(reader), [1])
+        self.assertEqual(self.timestamps(get_recent_samples_reader()), [2])
+        self.assertEqual(os.listdir(directory), ['recent.bin'])
+
+
+class HwmonReaderTests(SimpleTestCase):
+    """HwmonReader against a fake /sys/class/hwmon tree."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+        write_file(os.path.join(self.root, 'hwmon0', 'name'), 'coretemp\n')
+        write_file(os.path.join(self.root, 'hwmon0', 'temp1_input'), '45000\n')
+        write_file(os.path.join(self.root, 'hwmon0', 'temp1_label'), 'Package id 0\n')
+        write_file(os.path.join(self.root, 'hwmon0', 'temp2_input'), '43500\n')
+
+        # Older drivers keep their inputs under device/
+        write_file(os.path.join(self.root, 'hwmon1', 'name'), 'nct6775\n')
+        write_file(os.path.join(self.root, 'hwmon1', 'device', 'fan1_input'), '1200\n')
+        write_file(os.path.join(self.root, 'hwmon1', 'device', 'fan1_label'), 'CPU Fan\n')
+        write_file(os.path.join(self.root, 'hwmon1', 'device', 'fan2_input'), '0\n')
+
+        self.reader = HwmonReader(root=self.root)
+        self.addCleanup(self.reader.close)
+
+    def test_discovers_inputs_once(self):
+        self.assertEqual(
+            [(s.chip, s.kind, s.index, s.label) for s in self.reader.sensors],
+            [
+                ('coretemp', 'temp', 1, 'Package id 0'),
+                ('coretemp', 'temp', 2, 'temp2'),
+                ('nct6775', 'fan', 1, 'CPU Fan'),
+                ('nct6775', 'fan', 2, 'fan2'),
+            ]
+        )
+
+    def test_reads_fans_and_temperatures(self):
+        self.assertEqual(self.reader.read_temperatures(), {
+            'coretemp': [('Package id 0', 45.0), ('temp2', 43.5)],
+        })
+        self.assertEqual(self.reader.read_fans(), [
+            {'chip': 'nct6775', 'label': 'CPU Fan', 'rpm': 1200.0},
+            {'chip': 'nct6775', 'label': 'fan2', 'rpm': 0.0},
+        ])
+
+    def test_rereads_through_cached_descriptor(self):
+        self.reader.read_fans()
+        path = os.path.join(self.root, 'hwmon1', 'device', 'fan1_input')
+        # Rewrite in place so the cached descriptor sees the new value
+        with open(path, 'r+') as f:
+            f.write('1850\n')
+
+        self.assertEqual(self.reader.read_fans()[0]['rpm'], 1850.0)
+
+    def test_unreadable_sensor_is_skipped(self):
+        write_file(os.path.join(self.root, 'hwmon0', 'temp2_input'), 'N/A\n')
+
+        self.assertEqual(self.reader.read_temperatures(), {
+            'coretemp': [('Package id 0', 45.0)],
+        })
+
+    def test_rediscovery_does_not_disturb_concurrent_reads(self):
+        temp = self.reader.sensors[0]
+        values, stop = set(), threading.Event()
+
+        def read():
+            while not stop.is_set():
+                values.add(self.reader.read(temp))
+
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for thread in readers:
+            thread.start()
+        for _ in range(200):
+            self.reader.discover()
+            self.reader.read_fans()
+        stop.set()
+        for thread in readers:
+            thread.join()
+        self.assertEqual(values, {45.0})
+
+    def test_missing_tree(self):
+        reader = HwmonReader(root=os.path.join(self.root, 'missing'))
+        self.assertFalse(reader.available)
+        self.assertEqual(reader.read_fans(), [])
+
+
+class SensorCatalogTests(SimpleTestCase):
+    """Canonical source selection over a fake hwmon tree."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+        write_file(os.path.join(self.root, 'hwmon0', 'name'), 'acpitz\n')
+        write_file(os.path.join(self.root, 'hwmon0', 'temp1_input'), '30000\n')
+        write_file(os.path.join(self.root, 'hwmon1', 'name'), 'k10temp\n')
+        write_file(os.path.join(self.root, 'hwmon1', 'temp1_input'), '52000\n')
+        write_file(os.path.join(self.root, 'hwmon1', 'temp1_label'), 'Tctl\n')
+        write_file(os.path.join(self.root, 'hwmon2', 'name'), 'thinkpad\n')
+        write_file(os.path.join(self.root, 'hwmon2', 'fan1_input'), '2100\n')
+
+        self.hwmon = HwmonReader(root=self.root)
+        self.addCleanup(self.hwmon.close)
+        self.catalog = SensorCatalog(hwmon=self.hwmon)
+
+    def test_pick_cpu_temp_chip(self):
+        self.assertEqual(pick_cpu_temp_chip(['acpitz', 'coretemp']), 'coretemp')
+        self.assertEqual(pick_cpu_temp_chip(['acpitz', 'cpu0_thermal']), 'cpu0_thermal')
+        self.assertEqual(pick_cpu_temp_chip(['acpitz']), 'acpitz')
+        self.assertIsNone(pick_cpu_temp_chip([]))
+
+    def test_resolves_canonical_sources(self):
+        catalog = self.catalog.as_dict()
+        self.assertEqual(catalog['cpu_temperature'], {'backend': 'hwmon', 'chip': 'k10temp', 'label': 'Tctl'})
+        self.assertEqual(catalog['fan'], {'backend': 'hwmon', 'chip': 'thinkpad', 'label': 'fan1'})
+        self.assertEqual(catalog['chips']['temperature'], ['acpitz', 'k10temp'])
+        self.assertNotIn('temperature', self.catalog.unsupported)
+        self.assertNotIn('fans', self.catalog.unsupported)
+
+        self.assertEqual(self.catalog.read_cpu_temp(), 52.0)
+        self.assertEqual(self.catalog.read_fan_speed(), 2100.0)
+
+    def test_refresh_picks_up_hot_plugged_chip(self):
+        write_file(os.path.join(self.root, 'hwmon3', 'name'), 'coretemp\n')
+        write_file(os.path.join(self.root, 'hwmon3', 'temp1_input'), '61000\n')
+
+        self.assertEqual(self.catalog.read_cpu_temp(), 52.0)
+        self.catalog.refresh()
+        self.assertEqual(self.catalog.read_cpu_temp(), 61.0)
+
+    def test_requested_refresh_reaches_other_processes(self):
+        use_private_snapshot_cache(self)
+        # The catalog of another process, built before the chip appeared
+        other = SensorCatalog(hwmon=HwmonReader(root=self.root))
+        self.addCleanup(other.hwmon.close)
+
+        write_file(os.path.join(self.root, 'hwmon3', 'name'), 'coretemp\n')
+        write_file(os.path.join(self.root, 'hwmon3', 'temp1_input'), '61000\n')
+        self.catalog.request_refresh()
+
+        # Checked at most once per interval
+        self.assertFalse(other.refresh_if_requested())
+        other._checked_at -= REFRESH_CHECK_INTERVAL
+        self.assertTrue(other.refresh_if_requested())
+        self.assertEqual(other.read_cpu_temp(), 61.0)
+
+        other._checked_at -= REFRESH_CHECK_INTERVAL
+        self.assertFalse(other.refresh_if_requested())
+
+
+class ProbeCacheTests(SimpleTestCase):
+    """TTLs, cached failures and single-flight misses of the probe cache."""
+
+    def setUp(self):
+        self.now = 1000.0
+        self.cache = ProbeCache(clock=lambda: self.now)
+        self.calls = 0
+
+    def probe(self):
+        self.calls += 1
+        return self.calls
+
+    def failing_probe(self):
+        self.calls += 1
+        raise ProbeUnavailable('not here')
+
+    def test_results_expire_after_ttl(self):
+        self.assertEqual(self.cache.get('key', self.probe, ttl=10), 1)
+        self.now += 9
+        self.assertEqual(self.cache.get('key', self.probe, ttl=10), 1)
+        self.now += 2
+        self.assertEqual(self.cache.get('key', self.probe, ttl=10), 2)
+
+        # No TTL: kept for the life of the process
+        self.assertEqual(self.cache.get('static', self.probe), 3)
+        self.now += 10 ** 6
+        self.assertEqual(self.cache.get('static', self.probe), 3)
+
+    def test_failures_are_cached_for_negative_ttl(self):
+        for _ in range(3):
+            with self.assertRaises(ProbeUnavailable):
+                self.cache.get('gpu', self.failing_probe, negative_ttl=60)
+        self.assertEqual(self.calls, 1)
+
+        self.now += 61
+        with self.assertRaises(ProbeUnavailable):
+            self.cache.get('gpu', self.failing_probe, negative_ttl=60)
+        self.assertEqual(self.calls, 2)
+
+        # Without a negative TTL every call runs the probe again
+        for _ in range(2):
+            with self.assertRaises(ProbeUnavailable):
+                self.cache.get('other', self.failing_probe)
+        self.assertEqual(self.calls, 4)
+
+    def test_cached_failure_traceback_does_not_grow(self):
+        depths = []
+        for _ in range(5):
+            try:
+                self.cache.get('gpu', self.failing_probe, negative_ttl=60)
+            except ProbeUnavailable as e:
+                depths.append(len(traceback.extract_tb(e.__traceback__)))
+        self.assertEqual(len(set(depths[1:])), 1)
+        self.assertLessEqual(depths[-1], depths[0])
+
+    def test_cached_failure_keeps_type_and_attributes(self):
+        def timing_out_probe():
+            raise subprocess.TimeoutExpired(['nvidia-smi'], 5)
+
+        for _ in range(2):
+            with self.assertRaises(subprocess.TimeoutExpired) as ctx:
+                self.cache.get('gpu', timing_out_probe, negative_ttl=60)
+        self.assertEqual(ctx.exception.cmd, ['nvidia-smi'])
+        self.assertEqual(ctx.exception.timeout, 5)
+        self.assertIn('timed out after 5 seconds', str(ctx.exception))
+
+    def test_concurrent_misses_run_the_probe_once(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_probe():
+            self.calls += 1
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.cache.get('slow', slow_probe, ttl=10)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        started.wait(5)
+        time.sleep(0.05)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, ['value'] * 4)
+        self.assertEqual(self.calls, 1)
+
+    def test_no_gpu_is_cached_as_unavailable(self):
+        gputil = mock.Mock()
+        gputil.getGPUs.return_value = []
+        with mock.patch('hardware_api.views.probe_cache', self.cache), \
+                mock.patch('hardware_api.views.import_gputil', return_value=gputil):
+            for _ in range(3):
+                self.assertIn('note', get_gpu_info()[0])
+        self.assertEqual(gputil.getGPUs.call_count, 1)
+
+
+class RunProbesTests(SimpleTestCase):
+    """Each system-info probe is bounded by its own deadline."""
+
+    def test_slow_probe_times_out_within_its_deadline(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        start = time.monotonic()
+        results = run_probes(
+            {'hung-probe': lambda: release.wait(5), 'quick-probe': lambda: {'ok': True}},
+            deadlines={'hung-probe': 0.2},
+        )
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(results['hung-probe'], {'status': 'timeout'})
+        self.assertEqual(results['quick-probe'], {'ok': True})
+
+    def test_raising_probe_reports_an_error(self):
+        def broken():
+            raise OSError('sensor went away')
+
+        results = run_probes({'broken-probe': broken, 'quick-probe': lambda: 1})
+        self.assertEqual(results['broken-probe'], {'status': 'error', 'error': 'sensor went away'})
+        self.assertEqual(results['quick-probe'], 1)
+
+
+class QueryPlanTests(TestCase):
+    """Every hot endpoint must reach metrics, issues and rollups through an index."""
+
+    TABLES = (
+        SystemMetric._meta.db_table,
+        HardwareIssue._meta.db_table,
+        MetricRollup._meta.db_table,
+    )
+    PARTIAL_INDEXES = {
+        index.name
+        for model in (SystemMetric, HardwareIssue, MetricRollup)
+        for index in model._meta.indexes if index.condition is not None
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for i in range(20):
+            metric = SystemMetric.objects.create(
+                timestamp=now - timezone.timedelta(hours=i),
+                cpu_percent=50 + i,
+                is_anomaly=i % 5 == 0,
+            )
+            if metric.is_anomaly:
+                HardwareIssue.objects.create(
+                    metric=metric,
+                    timestamp=metric.timestamp,
+                    issue_type='High CPU Usage',
+                    description='CPU usage is high',
+                    recommendation='Close unused applications',
+                    is_resolved=i % 10 == 0,
+                )
+        rebuild_rollups()
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plan assertions are written for SQLite')
+        self.client = APIClient()
+        # An empty cache makes the dashboard build its snapshot
+        use_private_snapshot_cache(self)
+
+    def assert_uses_index(self, method, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 500, url)
+
+        checked = 0
+        for query in ctx.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                plan = [row[-1] for row in cursor.fetchall()]
+            for step in plan:
+                table = next((t for t in self.TABLES if f' {t}' in step), None)
+                if table is None or not step.startswith(('SCAN', 'SEARCH')):
+                    continue
+                checked += 1
+                # SEARCH is a keyed lookup. A SCAN reads the whole index, so
+                # it is only acceptable for an unfiltered newest-first read
+                # that stops at its LIMIT, or over a partial index that
+                # holds only the rows the filter asks for.
+                if step.startswith('SEARCH'):
+                    continue
+                index = re.search(r'USING (?:COVERING )?INDEX (\w+)', step)
+                self.assertIsNotNone(index, f'{url} scans {table} without an index:\n{sql}')
+                if ' WHERE ' in sql:
+                    self.assertIn(
+                        index.group(1), self.PARTIAL_INDEXES,
+                        f'{url} filters {table} by scanning all of {index.group(1)}:\n{sql}'
+                    )
+        self.assertTrue(checked, f'{url} ran no queries against {self.TABLES}')
+
+    def test_latest(self):
+        self.assert_uses_index('get', '/api/metrics/latest/')
+
+    def test_statistics(self):
+        self.assert_uses_index('get', '/api/metrics/statistics/?days=7')
+
+    def test_anomalies(self):
+        self.assert_uses_index('get', '/api/metrics/anomalies/?days=30')
+
+    def test_cleanup(self):
+        self.assert_uses_index('delete', '/api/metrics/cleanup/?days=90')
+
+    def test_metric_date_range(self):
+        start = (timezone.now() - timezone.timedelta(days=1)).isoformat()
+        self.assert_uses_index('get', f'/api/metrics/?start_date={start.replace("+", "%2B")}')
+
+    def test_unresolved_issues(self):
+        self.assert_uses_index('get', '/api/issues/unresolved/')
+
+    def test_unresolved_issues_cursor(self):
+        self.assert_uses_index('get', '/api/issues/unresolved/?cursor=')
+
+    def test_issue_summary(self):
+        self.assert_uses_index('get', '/api/issues/summary/?days=30')
+
+    def test_issues_by_type(self):
+        self.assert_uses_index('get', '/api/issues/?issue_type=High%20CPU%20Usage&is_resolved=false')
+
+    def test_dashboard(self):
+        self.assert_uses_index('get', '/api/dashboard/')
+
+
+class RollupTests(TestCase):
+    """Rollups kept up to date incrementally must equal a rebuild from raw rows."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.start = timezone.now().replace(second=0, microsecond=0) - timezone.timedelta(days=4)
+
+    def create_metrics(self, count, step=timezone.timedelta(minutes=23)):
+        metrics = []
+        for i in range(count):
+            metrics.append(SystemMetric.objects.create(
+                timestamp=self.start + step * i + timezone.timedelta(seconds=i % 50),
+                cpu_percent=10 + i % 70,
+                memory_percent=40 + i % 13,
+                # Sensors that only report now and then
+                cpu_temp=None if i % 3 else 50 + i % 20,
+                fan_speed=None if i % 4 else 1200 + i,
+                battery_percent=None,
+                is_anomaly=i % 7 == 0,
+            ))
+        return metrics
+
+    def rollup_state(self):
+        state = {}
+        for row in MetricRollup.objects.values():
+            del row['id']
+            key = (row.pop('granularity'), row.pop('bucket'))
+            state[key] = {name: round(value, 6) if isinstance(value, float) else value
+                          for name, value in row.items()}
+        return state
+
+    def assert_matches_rebuild(self):
+        incremental = self.rollup_state()
+        rebuild_rollups()
+        self.assertEqual(incremental, self.rollup_state())
+
+    def test_incremental_updates_match_rebuild(self):
+        metrics = self.create_metrics(200)
+        # In several batches, so buckets are both created and merged into
+        for first in range(0, len(metrics), 30):
+            update_rollups(metrics[first:first + 30])
+        self.assert_matches_rebuild()
+
+    def test_averages_leave_out_null_samples(self):
+        timestamp = self.start + timezone.timedelta(seconds=5)
+        metrics = [
+            SystemMetric.objects.create(timestamp=timestamp, cpu_percent=20, cpu_temp=60, fan_speed=None),
+            SystemMetric.objects.create(timestamp=timestamp, cpu_percent=40, cpu_temp=None, fan_speed=None),
+        ]
+        update_rollups(metrics)
+
+        totals = aggregate_rollups(MetricRollup.objects.filter(granularity=MetricRollup.HOUR))
+        self.assertEqual(totals['cpu_percent']['avg'], 30.0)
+        self.assertEqual(totals['cpu_temp']['avg'], 60.0)
+        self.assertIsNone(totals['fan_speed']['avg'])
+        self.assertEqual(recent_averages(['cpu_temp'])['cpu_temp'], [60.0])
+
+    def test_api_changes_keep_rollups_in_step(self):
+        update_rollups(self.create_metrics(20))
+
+        response = self.client.post('/api/metrics/', {
+            'timestamp': (self.start + timezone.timedelta(minutes=5)).isoformat(),
+            'cpu_percent': 99.0,
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assert_matches_rebuild()
+
+        # Lowering the bucket maximum and moving the metric to another bucket
+        created = response.json()['id']
+        response = self.client.patch(f'/api/metrics/{created}/', {
+            'timestamp': (self.start + timezone.timedelta(hours=5)).isoformat(),
+            'cpu_percent': 1.0,
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assert_matches_rebuild()
+
+        response = self.client.delete(f'/api/metrics/{created}/')
+        self.assertEqual(response.status_code, 204)
+        self.assert_matches_rebuild()
+
+    def test_cleanup_drops_rollups_of_deleted_metrics(self):
+        self.start = timezone.now() - timezone.timedelta(days=100)
+        update_rollups(self.create_metrics(100, step=timezone.timedelta(days=1)))
+
+        response = self.client.delete('/api/metrics/cleanup/?days=90')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.json()['deleted_count'], 0)
+        self.assert_matches_rebuild()
+
+    def test_admin_changes_keep_rollups_in_step(self):
+        metrics = self.create_metrics(60)
+        update_rollups(metrics)
+        model_admin = SystemMetricAdmin(SystemMetric, admin.site)
+
+        metric = metrics[1]
+        metric.cpu_percent = 0
+        model_admin.save_model(None, metric, None, True)
+        self.assert_matches_rebuild()
+
+        model_admin.delete_model(None, metrics[2])
+        self.assert_matches_rebuild()
+
+        # More changed buckets than are refreshed one by one
+        model_admin.delete_queryset(None, SystemMetric.objects.filter(id__in=[m.id for m in metrics[10:50]]))
+        self.assert_matches_rebuild()
+
+
+class StreamTests(TransactionTestCase):
+    """One poll fans each new row out to every client of the stream."""
+
+    def setUp(self):
+        # Poll by hand instead of from the broadcaster's thread
+        patcher = mock.patch.object(Broadcaster, '_run')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.broadcaster = Broadcaster(queue_size=3)
+
+    def drain(self, subscriber):
+        events = []
+        while not subscriber.queue.empty():
+            events.append(subscriber.queue.get_nowait())
+        return events
+
+    def data(self, event):
+        return json.loads(event.payload.split(b'data: ')[1])
+
+    def test_fan_out(self):
+        first = self.broadcaster.subscribe()
+        second = self.broadcaster.subscribe()
+        metric = SystemMetric.objects.create(cpu_percent=10)
+        issue = HardwareIssue.objects.create(
+            metric=metric, issue_type='High CPU', description='', recommendation=''
+        )
+        self.broadcaster.poll()
+
+        events = self.drain(first)
+        self.assertEqual([event.name for event in events], ['metric', 'issue'])
+        self.assertEqual(events[1].cursor, (metric.id, issue.id))
+        # Encoded once and shared by every client
+        self.assertEqual(self.drain(second), events)
+
+    def test_slow_subscriber_is_dropped(self):
+        fast = self.broadcaster.subscribe()
+        slow = self.broadcaster.subscribe()
+        received = []
+        for i in range(4):
+            SystemMetric.objects.create(cpu_percent=i)
+            self.broadcaster.poll()
+            received.extend(self.drain(fast))
+
+        self.assertEqual(len(received), 4)
+        self.assertFalse(fast.closed)
+        self.assertTrue(slow.closed)
+
+    def test_resume_from_last_event_id(self):
+        seen = SystemMetric.objects.create(cpu_percent=1)
+        missed = SystemMetric.objects.create(cpu_percent=2)
+        chunks = iter(EventStream(self.broadcaster, parse_cursor(f'{seen.id}:0')))
+
+        self.assertEqual(next(chunks), RETRY_PAYLOAD)
+        self.assertTrue(next(chunks).startswith(f'id: {missed.id}:0\n'.encode()))
+        # Live events the backlog already covered are not sent twice
+        self.broadcaster.publish(events_since((seen.id, 0))[0])
+        new = SystemMetric.objects.create(cpu_percent=3)
+        self.broadcaster.poll()
+        self.assertTrue(next(chunks).startswith(f'id: {new.id}:0\n'.encode()))
+
+        chunks.close()
+        self.assertEqual(self.broadcaster.subscriber_count, 0)
+
+    def test_live_poll_overlapping_the_backlog(self):
+        metric = SystemMetric.objects.create(cpu_percent=1)
+        issue = HardwareIssue.objects.create(
+            metric=metric, issue_type='High CPU', description='', recommendation=''
+        )
+        chunks = iter(EventStream(self.broadcaster, (metric.id, 0)))
+        next(chunks)
+        # The backlog sends the issue
+        self.assertTrue(next(chunks).startswith(f'id: {metric.id}:{issue.id}\n'.encode()))
+
+        # A live poll that started before the backlog brings a new metric
+        # and the issue the backlog already sent
+        new = SystemMetric.objects.create(cpu_percent=2)
+        self.broadcaster.publish(events_since((metric.id, 0))[0])
+        later = SystemMetric.objects.create(cpu_percent=3)
+        self.broadcaster.publish(events_since((new.id, issue.id))[0])
+
+        self.assertTrue(next(chunks).startswith(f'id: {new.id}:0\n'.encode()))
+        self.assertTrue(next(chunks).startswith(f'id: {later.id}:{issue.id}\n'.encode()))
+        chunks.close()
+
+    def test_async_stream(self):
+        async def consume():
+            chunks = EventStream(self.broadcaster).__aiter__()
+            first = await chunks.__anext__()
+            metric = await sync_to_async(SystemMetric.objects.create)(cpu_percent=5)
+            await sync_to_async(self.broadcaster.poll)()
+            payload = await asyncio.wait_for(chunks.__anext__(), 5)
+            await chunks.aclose()
+            return first, metric, payload
+
+        first, metric, payload = asyncio.run(consume())
+        self.assertEqual(first, RETRY_PAYLOAD)
+        self.assertTrue(payload.startswith(f'id: {metric.id}:0\n'.encode()))
+        self.assertEqual(self.broadcaster.subscriber_count, 0)
+
+    def test_rows_committed_out_of_id_order_are_sent(self):
+        subscriber = self.broadcaster.subscribe()
+        first = SystemMetric.objects.create(cpu_percent=1)
+        # The transaction holding the next id commits after the one after it
+        later = SystemMetric.objects.create(id=first.id + 2, cpu_percent=3)
+        self.broadcaster.poll()
+        late = SystemMetric.objects.create(id=first.id + 1, cpu_percent=2)
+        self.broadcaster.poll()
+        self.broadcaster.poll()
+
+        events = self.drain(subscriber)
+        self.assertEqual(
+            [self.data(event)['id'] for event in events], [first.id, later.id, late.id]
+        )
+        # Sent without an ID, so Last-Event-ID does not move backwards
+        self.assertIsNone(events[2].cursor)
+        self.assertNotIn(b'id: ', events[2].payload)
+
+    def test_skipped_ids_are_given_up_after_the_timeout(self):
+        self.broadcaster.gap_timeout = 0
+        subscriber = self.broadcaster.subscribe()
+        first = SystemMetric.objects.create(cpu_percent=1)
+        SystemMetric.objects.create(id=first.id + 2, cpu_percent=3)
+        self.broadcaster.poll()
+        SystemMetric.objects.create(id=first.id + 1, cpu_percent=2)
+        self.broadcaster.poll()
+
+        self.assertEqual(len(self.drain(subscriber)), 2)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages walk (timestamp, id) order without counting or offsets."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        # Pairs of rows share a timestamp so ties are broken by id
+        for i in range(25):
+            SystemMetric.objects.create(
+                timestamp=now - timezone.timedelta(minutes=i // 2),
+                cpu_percent=i,
+                is_anomaly=i % 3 == 0,
+            )
+        cls.expected = list(
+            SystemMetric.objects.order_by('-timestamp', '-id').values_list('id', flat=True)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def walk(self, url):
+        ids, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            pages.append(response.data)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids, pages
+
+    def test_walks_every_row_once(self):
+        ids, pages = self.walk('/api/metrics/?cursor=&page_size=4')
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(len(pages), 7)
+        self.assertIsNone(pages[0]['previous'])
+        self.assertNotIn('count', pages[0])
+
+    def test_ascending(self):
+        ids, _ = self.walk('/api/metrics/?cursor=&page_size=4&ordering=timestamp')
+        self.assertEqual(ids, self.expected[::-1])
+
+    def test_previous_link_returns_the_earlier_page(self):
+        first = self.client.get('/api/metrics/?cursor=&page_size=4').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(
+            [row['id'] for row in back['results']],
+            [row['id'] for row in first['results']]
+        )
+        self.assertIsNone(back['previous'])
+
+    def test_count_only_on_request(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/metrics/?cursor=')
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+
+        response = self.client.get('/api/metrics/?cursor=&count=true&is_anomaly=true')
+        self.assertEqual(response.data['count'], 9)
+
+    def test_anomalies_action(self):
+        ids, _ = self.walk('/api/metrics/anomalies/?cursor=&page_size=2')
+        expected = list(
+            SystemMetric.objects.filter(is_anomaly=True).order_by('-timestamp', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_page_numbers_still_work(self):
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual(len(response.data['results']), 25)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/metrics/?cursor=garbage').status_code, 404)
+        self.assertEqual(
+            self.client.get('/api/metrics/?cursor=&ordering=cpu_percent').status_code, 400
+        )
+
+    def test_deep_page_seeks_the_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plan assertions are written for SQLite')
+        _, pages = self.walk('/api/metrics/?cursor=&page_size=4')
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(pages[-2]['next'])
+        sql = ctx.captured_queries[-1]['sql']
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        # A range search on the timestamp index, not a scan and sort
+        self.assertIn('SEARCH', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class MetricExportTests(TestCase):
+    """Exports stream every row in the range, oldest first."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for i in range(12):
+            SystemMetric.objects.create(
+                timestamp=now - timezone.timedelta(hours=i), cpu_percent=i
+            )
+        cls.now = now
+
+    def export(self, query):
+        response = self.client.get(f'/api/export/metrics/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response, body = self.export('format=csv&fields=id,cpu_percent')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(body.decode())))
+        self.assertEqual(rows[0], ['id', 'cpu_percent'])
+        self.assertEqual([float(r[1]) for r in rows[1:]], [float(i) for i in range(11, -1, -1)])
+
+    def test_csv_timestamps_match_ndjson(self):
+        _, body = self.export('format=csv&fields=timestamp')
+        csv_rows = list(csv.reader(io.StringIO(body.decode())))[1:]
+        _, body = self.export('format=ndjson&fields=timestamp')
+        ndjson_rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([r[0] for r in csv_rows], [r['timestamp'] for r in ndjson_rows])
+        self.assertEqual(csv_rows[-1][0], self.now.isoformat())
+
+    def test_ndjson_time_range(self):
+        start = (self.now - timezone.timedelta(hours=2, minutes=30)).isoformat()
+        _, body = self.export(f'format=ndjson&start_date={start.replace("+", "%2B")}')
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual([r['cpu_percent'] for r in rows], [2, 1, 0])
+        self.assertEqual(rows[-1]['timestamp'], self.now.isoformat())
+
+    def test_gzip(self):
+        response, body = self.export('format=ndjson&gzip=true')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('metrics.ndjson.gz', response['Content-Disposition'])
+        self.assertEqual(len(gzip.decompress(body).splitlines()), 12)
+
+    def test_rejects_bad_parameters(self):
+        for query in ('format=xml', 'start_date=yesterday', 'start_date=2024-13-45T00:00:00',
+                      'fields=id,password'):
+            self.assertEqual(self.client.get(f'/api/export/metrics/?{query}').status_code, 400)
+
+    def test_command_rejects_impossible_dates(self):
+        with self.assertRaisesMessage(CommandError, '--start must be an ISO 8601 datetime'):
+            call_command('export_metrics', start='2024-13-45T00:00:00', stdout=io.StringIO())
+
+
+class DownsampleTests(SimpleTestCase):
+    """Downsampling keeps at most N real points, spikes included."""
+
+    def setUp(self):
+        self.x = np.arange(10_000, dtype=np.float64)
+        self.y = np.sin(self.x / 500)
+        self.y[4321] = 50.0
+        self.y[7000] = -50.0
+
+    def test_lttb_keeps_spikes_and_endpoints(self):
+        indices = lttb_indices(self.x, self.y, 200)
+        self.assertEqual(len(indices), 200)
+        self.assertEqual((indices[0], indices[-1]), (0, 9999))
+        self.assertIn(4321, indices)
+        self.assertIn(7000, indices)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_minmax_keeps_spikes(self):
+        indices = minmax_indices(self.x, self.y, 200)
+        self.assertLessEqual(len(indices), 200)
+        self.assertIn(4321, indices)
+        self.assertIn(7000, indices)
+
+    def test_missing_values(self):
+        y = self.y.copy()
+        y[::3] = np.nan
+        for pick in (lttb_indices, minmax_indices):
+            self.assertLessEqual(len(pick(self.x, y, 100)), 100)
+
+    def test_each_series_keeps_its_spikes(self):
+        other = np.cos(self.x / 300)
+        other[123] = 99.0
+        indices = select_indices(self.x, [self.y, other], 300)
+        self.assertLessEqual(len(indices), 300)
+        for spike in (4321, 7000, 123):
+            self.assertIn(spike, indices)
+
+    def test_several_series_fill_the_budget(self):
+        rng = np.random.default_rng(0)
+        series = [rng.normal(size=500), np.full(500, 40.0), np.cumsum(rng.normal(size=500))]
+        x = np.arange(500, dtype=np.float64)
+        for method in ('lttb', 'minmax'):
+            for n in (10, 30, 300):
+                indices = select_indices(x, series, n, method)
+                self.assertLessEqual(len(indices), n)
+                self.assertGreaterEqual(len(indices), n * 0.9, (method, n))
+
+
+class DownsampleEndpointTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        SystemMetric.objects.bulk_create([
+            SystemMetric(
+                timestamp=now - timezone.timedelta(minutes=i),
+                cpu_percent=95.0 if i == 250 else 10.0 + i % 7,
+                memory_percent=40.0,
+            )
+            for i in range(500)
+        ])
+
+    def test_metric_list_points(self):
+        response = self.client.get('/api/metrics/?points=50')
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.data['results']), 50)
+        self.assertEqual(response.data['source_count'], 500)
+        self.assertIn(95.0, [row['cpu_percent'] for row in response.data['results']])
+        timestamps = [row['timestamp'] for row in response.data['results']]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_load_columns_matches_values_list(self):
+        SystemMetric.objects.filter(cpu_percent=12.0).update(cpu_temp=None)
+        queryset = SystemMetric.objects.order_by('timestamp', 'id')
+        # Stored times are UTC whatever the server's zone
+        with self.settings(TIME_ZONE='America/New_York'):
+            ids, x, (cpu, temp) = load_columns(queryset, 'timestamp', ['cpu_percent', 'cpu_temp'])
+
+        rows = list(queryset.values_list('id', 'timestamp', 'cpu_percent', 'cpu_temp'))
+        self.assertEqual(ids.tolist(), [row[0] for row in rows])
+        np.testing.assert_allclose(x, [row[1].timestamp() for row in rows])
+        self.assertEqual(cpu.tolist(), [row[2] for row in rows])
+        np.testing.assert_array_equal(np.isnan(temp), [row[3] is None for row in rows])
+
+        ids, x, series = load_columns(queryset.none(), 'timestamp', ['cpu_percent'])
+        self.assertEqual((len(ids), len(x), len(series[0])), (0, 0, 0))
+
+    def test_invalid_parameters(self):
+        for query in ('points=abc', 'points=2', 'points=50&downsample=median', 'points=50&series=password',
+                      'points=10&series=timestamp', 'points=10&series=id', 'points=10&series=is_anomaly'):
+            self.assertEqual(self.client.get(f'/api/metrics/?{query}').status_code, 400, query)
+
+
+class ColumnarFormatTests(TestCase):
+    """?format=columnar returns one array per field."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        for i in range(5):
+            SystemMetric.objects.create(
+                timestamp=now - timezone.timedelta(minutes=i),
+                cpu_percent=i,
+                memory_percent=50 + i,
+                is_anomaly=i == 2,
+            )
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return json.loads(response.content)
+
+    def test_matches_row_format(self):
+        rows = self.get('/api/metrics/?cursor=')['results']
+        columns = self.get('/api/metrics/?cursor=&format=columnar')['results']
+        self.assertEqual(columns['timestamps'], [row['timestamp'] for row in rows])
+        for field in ('id', 'cpu_percent', 'memory_percent', 'is_anomaly', 'cpu_temp'):
+            self.assertEqual(columns[field], [row[field] for row in rows], field)
+
+    def test_sparse_fields(self):
+        columns = self.get('/api/metrics/?format=columnar&fields=cpu_percent')['results']
+        self.assertEqual(set(columns), {'timestamps', 'cpu_percent'})
+        self.assertEqual(columns['cpu_percent'], [0, 1, 2, 3, 4])
+
+    def test_cursor_pages(self):
+        page = self.get('/api/metrics/?cursor=&page_size=3&format=columnar&fields=cpu_percent')
+        self.assertEqual(page['results']['cpu_percent'], [0, 1, 2])
+        page = self.get(page['next'])
+        self.assertEqual(page['results']['cpu_percent'], [3, 4])
+
+    def test_other_endpoints_are_transposed(self):
+        columns = self.get('/api/metrics/anomalies/?format=columnar')['results']
+        self.assertEqual(columns['cpu_percent'], [2])
+
+    def test_unknown_field(self):
+        response = self.client.get('/api/metrics/?format=columnar&fields=password')
+        self.assertEqual(response.status_code, 400)
+
+
+class RenderingAndCompressionTests(TestCase):
+    """The fast renderer matches DRF's output; data responses are compressed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        SystemMetric.objects.bulk_create([
+            SystemMetric(timestamp=now - timezone.timedelta(minutes=i), cpu_percent=i % 10)
+            for i in range(200)
+        ])
+
+    def test_fast_renderer_matches_stdlib(self):
+        data = self.client.get('/api/metrics/').data
+        self.assertEqual(
+            json.loads(FastJSONRenderer().render(data)),
+            json.loads(JSONRenderer().render(data))
+        )
+
+    def test_gzip_when_accepted(self):
+        plain = self.client.get('/api/metrics/')
+        response = self.client.get('/api/metrics/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        self.assertLess(len(response.content), len(plain.content) / 4)
+
+    def test_streaming_export_is_compressed(self):
+        response = self.client.get('/api/export/metrics/?format=csv', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(body.splitlines()), 201)
+
+    def test_small_and_html_responses_are_left_alone(self):
+        response = self.client.get('/api/health/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.client.get('/api/metrics/', HTTP_ACCEPT='text/html', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class ConditionalGetTests(TestCase):
+    """Polls that find nothing new get 304 without a body."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.metric = SystemMetric.objects.create(cpu_percent=10)
+        cls.issue = HardwareIssue.objects.create(
+            metric=cls.metric,
+            issue_type='High CPU Usage',
+            description='CPU usage is high',
+            recommendation='Close unused applications',
+        )
+        rebuild_rollups()
+
+    def setUp(self):
+        use_private_snapshot_cache(self)
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_latest(self):
+        response = self.client.get('/api/metrics/latest/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        cached = self.revalidate('/api/metrics/latest/', response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached.content, b'')
+
+        SystemMetric.objects.create(cpu_percent=20)
+        self.assertEqual(self.revalidate('/api/metrics/latest/', response['ETag']).status_code, 200)
+
+    def test_statistics(self):
+        response = self.client.get('/api/metrics/statistics/?days=7')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.revalidate('/api/metrics/statistics/?days=7', response['ETag']).status_code, 304
+        )
+
+    def test_edited_metric_changes_statistics_and_latest(self):
+        url = '/api/metrics/statistics/?days=7'
+        response = self.client.get(url)
+        self.assertEqual(response.data['cpu']['avg'], 10)
+        statistics_etag = response['ETag']
+        latest_etag = self.client.get('/api/metrics/latest/')['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/metrics/{self.metric.pk}/', json.dumps({'cpu_percent': 90}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 200)
+
+        response = self.revalidate(url, statistics_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['cpu']['avg'], 90)
+        response = self.revalidate('/api/metrics/latest/', latest_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['cpu_percent'], 90)
+
+    def test_dashboard_follows_the_snapshot(self):
+        response = self.client.get('/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        # No snapshot was published yet, so there was nothing to tag
+        self.assertFalse(response.has_header('ETag'))
+
+        # The request published the snapshot it built
+        response = self.client.get('/api/dashboard/')
+        etag = response['ETag']
+        self.assertFalse(response.has_header('Last-Modified'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.revalidate('/api/dashboard/', etag).status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        # The served snapshot is unchanged until the collector publishes
+        self.issue.resolve()
+        self.assertEqual(self.revalidate('/api/dashboard/', etag).status_code, 304)
+
+        publish_dashboard_snapshot({}, model_trained=False)
+        response = self.revalidate('/api/dashboard/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['unresolved_issues'], [])
+
+
+class ScoringTests(SimpleTestCase):
+    """The vectorised scoring path agrees with the model's own predict."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        rng = np.random.default_rng(0)
+        cls.rows = [
+            {'cpu_percent': float(cpu), 'memory_percent': float(mem), 'cpu_temp': None}
+            for cpu, mem in zip(rng.normal(30, 5, 300), rng.normal(50, 5, 300))
+        ]
+        cls.rows.append({'cpu_percent': 100.0, 'memory_percent': 99.0})
+        cls.pipeline = FeaturePipeline(n_estimators=20, random_state=0)
+        cls.pipeline.fit(cls.pipeline.matrix(cls.rows))
+        cls.monitor = HardwareMonitorService()
+        cls.monitor.pipeline = cls.pipeline
+
+    def test_matrix_fills_missing_columns_and_applies_divisors(self):
+        matrix = self.pipeline.matrix([{'memory_percent': 40, 'network_bytes_sent': 2048, 'cpu_temp': None}])
+        self.assertEqual(matrix.shape, (1, len(self.pipeline.columns)))
+        expected = {'memory_percent': 40.0, 'network_bytes_sent': 2.0}
+        self.assertEqual(matrix[0].tolist(), [expected.get(col, 0.0) for col in self.pipeline.columns])
+
+    def test_score_batch_matches_predict(self):
+        result = self.monitor.score_batch(self.rows)
+        scaled = self.pipeline.scaler.transform(self.pipeline.matrix(self.rows))
+        np.testing.assert_allclose(result['anomaly_score'], self.pipeline.model.decision_function(scaled))
+        np.testing.assert_array_equal(result['is_anomaly'], self.pipeline.model.predict(scaled) == -1)
+        self.assertTrue(result['is_anomaly'][-1])
+
+    def test_detect_anomalies_scores_one_sample(self):
+        result = self.monitor.detect_anomalies(self.rows[-1])
+        batch = self.monitor.score_batch(self.rows[-1:])
+        self.assertIs(result['is_anomaly'], True)
+        self.assertEqual(result['anomaly_score'], batch['anomaly_score'][0])
+
+
+class FlatForestTests(SimpleTestCase):
+    """A flattened forest scores exactly like the scikit-learn forest."""
+
+    def test_matches_isolation_forest(self):
+        from sklearn.ensemble import IsolationForest
+
+        rng = np.random.default_rng(0)
+        train = rng.normal(0, 1, (500, 6))
+        samples = np.vstack([rng.normal(0, 2, (300, 6)), train[:1]])
+        for params in ({}, {'max_features': 0.5, 'max_samples': 100}):
+            model = IsolationForest(n_estimators=30, random_state=0, **params).fit(train)
+            forest = FlatForest.from_isolation_forest(model)
+            np.testing.assert_allclose(forest.decision_function(samples), model.decision_function(samples))
+            np.testing.assert_array_equal(forest.predict(samples), model.predict(samples))
+            np.testing.assert_allclose(forest.decision_function(samples[:1]), model.decision_function(samples[:1]))
+
+    def test_single_sample_fit_matches_isolation_forest(self):
+        from sklearn.ensemble import IsolationForest
+
+        model = IsolationForest(n_estimators=5, random_state=0).fit(np.ones((1, 3)))
+        forest = FlatForest.from_isolation_forest(model)
+        samples = np.random.default_rng(0).normal(0, 2, (10, 3))
+        np.testing.assert_allclose(forest.decision_function(samples), model.decision_function(samples))
+        np.testing.assert_array_equal(forest.predict(samples), model.predict(samples))
+
+    def test_wrong_number_of_features(self):
+        from sklearn.ensemble import IsolationForest
+
+        model = IsolationForest(n_estimators=5, random_state=0).fit(np.zeros((20, 3)))
+        with self.assertRaises(ValueError):
+            FlatForest.from_isolation_forest(model).decision_function(np.zeros((1, 4)))
+
+
+class FeaturePipelineTests(TestCase):
+    """Training and scoring share one saved pipeline artifact."""
+
+    def setUp(self):
+        self.models_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.models_dir)
+        override = self.settings(ML_MODELS_DIR=self.models_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        now = timezone.now()
+        SystemMetric.objects.bulk_create(
+            SystemMetric(
+                timestamp=now - timezone.timedelta(minutes=i),
+                cpu_percent=20 + i % 10, memory_percent=50 + i % 5,
+                network_bytes_sent=1024 * i, cpu_temp=None,
+            )
+            for i in range(120)
+        )
+
+    def test_training_saves_one_artifact_the_scorer_loads(self):
+        self.assertTrue(HardwareMonitorService().train_model(training_samples=100))
+
+        record = ModelTrainingHistory.objects.get()
+        self.assertEqual(record.training_samples, 100)
+        self.assertEqual(record.schema_hash, schema_hash(DEFAULT_FEATURES))
+        self.assertEqual(record.scaler_file_path, '')
+        self.assertEqual(os.listdir(self.models_dir), [os.path.basename(record.model_file_path)])
+
+        monitor = HardwareMonitorService()
+        self.assertEqual(monitor.pipeline.columns, tuple(column for column, _ in DEFAULT_FEATURES))
+        result = monitor.detect_anomalies({'cpu_percent': 25, 'memory_percent': 52})
+        self.assertIn(result['is_anomaly'], (True, False))
+
+        result = monitor.detect_anomalies({'cpu_percent': 100, 'memory_percent': 100, 'network_bytes_sent': 10 ** 12})
+        self.assertIs(result['is_anomaly'], True)
+
+    def test_training_needs_enough_samples(self):
+        self.assertFalse(HardwareMonitorService().train_model(training_samples=10))
+        self.assertFalse(ModelTrainingHistory.objects.exists())
+
+    def test_mismatched_schema_hash_is_refused(self):
+        pipeline = FeaturePipeline(n_estimators=5)
+        path = pipeline.fit(pipeline.matrix_from_queryset(SystemMetric.objects.all())).save(self.models_dir)
+        self.assertIs(load_pipeline(path, pipeline.schema_hash).is_fitted, True)
+        with self.assertRaises(ValueError):
+            load_pipeline(path, schema_hash(DEFAULT_FEATURES[:3]))
+
+    def test_loaded_artifact_is_memory_mapped(self):
+        pipeline = FeaturePipeline(n_estimators=5)
+        path = pipeline.fit(pipeline.matrix_from_queryset(SystemMetric.objects.all())).save(self.models_dir)
+        loaded = load_pipeline(path, pipeline.schema_hash)
+        self.assertIsInstance(loaded.model.threshold, np.memmap)
+        self.assertIsInstance(loaded.scaler.mean, np.memmap)
+
+        # Scoring a saved artifact needs neither scikit-learn nor a private copy
+        script = (
+            'import sys; from hardware_api.pipeline import load_pipeline; '
+            'p = load_pipeline(sys.argv[1]); p.score(p.matrix([{}])); '
+            'print("sklearn" in sys.modules)'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', script, path], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_runs_from_before_pipelines_are_ignored(self):
+        ModelTrainingHistory.objects.create(
+            model_file_path='models/model.joblib', scaler_file_path='models/scaler.joblib',
+            training_samples=100,
+        )
+        self.assertIsNone(HardwareMonitorService().pipeline)
+
+
+class TrainingJobTests(TestCase):
+    """Training requests become deduplicated, cancellable background jobs."""
+
+    def setUp(self):
+        self.models_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.models_dir)
+        # Jobs run inline: worker processes could not see the test database
+        override = self.settings(
+            ML_MODELS_DIR=self.models_dir,
+            HARDWARE_MONITOR=dict(settings.HARDWARE_MONITOR, TRAINING_PROCESSES=0),
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        now = timezone.now()
+        SystemMetric.objects.bulk_create(
+            SystemMetric(timestamp=now - timezone.timedelta(minutes=i), cpu_percent=i % 10)
+            for i in range(60)
+        )
+        # Anonymous requests are throttled per day through the default
+        # cache, which the whole test run shares
+        cache.clear()
+        self.client = APIClient()
+
+    def test_train_returns_a_job_that_can_be_polled(self):
+        response = self.client.post('/api/training/train/', {'samples': 60}, format='json')
+        self.assertEqual(response.status_code, 202)
+
+        job = self.client.get(f"/api/training/jobs/{response.data['id']}/").data
+        self.assertEqual(job['status'], TrainingJob.SUCCEEDED)
+        self.assertEqual(job['progress'], 1)
+        self.assertEqual(job['training'], ModelTrainingHistory.objects.get().pk)
+
+    def test_request_while_a_job_is_queued_joins_it(self):
+        queued = TrainingJob.objects.create(samples=60)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TrainingJob.objects.create(samples=60)
+
+        response = self.client.post('/api/training/train/', {'samples': 60}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['id'], queued.pk)
+        self.assertNotIn('requested_samples', response.data)
+        self.assertEqual(TrainingJob.objects.count(), 1)
+
+        # The joined job keeps its count, and the response says so
+        queued = TrainingJob.objects.create(samples=60)
+        response = self.client.post('/api/training/train/', {'samples': 500}, format='json')
+        self.assertEqual(response.data['id'], queued.pk)
+        self.assertEqual(response.data['samples'], 60)
+        self.assertEqual(response.data['requested_samples'], 500)
+
+    def test_samples_out_of_range_are_rejected(self):
+        for samples in (-5, 0, 49, 10 ** 9, 'many', None, 75.9, 75.0, True, '75.9'):
+            response = self.client.post('/api/training/train/', {'samples': samples}, format='json')
+            self.assertEqual(response.status_code, 400, samples)
+        self.assertFalse(TrainingJob.objects.exists())
+
+        # Form posts send the count as text
+        response = self.client.post('/api/training/train/', {'samples': '60'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['samples'], 60)
+
+    def test_failed_training_fails_the_job(self):
+        SystemMetric.objects.filter(cpu_percent__lt=5).delete()
+        response = self.client.post('/api/training/train/', {'samples': 60}, format='json')
+        self.assertEqual(response.data['status'], TrainingJob.FAILED)
+        self.assertTrue(response.data['error'])
+
+    def test_cancel(self):
+        queued = TrainingJob.objects.create(samples=60)
+        response = self.client.post(f'/api/training/jobs/{queued.pk}/cancel/')
+        self.assertEqual(response.data['status'], TrainingJob.CANCELLED)
+        self.assertIsNone(run_training_job(queued.pk))
+
+        response = self.client.post(f'/api/training/jobs/{queued.pk}/cancel/')
+        self.assertEqual(response.status_code, 409)
+
+    def test_running_job_stops_at_next_progress_report(self):
+        job = TrainingJob.objects.create(samples=60, cancel_requested=True)
+        self.assertEqual(run_training_job(job.pk), TrainingJob.CANCELLED)
+        self.assertFalse(ModelTrainingHistory.objects.exists())
+        self.assertEqual(os.listdir(self.models_dir), [])
+
+    def test_abandoned_running_job_is_failed(self):
+        job = TrainingJob.objects.create(
+            samples=60, status=TrainingJob.RUNNING,
+            heartbeat_at=timezone.now() - timezone.timedelta(hours=1),
+        )
+        self.assertEqual(expire_abandoned_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, TrainingJob.FAILED)
+
+
+class ModelRegistryTests(TestCase):
+    """Each process picks up a retrained model without a restart."""
+
+    def setUp(self):
+        self.models_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.models_dir)
+        self.matrix = np.random.default_rng(0).normal(50, 10, (60, len(DEFAULT_FEATURES)))
+
+    def record(self, path=None):
+        pipeline = FeaturePipeline(n_estimators=5).fit(self.matrix)
+        return ModelTrainingHistory.objects.create(
+            model_file_path=path or pipeline.save(self.models_dir),
+            schema_hash=pipeline.schema_hash, training_samples=len(self.matrix),
+        )
+
+    def test_newer_version_is_swapped_in(self):
+        first = self.record()
+        registry = ModelRegistry(check_interval=60)
+        current = registry.get()
+        self.assertEqual(registry.version, first.pk)
+
+        self.assertFalse(registry.check(block=True))
+        second = self.record()
+        self.assertTrue(registry.check(block=True))
+        self.assertEqual(registry.version, second.pk)
+        self.assertIsNot(registry.get(), current)
+
+    def test_checks_are_limited_to_the_interval(self):
+        self.record()
+        registry = ModelRegistry(check_interval=60)
+        registry.get()
+        with self.assertNumQueries(0):
+            registry.get()
+
+        registry.check_interval = 0
+        with self.assertNumQueries(1):
+            registry.get()
+
+    def test_broken_artifact_is_not_retried(self):
+        first = self.record()
+        registry = ModelRegistry(check_interval=60)
+        registry.get()
+
+        self.record(path=os.path.join(self.models_dir, 'missing.joblib'))
+        self.assertTrue(registry.check(block=True))
+        self.assertFalse(registry.check(block=True))
+        self.assertEqual(registry.version, first.pk)
+
+    def test_broken_newest_artifact_falls_back_to_one_that_loads(self):
+        first = self.record()
+        second = self.record()
+        self.record(path=os.path.join(self.models_dir, 'missing.joblib'))
+        registry = ModelRegistry(check_interval=60)
+        self.assertIsNotNone(registry.get())
+        self.assertEqual(registry.version, second.pk)
+
+        # A newer broken version while the current one is older still
+        # moves to the newest that loads
+        registry = ModelRegistry(check_interval=60)
+        registry.install(FeaturePipeline(n_estimators=5).fit(self.matrix), first.pk)
+        with self.assertLogs('hardware_api.model_registry', 'INFO') as logs:
+            self.assertTrue(registry.check(block=True))
+        self.assertEqual(registry.version, second.pk)
+        self.assertIn(f'Switched to model version {second.pk}', logs.output[-1])
+
+    def test_pipeline_set_by_hand_is_kept(self):
+        self.record()
+        pipeline = FeaturePipeline(n_estimators=5).fit(self.matrix)
+        registry = ModelRegistry(check_interval=0)
+        registry.install(pipeline)
+        with self.assertNumQueries(0):
+            self.assertIs(registry.get(), pipeline)
+        self.assertFalse(registry.check(block=True))
+
+
+class StartupTests(TestCase):
+    """Start-up does not load the ML stack or the model."""
+
+    def test_importing_views_skips_heavy_dependencies(self):
+        script = (
+            'import sys, django; django.setup(); import hardware_api.urls; '
+            'print(",".join(m for m in ("pandas", "sklearn", "joblib", "wmi") if m in sys.modules))'
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        result = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), '')
+
+    def test_pipeline_is_loaded_on_first_access(self):
+        with self.assertNumQueries(0):
+            monitor = HardwareMonitorService()
+
+        with self.assertNumQueries(1):
+            self.assertIsNone(monitor.pipeline)
+
+        with self.assertNumQueries(0):
+            monitor.pipeline
+
+    def test_service_is_a_singleton(self):
+        self.assertIs(get_hardware_monitor(), get_hardware_monitor())
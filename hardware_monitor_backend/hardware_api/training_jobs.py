@@ -0,0 +1,311 @@
+"""
+Background model training.
+
+``POST /api/training/train/`` only records a ``TrainingJob`` and hands its
+id to a pool of worker processes, so the web worker answers at once and
+scikit-learn runs outside the web process (and its GIL). The worker claims
+the job, trains with ``HardwareMonitorService.train_model`` and reports
+progress on the job row, which ``GET /api/training/jobs/<id>/`` returns.
+
+Deduplication and "one at a time" are enforced by the database: there is
+at most one queued and one running job per model (see ``TrainingJob``). A
+request while a job is queued gets that job back, and a worker whose job
+cannot start yet waits until the running one has finished.
+
+With ``HARDWARE_MONITOR['TRAINING_PROCESSES'] = 0`` jobs run synchronously
+in the requesting process instead (tests, debugging).
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from . import training_worker
+from .models import TrainingJob
+from .pipeline import TrainingCancelled
+
+logger = logging.getLogger(__name__)
+
+# Seconds a worker waits before trying again to start a job while another
+# job for the same model is running
+CLAIM_RETRY_INTERVAL = 2
+
+FAILED_MESSAGE = "Model training failed. See logs for details."
+
+# train_model refuses to fit on fewer rows than this
+MIN_TRAINING_SAMPLES = 50
+
+
+def _config(name, default):
+    return getattr(settings, 'HARDWARE_MONITOR', {}).get(name, default)
+
+
+def validate_training_samples(samples):
+    """
+    Check a requested sample count.
+
+    Returns:
+        int: ``samples`` as an integer
+
+    Raises:
+        ValueError: If it is not an integer between ``MIN_TRAINING_SAMPLES``
+            and ``HARDWARE_MONITOR['TRAINING_MAX_SAMPLES']``
+    """
+    # int() would accept True and truncate 75.9 to 75; form data arrives
+    # as strings, which must spell an integer
+    if isinstance(samples, (bool, float)):
+        raise ValueError("samples must be an integer")
+    try:
+        number = int(samples)
+    except (TypeError, ValueError):
+        raise ValueError("samples must be an integer")
+    if number != samples and str(number) != str(samples).strip():
+        raise ValueError("samples must be an integer")
+    samples = number
+    maximum = _config('TRAINING_MAX_SAMPLES', 100000)
+    if not MIN_TRAINING_SAMPLES <= samples <= maximum:
+        raise ValueError(f"samples must be between {MIN_TRAINING_SAMPLES} and {maximum}")
+    return samples
+
+
+def submit_training_job(samples, model_name='anomaly'):
+    """
+    Queue a training job, or join the one already waiting.
+
+    A joined job keeps its own sample count; compare it with ``samples``.
+
+    Args:
+        samples (int): Most recent metrics to train on
+        model_name (str): Model the job trains
+
+    Returns:
+        tuple: (TrainingJob, created)
+
+    Raises:
+        ValueError: If ``samples`` is out of range, see
+            ``validate_training_samples``
+    """
+    samples = validate_training_samples(samples)
+    while True:
+        try:
+            with transaction.atomic():
+                job = TrainingJob.objects.create(model_name=model_name, samples=samples)
+            created = True
+            break
+        except IntegrityError:
+            # A job is already waiting; it will train on the newest data too
+            job = TrainingJob.objects.filter(model_name=model_name, status=TrainingJob.QUEUED).first()
+            if job is not None:
+                created = False
+                break
+            # ...unless it started or was cancelled in the meantime
+
+    get_training_runner().dispatch(job.pk)
+    return job, created
+
+
+def cancel_training_job(job_id):
+    """
+    Cancel a queued job at once, or ask a running one to stop.
+
+    A running job stops at its next progress report.
+
+    Args:
+        job_id (int): TrainingJob primary key
+
+    Returns:
+        TrainingJob: The job as it is now
+    """
+    now = timezone.now()
+    TrainingJob.objects.filter(pk=job_id, status=TrainingJob.QUEUED).update(
+        status=TrainingJob.CANCELLED, cancel_requested=True, finished_at=now
+    )
+    TrainingJob.objects.filter(pk=job_id, status=TrainingJob.RUNNING).update(cancel_requested=True)
+    return TrainingJob.objects.get(pk=job_id)
+
+
+def expire_abandoned_jobs():
+    """
+    Fail running jobs whose worker stopped reporting progress, e.g. because
+    its web process was killed, so they no longer block new jobs.
+
+    Returns:
+        int: Number of jobs failed
+    """
+    stale_after = _config('TRAINING_JOB_STALE_AFTER', 600)
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    expired = TrainingJob.objects.filter(status=TrainingJob.RUNNING, heartbeat_at__lt=cutoff).update(
+        status=TrainingJob.FAILED, finished_at=timezone.now(),
+        error=f"No progress for {stale_after} seconds; the worker was lost.",
+    )
+    if expired:
+        logger.warning(f"Failed {expired} abandoned training job(s)")
+    return expired
+
+
+def claim_job(job_id):
+    """
+    Move a queued job to running, waiting while another job for the same
+    model runs.
+
+    Args:
+        job_id (int): TrainingJob primary key
+
+    Returns:
+        bool: False if the job is no longer queued (cancelled or taken)
+    """
+    while True:
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                return TrainingJob.objects.filter(pk=job_id, status=TrainingJob.QUEUED).update(
+                    status=TrainingJob.RUNNING, started_at=now, heartbeat_at=now, stage='Starting'
+                ) == 1
+        except IntegrityError:
+            expire_abandoned_jobs()
+            time.sleep(CLAIM_RETRY_INTERVAL)
+
+
+def finish_job(job_id, status, error='', training=None):
+    """Record how a running job ended. Returns the status."""
+    now = timezone.now()
+    changes = {'status': status, 'finished_at': now, 'heartbeat_at': now, 'error': error}
+    if status == TrainingJob.SUCCEEDED:
+        changes.update(progress=1, stage='Done', training=training)
+    TrainingJob.objects.filter(pk=job_id, status=TrainingJob.RUNNING).update(**changes)
+    return status
+
+
+def run_training_job(job_id):
+    """
+    Claim and run one job. Runs in a worker process (or inline).
+
+    Args:
+        job_id (int): TrainingJob primary key
+
+    Returns:
+        str: The job's final status, or None if it was no longer queued
+    """
+    from .hardware_monitor import HardwareMonitorService
+
+    if not claim_job(job_id):
+        return None
+    job = TrainingJob.objects.get(pk=job_id)
+    logger.info(f"Training job {job_id} started with {job.samples} samples")
+
+    def progress(fraction, stage):
+        TrainingJob.objects.filter(pk=job_id).update(
+            progress=round(fraction, 3), stage=stage, heartbeat_at=timezone.now()
+        )
+        if TrainingJob.objects.filter(pk=job_id, cancel_requested=True).exists():
+            raise TrainingCancelled()
+
+    try:
+        record = HardwareMonitorService().train_model(job.samples, progress=progress)
+    except TrainingCancelled:
+        return finish_job(job_id, TrainingJob.CANCELLED)
+    except Exception as e:
+        logger.error(f"Training job {job_id} failed: {e}")
+        return finish_job(job_id, TrainingJob.FAILED, error=str(e) or FAILED_MESSAGE)
+
+    if record is None:
+        return finish_job(job_id, TrainingJob.FAILED, error=FAILED_MESSAGE)
+    logger.info(f"Training job {job_id} finished")
+    return finish_job(job_id, TrainingJob.SUCCEEDED, training=record)
+
+
+class TrainingRunner:
+    """Hands queued jobs to a pool of worker processes."""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._dispatched = set()
+
+    def _get_executor(self, processes):
+        if self._executor is None:
+            # Spawned rather than forked: a fork would copy the web process's
+            # threads and open database connections
+            self._executor = ProcessPoolExecutor(
+                max_workers=processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=training_worker.init_worker,
+            )
+        return self._executor
+
+    def dispatch(self, job_id):
+        """
+        Run a job in the pool (or right here when TRAINING_PROCESSES is 0).
+
+        A job this process already handed to the pool is not handed over
+        again; a job queued by a process that has since exited is picked up
+        by the next request that joins it.
+        """
+        processes = _config('TRAINING_PROCESSES', 1)
+        if processes <= 0:
+            self._finished(job_id, run_training_job(job_id), inline=True)
+            return
+
+        with self._lock:
+            if job_id in self._dispatched:
+                return
+            self._dispatched.add(job_id)
+            future = self._get_executor(processes).submit(training_worker.run_job, job_id)
+        future.add_done_callback(lambda done: self._collect(job_id, done))
+
+    def _collect(self, job_id, future):
+        # Runs on the pool's management thread
+        with self._lock:
+            self._dispatched.discard(job_id)
+            broken = None
+            if isinstance(future.exception(), BrokenProcessPool) and self._executor is not None:
+                # A worker died; the pool cannot be used again
+                broken, self._executor = self._executor, None
+        if broken is not None:
+            broken.shutdown(wait=False)
+        try:
+            error = future.exception()
+            if error is not None:
+                logger.error(f"Training worker for job {job_id} failed: {error}")
+                TrainingJob.objects.filter(pk=job_id, status__in=[TrainingJob.QUEUED, TrainingJob.RUNNING]).update(
+                    status=TrainingJob.FAILED, finished_at=timezone.now(), error=f"Training worker failed: {error}"
+                )
+            else:
+                self._finished(job_id, future.result())
+        finally:
+            connection.close()
+
+    def _finished(self, job_id, status, inline=False):
+        if status == TrainingJob.SUCCEEDED:
+            from .hardware_monitor import get_hardware_monitor
+
+            # The worker saved a new model version; load it now rather than
+            # at the next interval check
+            get_hardware_monitor().models.check(block=inline)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_training_runner():
+    """
+    Get the process-wide training runner, creating it on first use.
+
+    Returns:
+        TrainingRunner: The shared runner
+    """
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = TrainingRunner()
+    return _runner
@@ -0,0 +1,24 @@
+"""
+Entry points of the training worker processes.
+
+Spawned workers unpickle these functions before Django is set up, so this
+module must not import models (or anything that does) at import time.
+"""
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def run_job(job_id):
+    """Run one training job in a worker process. Returns its final status."""
+    from django.db import close_old_connections
+    from .training_jobs import run_training_job
+
+    # Workers have no request cycle to close their connection
+    close_old_connections()
+    try:
+        return run_training_job(job_id)
+    finally:
+        close_old_connections()
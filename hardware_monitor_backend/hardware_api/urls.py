@@ -5,13 +5,19 @@ from . import views
 router = DefaultRouter()
 router.register(r'metrics', views.SystemMetricViewSet)
 router.register(r'issues', views.HardwareIssueViewSet)
+# Before 'training', whose detail route would otherwise match 'training/jobs/'
+router.register(r'training/jobs', views.TrainingJobViewSet)
 router.register(r'training', views.ModelTrainingViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
     path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
+    path('stream/', views.metrics_stream, name='metrics-stream'),
+    path('export/metrics/', views.metrics_export, name='metrics-export'),
     path('health/', views.health_check, name='health_check'),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
     path('system-info/', views.system_info, name='system_info'),
     path('fans/', views.get_fan_info, name='fan-info'),
+    path('sensors/', views.sensor_catalog, name='sensor-catalog'),
+    path('sensors/refresh/', views.refresh_sensor_catalog, name='sensor-catalog-refresh'),
 ]
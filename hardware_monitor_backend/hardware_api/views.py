@@ -3,13 +3,35 @@ from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
+from rest_framework.settings import api_settings
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.decorators import method_decorator
 from django.db.models import Avg, Max, Min, Count
-from django.http import JsonResponse
-from django.db import models 
-from .models import SystemMetric, HardwareIssue, ModelTrainingHistory
-from .serializers import SystemMetricSerializer, HardwareIssueSerializer, ModelTrainingHistorySerializer, SystemSummarySerializer
-from .hardware_monitor import HardwareMonitorService
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.db import models, transaction
+from .models import SystemMetric, HardwareIssue, ModelTrainingHistory, TrainingJob
+from .serializers import (
+    SystemMetricSerializer, HardwareIssueSerializer, ModelTrainingHistorySerializer, TrainingJobSerializer
+)
+from .hardware_monitor import get_hardware_monitor
+from .samplers import get_cpu_sampler
+from .ring_buffer import get_recent_samples_reader
+from .sensors import get_hwmon_reader
+from .rollups import get_window_statistics, rebuild_rollups, refresh_rollups, update_rollups
+from .dashboard import get_dashboard_snapshot
+from .stream import EventStream, get_broadcaster, parse_cursor
+from .pagination import KeysetPagination
+from .renderers import ColumnarJSONRenderer, ColumnarData, FastJsonResponse
+from .conditional import conditional_on
+from .export import export_metrics, EXPORT_FIELDS, EXPORT_FORMATS, EXPORT_CONTENT_TYPES
+from .downsample import (
+    downsample_rows, load_columns, select_indices, MAX_POINTS, METHODS as DOWNSAMPLE_METHODS
+)
+from .probe_cache import probe_cache, get_probe_ttl, run_probes, ProbeUnavailable
+from .training_jobs import submit_training_job, cancel_training_job
 import psutil
 import platform
 import socket
@@ -18,16 +40,42 @@ import uuid
 import subprocess
 import json
 import os
-import wmi
+import shutil
+import time
+
+# Seconds before a hardware probe subprocess is killed
+SUBPROCESS_TIMEOUT = 10
+
+# Series whose shape ?points= preserves by default
+DOWNSAMPLE_METRIC_SERIES = ('cpu_percent', 'memory_percent', 'disk_usage_percent')
+# Fields ?series= may name: the float measurements, not ids, times or flags
+DOWNSAMPLE_METRIC_FIELDS = tuple(
+    field.attname for field in SystemMetric._meta.concrete_fields
+    if isinstance(field, models.FloatField)
+)
+DOWNSAMPLE_HOURLY_SERIES = ('avg_cpu', 'avg_memory', 'avg_disk')
+
+# Seconds a dashboard snapshot built by a request (rather than the
+# collector) is reused
+DASHBOARD_FALLBACK_TIMEOUT = 30
+
+
+def statistics_cache_period(request):
+    """
+    Cached statistics are recomputed once their TTL runs out even without new
+    metrics (the window moves on), so the ETag changes with the same period.
+    """
+    ttl = getattr(settings, 'HARDWARE_MONITOR', {}).get('STATISTICS_CACHE_TTL', 60)
+    return [int(time.time() // ttl)]
 
-# Initialize the hardware monitor service
-hardware_monitor = HardwareMonitorService()
 
 class SystemMetricViewSet(viewsets.ModelViewSet):
     """API endpoint for system metrics."""
     queryset = SystemMetric.objects.all()
     serializer_class = SystemMetricSerializer
     permission_classes = [AllowAny]  # Was [IsAuthenticated]
+    pagination_class = KeysetPagination
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [ColumnarJSONRenderer]
     filterset_fields = ['is_anomaly']
     search_fields = ['id', 'timestamp']
     ordering_fields = ['timestamp', 'cpu_percent', 'memory_percent', 'disk_usage_percent']
@@ -79,15 +127,132 @@ class SystemMetricViewSet(viewsets.ModelViewSet):
         
         return queryset
     
+    # Rollups are maintained in the same transaction as the raw rows.
+    # Changed and deleted metrics have their buckets recomputed, because a
+    # minimum or maximum cannot be taken back.
+    
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            metric = serializer.save()
+            update_rollups([metric])
+    
+    def perform_update(self, serializer):
+        previous = serializer.instance.timestamp
+        with transaction.atomic():
+            metric = serializer.save()
+            refresh_rollups([previous, metric.timestamp])
+    
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            refresh_rollups([instance.timestamp])
+    
+    def list(self, request, *args, **kwargs):
+        """
+        List metrics, or with ``?points=N`` a downsampled series of at most N.
+        
+        ``series`` picks the comma-separated fields whose shape is preserved
+        and ``downsample`` the method (lttb or minmax).
+        
+        With ``?format=columnar`` the rows are returned as one array per
+        field, read with ``values_list`` instead of the serializer;
+        ``fields`` limits the columns.
+        """
+        columnar = isinstance(request.accepted_renderer, ColumnarJSONRenderer)
+        if 'points' not in request.query_params and not columnar:
+            return super().list(request, *args, **kwargs)
+        
+        try:
+            fields = self.get_columnar_fields(request) if columnar else None
+            if 'points' not in request.query_params:
+                return self.columnar_list(request, fields)
+            points, method, series = parse_downsample_params(
+                request.query_params, DOWNSAMPLE_METRIC_SERIES, DOWNSAMPLE_METRIC_FIELDS
+            )
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Pick the points from bare column arrays, then load only the chosen rows
+        queryset = self.filter_queryset(self.get_queryset()).order_by('timestamp', 'id')
+        row_ids, x, values = load_columns(queryset, 'timestamp', series)
+        ids = row_ids[select_indices(x, values, points, method)].tolist()
+        
+        metrics = SystemMetric.objects.filter(id__in=ids).order_by('timestamp', 'id')
+        if columnar:
+            results = self.build_columns(metrics.values_list(*fields), fields)
+        else:
+            results = self.get_serializer(metrics, many=True).data
+        return Response({
+            "count": len(ids),
+            "source_count": len(row_ids),
+            "results": results
+        })
+    
+    def get_columnar_fields(self, request):
+        """
+        Columns requested with ``?fields=``; ``timestamp`` is always included.
+        
+        Raises:
+            ValueError: If a field is not one the serializer exposes
+        """
+        available = SystemMetricSerializer.Meta.fields
+        if not request.query_params.get('fields'):
+            return list(available)
+        
+        requested = request.query_params['fields'].split(',')
+        unknown = set(requested) - set(available)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return ['timestamp'] + [f for f in requested if f != 'timestamp']
+    
+    def columnar_list(self, request, fields):
+        """Paginated columns built from ``values_list`` rows."""
+        # id and timestamp are needed for cursor links even when not requested
+        names = list(dict.fromkeys(['id', 'timestamp'] + fields))
+        queryset = self.filter_queryset(self.get_queryset()).values_list(*names, named=True)
+        
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else queryset
+        data = self.build_columns(rows, fields, names)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+    
+    def build_columns(self, rows, fields, names=None):
+        """
+        Transpose ``values_list`` rows into one list per field.
+        
+        Args:
+            rows (iterable): Tuples with one value per name in ``names``
+            fields (list): Columns to return
+            names (list, optional): Column of each tuple position, when it
+                differs from ``fields``
+        
+        Returns:
+            ColumnarData: ``timestamps`` plus one list per other field
+        """
+        names = names or fields
+        columns = list(zip(*rows)) or [()] * len(names)
+        data = ColumnarData()
+        for name, values in zip(names, columns):
+            if name in fields:
+                data['timestamps' if name == 'timestamp' else name] = values
+        return data
+    
     @action(detail=False, methods=['post'], permission_classes=[AllowAny])
     def collect(self, request):
         """Collect and save current system metrics."""
-        metrics = hardware_monitor.collect_system_metrics()
-        metric_obj = hardware_monitor.save_metrics(metrics)
+        monitor = get_hardware_monitor()
+        metrics = monitor.collect_system_metrics()
+        metric_obj = monitor.save_metrics(metrics)
+        monitor.publish_dashboard_snapshot(metrics, timeout=DASHBOARD_FALLBACK_TIMEOUT)
         serializer = self.get_serializer(metric_obj)
-        return Response(serializer.data)
+        data = serializer.data
+        data['cpu_sample_age'] = metrics.get('cpu_sample_age')
+        return Response(data)
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    @method_decorator(conditional_on('metrics'))
     def latest(self, request):
         """Get the latest system metrics."""
         latest_metric = SystemMetric.objects.order_by('-timestamp').first()
@@ -98,58 +263,66 @@ class SystemMetricViewSet(viewsets.ModelViewSet):
             return Response({"detail": "No metrics available"}, status=status.HTTP_404_NOT_FOUND)
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
-    def statistics(self, request):
-        """Get statistics about system metrics."""
-        # Get time range from query parameters
-        days = int(request.query_params.get('days', 7))
-        start_date = timezone.now() - timezone.timedelta(days=days)
-        anomaly_count=Count('id', filter=models.Q(is_anomaly=True))
+    def recent(self, request):
+        """Get raw high-frequency samples from the collector's ring buffer."""
+        buffer = get_recent_samples_reader()
+        if buffer is None or not len(buffer):
+            return Response(
+                {"detail": "No recent samples available. Is monitor_hardware running?"},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        # Get metrics in the time range
-        metrics = SystemMetric.objects.filter(timestamp__gte=start_date)
+        # Get time window from query parameters
+        try:
+            seconds = float(request.query_params.get('seconds', 60))
+            limit = request.query_params.get('limit', None)
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            return Response({"detail": "seconds and limit must be numbers"}, status=status.HTTP_400_BAD_REQUEST)
         
-        if not metrics.exists():
-            return Response({"detail": "No metrics in the specified time range"}, status=status.HTTP_404_NOT_FOUND)
+        since = time.time() - seconds
+        samples = buffer.snapshot(since=since, limit=limit)
+        timestamps = samples['timestamp']
         
-        # Calculate statistics
-        stats = {
-            'total_metrics': metrics.count(),
-            'anomalies': metrics.filter(is_anomaly=True).count(),
-            'cpu': {
-                'avg': metrics.aggregate(Avg('cpu_percent'))['cpu_percent__avg'],
-                'max': metrics.aggregate(Max('cpu_percent'))['cpu_percent__max'],
-                'min': metrics.aggregate(Min('cpu_percent'))['cpu_percent__min'],
-            },
-            'memory': {
-                'avg': metrics.aggregate(Avg('memory_percent'))['memory_percent__avg'],
-                'max': metrics.aggregate(Max('memory_percent'))['memory_percent__max'],
-                'min': metrics.aggregate(Min('memory_percent'))['memory_percent__min'],
-            },
-            'disk': {
-                'avg': metrics.aggregate(Avg('disk_usage_percent'))['disk_usage_percent__avg'],
-                'max': metrics.aggregate(Max('disk_usage_percent'))['disk_usage_percent__max'],
-                'min': metrics.aggregate(Min('disk_usage_percent'))['disk_usage_percent__min'],
+        return Response({
+            'count': len(timestamps),
+            'capacity': buffer.capacity,
+            'age': round(time.time() - float(timestamps[-1]), 3) if len(timestamps) else None,
+            'samples': {
+                name: [None if value != value else value for value in values.tolist()]
+                for name, values in samples.items()
             },
-            'network': {
-                'avg_sent': metrics.aggregate(Avg('network_bytes_sent'))['network_bytes_sent__avg'],
-                'avg_recv': metrics.aggregate(Avg('network_bytes_recv'))['network_bytes_recv__avg'],
-                'max_sent': metrics.aggregate(Max('network_bytes_sent'))['network_bytes_sent__max'],
-                'max_recv': metrics.aggregate(Max('network_bytes_recv'))['network_bytes_recv__max'],
-            }
-        }
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    @method_decorator(conditional_on('metrics', extra=statistics_cache_period))
+    def statistics(self, request):
+        """
+        Get statistics about system metrics.
         
-        # Get hourly aggregated data for charts
-        from django.db.models.functions import TruncHour
-        hourly_data = metrics.annotate(
-            hour=TruncHour('timestamp')
-        ).values('hour').annotate(
-            avg_cpu=Avg('cpu_percent'),
-            avg_memory=Avg('memory_percent'),
-            avg_disk=Avg('disk_usage_percent'),
-            anomaly_count=Count('id', filter=models.Q(is_anomaly=True))
-        ).order_by('hour')
+        Computed from the metric rollups in one aggregate query plus the
+        hourly series, and cached until the next sample arrives.
+        """
+        # Get time range from query parameters
+        days = int(request.query_params.get('days', 7))
         
-        stats['hourly_data'] = list(hourly_data)
+        stats = get_window_statistics(days)
+        if not stats:
+            return Response({"detail": "No metrics in the specified time range"}, status=status.HTTP_404_NOT_FOUND)
+        
+        # Bound the hourly chart to ?points=N
+        if 'points' in request.query_params:
+            try:
+                points, method, series = parse_downsample_params(
+                    request.query_params, DOWNSAMPLE_HOURLY_SERIES,
+                    DOWNSAMPLE_HOURLY_SERIES + ('anomaly_count',)
+                )
+            except ValueError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            stats = dict(stats)
+            stats['hourly_data'] = downsample_rows(
+                stats['hourly_data'], points, 'hour', series, method
+            )
         
         return Response(stats)
     
@@ -191,8 +364,10 @@ class SystemMetricViewSet(viewsets.ModelViewSet):
         # Count metrics to be deleted
         to_delete_count = SystemMetric.objects.filter(timestamp__lt=cutoff_date).count()
         
-        # Delete old metrics
-        deleted, _ = SystemMetric.objects.filter(timestamp__lt=cutoff_date).delete()
+        # Delete old metrics, with their rollups
+        with transaction.atomic():
+            deleted, _ = SystemMetric.objects.filter(timestamp__lt=cutoff_date).delete()
+            rebuild_rollups(end=cutoff_date)
         
         return Response({
             "detail": f"Deleted {deleted} metrics older than {days} days",
@@ -209,27 +384,36 @@ class ModelTrainingViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'], permission_classes=[AllowAny])
     def train(self, request):
-        """Train a new model."""
+        """
+        Queue a training job.
+        
+        Training runs in a background worker process; poll the returned job
+        at /api/training/jobs/<id>/. While a job is still queued, another
+        request returns that job instead of queuing a second one, with
+        ``requested_samples`` set if its sample count differs.
+        
+        ``samples`` must be between 50 and
+        ``HARDWARE_MONITOR['TRAINING_MAX_SAMPLES']``, or the response is 400.
+        """
         # Get number of samples from request data
         samples = request.data.get('samples', 300)
         try:
-            samples = int(samples)
-        except (TypeError, ValueError):
-            samples = 300
-        
-        # Train the model
-        success = hardware_monitor.train_model(training_samples=samples)
+            job, created = submit_training_job(samples)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
-        if success:
-            # Get the newly created training history
-            latest_training = ModelTrainingHistory.objects.order_by('-trained_at').first()
-            serializer = self.get_serializer(latest_training)
-            return Response(serializer.data)
-        else:
-            return Response(
-                {"detail": "Model training failed. See logs for details."}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        job.refresh_from_db()
+        data = TrainingJobSerializer(job).data
+        if not created and job.samples != int(samples):
+            # The queued job trains on its own sample count, not this one
+            data['requested_samples'] = int(samples)
+            data['detail'] = (
+                f"Joined queued job {job.pk}, which trains on {job.samples} samples"
             )
+        return Response(
+            data,
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+        )
     
     @action(detail=False, methods=['get'], permission_classes=[AllowAny])
     def latest(self, request):
@@ -241,11 +425,31 @@ class ModelTrainingViewSet(viewsets.ModelViewSet):
         else:
             return Response({"detail": "No training history available"}, status=status.HTTP_404_NOT_FOUND)
 
+class TrainingJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """API endpoint for background training jobs."""
+    queryset = TrainingJob.objects.all()
+    serializer_class = TrainingJobSerializer
+    permission_classes = [AllowAny]  # Was [IsAuthenticated]
+    filterset_fields = ['status', 'model_name']
+    
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a queued job, or stop a running one at its next progress report."""
+        job = self.get_object()
+        if job.is_finished:
+            return Response(
+                {"detail": f"Job already {job.status}"},
+                status=status.HTTP_409_CONFLICT
+            )
+        job = cancel_training_job(job.pk)
+        return Response(self.get_serializer(job).data)
+
 class HardwareIssueViewSet(viewsets.ModelViewSet):
     """API endpoint for hardware issues."""
     queryset = HardwareIssue.objects.all()
     serializer_class = HardwareIssueSerializer
     permission_classes = [AllowAny]  # Was [IsAuthenticated]
+    pagination_class = KeysetPagination
     filterset_fields = ['is_resolved', 'issue_type']
     search_fields = ['issue_type', 'description', 'recommendation']
     ordering_fields = ['timestamp', 'issue_type', 'is_resolved']
@@ -333,30 +537,36 @@ class HardwareIssueViewSet(viewsets.ModelViewSet):
         days = int(request.query_params.get('days', 30))
         start_date = timezone.now() - timezone.timedelta(days=days)
         
-        # Get issues in the time range
-        issues = HardwareIssue.objects.filter(timestamp__gte=start_date)
-        
-        # Group by issue type and resolution status
-        issue_types = issues.values('issue_type').annotate(
-            total=Count('id'),
-            resolved=Count('id', filter=models.Q(is_resolved=True)),
-            unresolved=Count('id', filter=models.Q(is_resolved=False))
-        ).order_by('-total')
-        
-        # Get daily counts
+        # Count issues per day and type in one pass over the timestamp
+        # index. Grouping by the issue_type column first would walk the
+        # whole issue_type index instead of only the requested range.
         from django.db.models.functions import TruncDay
-        daily_counts = issues.annotate(
+        groups = HardwareIssue.objects.filter(timestamp__gte=start_date).annotate(
             day=TruncDay('timestamp')
-        ).values('day').annotate(
-            count=Count('id')
-        ).order_by('day')
+        ).values('day', type=models.F('issue_type')).annotate(
+            total=Count('id'),
+            resolved=Count('id', filter=models.Q(is_resolved=True))
+        ).order_by()
+        
+        issue_types = {}
+        daily_counts = {}
+        for group in groups:
+            counts = issue_types.setdefault(group['type'], {
+                'issue_type': group['type'], 'total': 0, 'resolved': 0, 'unresolved': 0
+            })
+            counts['total'] += group['total']
+            counts['resolved'] += group['resolved']
+            counts['unresolved'] += group['total'] - group['resolved']
+            daily_counts[group['day']] = daily_counts.get(group['day'], 0) + group['total']
         
+        resolved = sum(counts['resolved'] for counts in issue_types.values())
+        total = sum(counts['total'] for counts in issue_types.values())
         summary = {
-            'total_issues': issues.count(),
-            'resolved_issues': issues.filter(is_resolved=True).count(),
-            'unresolved_issues': issues.filter(is_resolved=False).count(),
-            'issue_types': list(issue_types),
-            'daily_counts': list(daily_counts)
+            'total_issues': total,
+            'resolved_issues': resolved,
+            'unresolved_issues': total - resolved,
+            'issue_types': sorted(issue_types.values(), key=lambda counts: -counts['total']),
+            'daily_counts': [{'day': day, 'count': count} for day, count in sorted(daily_counts.items())]
         }
         
         return Response(summary)
@@ -365,18 +575,29 @@ class DashboardView(APIView):
     """API view for the dashboard summary data."""
     permission_classes = [AllowAny]  # Was [IsAuthenticated]
     
+    # The response is the snapshot, so its version alone decides a 304
+    @method_decorator(conditional_on('dashboard'))
     def get(self, request):
-        """Get dashboard summary data."""
-        summary = hardware_monitor.get_system_summary()
-        serializer = SystemSummarySerializer(summary)
-        return Response(serializer.data)
+        """
+        Get dashboard summary data.
+        
+        Served from the snapshot the collector publishes every collection
+        cycle; it is only built here when no collector has published one.
+        """
+        summary = get_dashboard_snapshot()
+        if summary is None:
+            monitor = get_hardware_monitor()
+            summary = monitor.publish_dashboard_snapshot(
+                monitor.collect_system_metrics(), timeout=DASHBOARD_FALLBACK_TIMEOUT
+            )
+        return Response(summary)
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def health_check(request):
     """Simple health check endpoint."""
-    return JsonResponse({
+    return Response({
         'status': 'ok',
         'timestamp': timezone.now().isoformat()
     })
@@ -390,55 +611,230 @@ def system_info(request):
     Get detailed information about the system hardware.
     """
     try:
+        cpu = get_cpu_sampler().latest()
+        static = probe_cache.get('static_system_info', get_static_system_info)
+        
+        # Snapshot the dynamic counters once for the whole response
+        cpu_freq = psutil.cpu_freq()
+        memory = psutil.virtual_memory()
+        
         # Basic system info
         system_data = {
-            "system": {
-                "platform": platform.system(),
-                "platform_release": platform.release(),
-                "platform_version": platform.version(),
-                "architecture": platform.machine(),
-                "hostname": socket.gethostname(),
-                "ip_address": socket.gethostbyname(socket.gethostname()),
-                "mac_address": ':'.join(re.findall('..', '%012x' % uuid.getnode())),
-                "processor": platform.processor(),
-            },
+            "system": dict(static['system'], ip_address=get_ip_address()),
             
             # CPU info
-            "cpu": {
-                "physical_cores": psutil.cpu_count(logical=False),
-                "total_cores": psutil.cpu_count(logical=True),
-                "max_frequency": f"{psutil.cpu_freq().max:.2f}MHz" if psutil.cpu_freq() else "Unknown",
-                "min_frequency": f"{psutil.cpu_freq().min:.2f}MHz" if psutil.cpu_freq() else "Unknown",
-                "current_frequency": f"{psutil.cpu_freq().current:.2f}MHz" if psutil.cpu_freq() else "Unknown",
-                "usage_per_core": [f"{percentage:.1f}%" for percentage in psutil.cpu_percent(percpu=True, interval=0.1)],
-                "total_usage": f"{psutil.cpu_percent()}%",
-            },
+            "cpu": dict(
+                static['cpu'],
+                current_frequency=f"{cpu_freq.current:.2f}MHz" if cpu_freq else "Unknown",
+                usage_per_core=[f"{percentage:.1f}%" for percentage in cpu['per_core']],
+                total_usage=f"{cpu['total']}%",
+                usage_sample_age=cpu['age'],
+            ),
             
             # Memory info
             "memory": {
-                "total": get_size(psutil.virtual_memory().total),
-                "available": get_size(psutil.virtual_memory().available),
-                "used": get_size(psutil.virtual_memory().used),
-                "percentage": f"{psutil.virtual_memory().percent}%",
+                "total": get_size(memory.total),
+                "available": get_size(memory.available),
+                "used": get_size(memory.used),
+                "percentage": f"{memory.percent}%",
             },
-            
-            # Disk info
-            "disks": get_disk_info(),
-            
-            # Network info
-            "network": get_network_info(),
-            
-            # Fan info - now using the updated function
-            "fans": get_fan_info_for_system(),
-            
-            # GPU info (if available)
-            "gpu": get_gpu_info(),
         }
         
-        return JsonResponse(system_data)
+        # Disk, network, fan and GPU info are gathered concurrently; a probe
+        # that misses its deadline is reported as {"status": "timeout"}
+        system_data.update(run_probes({
+            "disks": lambda: probe_cache.get('disks', get_disk_info, ttl=get_probe_ttl('disks')),
+            "network": get_network_info,
+            "fans": get_fan_info_for_system,
+            "gpu": get_gpu_info,
+        }))
+        
+        return Response(system_data)
     
     except Exception as e:
-        return JsonResponse({"error": str(e)}, status=500)
+        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def sensor_catalog(request):
+    """
+    Get the sensor sources resolved at startup and the unsupported probes.
+    """
+    return Response(get_hardware_monitor().sensors.as_dict())
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def refresh_sensor_catalog(request):
+    """
+    Re-probe the sensor sources, e.g. after hot-plugging hardware.
+    
+    Other web workers and the collector refresh their own catalogs within
+    a few seconds; the collector then runs probes that became supported.
+    """
+    return Response(get_hardware_monitor().sensors.request_refresh())
+
+def get_static_system_info():
+    """
+    Facts about the machine that do not change while the process runs.
+    
+    Returns:
+        dict: ``system`` and ``cpu`` sections of the system info response
+    """
+    cpu_freq = psutil.cpu_freq()
+    return {
+        "system": {
+            "platform": platform.system(),
+            "platform_release": platform.release(),
+            "platform_version": platform.version(),
+            "architecture": platform.machine(),
+            "hostname": socket.gethostname(),
+            "mac_address": ':'.join(re.findall('..', '%012x' % uuid.getnode())),
+            "processor": platform.processor(),
+        },
+        "cpu": {
+            "physical_cores": psutil.cpu_count(logical=False),
+            "total_cores": psutil.cpu_count(logical=True),
+            "max_frequency": f"{cpu_freq.max:.2f}MHz" if cpu_freq else "Unknown",
+            "min_frequency": f"{cpu_freq.min:.2f}MHz" if cpu_freq else "Unknown",
+        },
+    }
+
+def get_ip_address():
+    """Resolve the host's IP address, caching the DNS lookup."""
+    try:
+        return probe_cache.get(
+            'ip_address',
+            lambda: socket.gethostbyname(socket.gethostname()),
+            ttl=get_probe_ttl('dns'),
+            negative_ttl=get_probe_ttl('negative'),
+        )
+    except OSError:
+        return "Unknown"
+
+def metrics_stream(request):
+    """
+    Server-Sent Events stream of new metrics, anomalies and issues.
+    
+    Sends ``metric``, ``issue`` and ``fans`` events as the collector
+    produces them. Reconnecting clients resume from ``Last-Event-ID`` (or
+    ``?last_event_id=``).
+    """
+    if request.method != 'GET':
+        return FastJsonResponse({"detail": "Method not allowed"}, status=405)
+    
+    config = getattr(settings, 'HARDWARE_MONITOR', {})
+    broadcaster = get_broadcaster(sources={
+        'fans': (get_fan_info_for_system, config.get('PROBE_INTERVALS', {}).get('fans', 30)),
+    })
+    cursor = parse_cursor(
+        request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    )
+    stream = EventStream(broadcaster, cursor)
+    
+    # Under ASGI the stream is consumed asynchronously, so an idle client
+    # holds no worker thread
+    content = stream.__aiter__() if isinstance(request, ASGIRequest) else iter(stream)
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def metrics_export(request):
+    """
+    Stream metrics for a time range as CSV or NDJSON.
+    
+    Query parameters: ``format`` (csv or ndjson), ``start_date`` and
+    ``end_date`` (ISO 8601), ``fields`` (comma-separated columns) and
+    ``gzip=true``.
+    """
+    if request.method != 'GET':
+        return FastJsonResponse({"detail": "Method not allowed"}, status=405)
+    
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return FastJsonResponse(
+            {"detail": f"format must be one of: {', '.join(EXPORT_FORMATS)}"}, status=400
+        )
+    
+    bounds = {}
+    for param in ('start_date', 'end_date'):
+        value = request.GET.get(param)
+        if not value:
+            continue
+        try:
+            bounds[param] = parse_datetime(value)
+        except ValueError:
+            # Well formed but impossible, e.g. month 13
+            bounds[param] = None
+        if bounds[param] is None:
+            return FastJsonResponse({"detail": f"{param} must be an ISO 8601 datetime"}, status=400)
+        if timezone.is_naive(bounds[param]):
+            bounds[param] = timezone.make_aware(bounds[param])
+    
+    fields = EXPORT_FIELDS
+    if request.GET.get('fields'):
+        fields = tuple(request.GET['fields'].split(','))
+        unknown = set(fields) - set(EXPORT_FIELDS)
+        if unknown:
+            return FastJsonResponse(
+                {"detail": f"Unknown fields: {', '.join(sorted(unknown))}"}, status=400
+            )
+    
+    compress = request.GET.get('gzip', '').lower() == 'true'
+    chunks = export_metrics(
+        fmt,
+        start=bounds.get('start_date'),
+        end=bounds.get('end_date'),
+        fields=fields,
+        compress=compress,
+    )
+    
+    filename = f'metrics.{fmt}'
+    if compress:
+        # A .gz download rather than Content-Encoding, so clients keep the
+        # compressed file instead of inflating it on the fly
+        response = StreamingHttpResponse(chunks, content_type='application/gzip')
+        filename += '.gz'
+    else:
+        response = StreamingHttpResponse(chunks, content_type=EXPORT_CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def parse_downsample_params(params, default_series, allowed_series):
+    """
+    Read ``points``, ``downsample`` and ``series`` from query parameters.
+    
+    Args:
+        params (QueryDict): Request query parameters
+        default_series (tuple): Series used when ``series`` is not given
+        allowed_series (tuple): Fields ``series`` may name
+    
+    Returns:
+        tuple: ``(points, method, series)``
+    
+    Raises:
+        ValueError: If a parameter is invalid
+    """
+    try:
+        points = int(params.get('points'))
+    except (TypeError, ValueError):
+        raise ValueError("points must be an integer")
+    if points < 3:
+        raise ValueError("points must be at least 3")
+    points = min(points, MAX_POINTS)
+    
+    method = params.get('downsample', 'lttb')
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"downsample must be one of: {', '.join(DOWNSAMPLE_METHODS)}")
+    
+    series = default_series
+    if params.get('series'):
+        series = tuple(params['series'].split(','))
+        unknown = set(series) - set(allowed_series)
+        if unknown:
+            raise ValueError(f"Unknown series: {', '.join(sorted(unknown))}")
+    return points, method, series
 
 def get_size(bytes, suffix="B"):
     """
@@ -475,8 +871,8 @@ def get_disk_info():
     
     return disks
 
-def get_network_info():
-    """Get information about network interfaces."""
+def get_network_interfaces():
+    """Get the IPv4 address of every network interface."""
     interfaces = []
     if_addrs = psutil.net_if_addrs()
     for interface_name, interface_addresses in if_addrs.items():
@@ -488,6 +884,12 @@ def get_network_info():
                     "netmask": address.netmask,
                 })
     
+    return interfaces
+
+def get_network_info():
+    """Get information about network interfaces."""
+    interfaces = probe_cache.get('network_interfaces', get_network_interfaces, ttl=get_probe_ttl('network'))
+    
     # Get network I/O statistics
     net_io = psutil.net_io_counters()
     network_stats = {
@@ -504,11 +906,44 @@ def get_gpu_info():
     """
     Get GPU information if available.
     This is a basic implementation - requires additional libraries for detailed info.
+    
+    Readings are cached briefly; when no GPU tooling works the failure is
+    cached as well, so requests stop spawning nvidia-smi.
     """
     try:
-        # Try to get GPU info using GPUtil if available
+        return probe_cache.get(
+            'gpu',
+            read_gpu_info,
+            ttl=get_probe_ttl('gpu'),
+            negative_ttl=get_probe_ttl('negative'),
+        )
+    except Exception:
+        # If all approaches fail, return a basic placeholder
+        return [{
+            "note": "Detailed GPU information unavailable. Install GPUtil for better GPU detection."
+        }]
+
+def import_gputil():
+    """Import GPUtil, or return None if it is not installed."""
+    try:
         import GPUtil
+        return GPUtil
+    except ImportError:
+        return None
+
+def read_gpu_info():
+    """
+    Read GPU information using GPUtil, or nvidia-smi for NVIDIA GPUs.
+    
+    Raises:
+        ProbeUnavailable: If neither tool is installed, or neither finds a GPU
+    """
+    GPUtil = probe_cache.get('gputil', import_gputil)
+    if GPUtil is not None:
         gpus = GPUtil.getGPUs()
+        if not gpus:
+            # GPUtil only sees NVIDIA GPUs; cache their absence like a failure
+            raise ProbeUnavailable("GPUtil found no NVIDIA GPU")
         gpu_list = []
         
         for gpu in gpus:
@@ -525,43 +960,43 @@ def get_gpu_info():
         
         return gpu_list
     
-    except ImportError:
-        # If GPUtil is not available, try a simpler approach for NVIDIA GPUs
-        try:
-            import subprocess
-            output = subprocess.check_output(["nvidia-smi", "--query-gpu=name,memory.total,memory.used,memory.free,temperature.gpu", "--format=csv,noheader,nounits"])
-            output = output.decode('utf-8').strip()
-            
-            gpu_list = []
-            for i, line in enumerate(output.split("\n")):
-                name, total_memory, used_memory, free_memory, temperature = line.split(", ")
-                gpu_info = {
-                    "id": i,
-                    "name": name,
-                    "total_memory": f"{total_memory}MB",
-                    "used_memory": f"{used_memory}MB",
-                    "free_memory": f"{free_memory}MB",
-                    "temperature": f"{temperature}°C",
-                }
-                gpu_list.append(gpu_info)
-            
-            return gpu_list
-        
-        except (ImportError, subprocess.SubprocessError):
-            # If all approaches fail, return a basic placeholder
-            return [{
-                "note": "Detailed GPU information unavailable. Install GPUtil for better GPU detection."
-            }]
+    # If GPUtil is not available, try a simpler approach for NVIDIA GPUs
+    nvidia_smi = probe_cache.get('nvidia_smi_path', lambda: shutil.which("nvidia-smi"))
+    if nvidia_smi is None:
+        raise ProbeUnavailable("Neither GPUtil nor nvidia-smi is installed")
+    
+    output = subprocess.check_output(
+        [nvidia_smi, "--query-gpu=name,memory.total,memory.used,memory.free,temperature.gpu", "--format=csv,noheader,nounits"],
+        timeout=SUBPROCESS_TIMEOUT
+    )
+    output = output.decode('utf-8').strip()
+    if not output:
+        raise ProbeUnavailable("nvidia-smi found no GPU")
+    
+    gpu_list = []
+    for i, line in enumerate(output.split("\n")):
+        name, total_memory, used_memory, free_memory, temperature = line.split(", ")
+        gpu_info = {
+            "id": i,
+            "name": name,
+            "total_memory": f"{total_memory}MB",
+            "used_memory": f"{used_memory}MB",
+            "free_memory": f"{free_memory}MB",
+            "temperature": f"{temperature}°C",
+        }
+        gpu_list.append(gpu_info)
+    
+    return gpu_list
 
 def get_fan_info(request):
     """
     API endpoint to get fan information from the system.
     
     Returns:
-        JsonResponse: Fan information
+        FastJsonResponse: Fan information
     """
     fans = get_fan_info_for_system()
-    return JsonResponse(fans, safe=False)
+    return FastJsonResponse(fans)
 
 def get_fan_info_for_system():
     """
@@ -775,7 +1210,8 @@ def get_fan_info_from_powershell():
         result = subprocess.run(
             ["powershell", "-ExecutionPolicy", "Bypass", "-File", ps_file],
             capture_output=True,
-            text=True
+            text=True,
+            timeout=SUBPROCESS_TIMEOUT
         )
         
         # Parse the JSON output
@@ -794,12 +1230,28 @@ def get_fan_info_from_powershell():
 
 def get_fan_info_linux():
     """Get cooling fan information on Linux systems."""
+    # Read the hwmon sysfs files directly when they exist
+    reader = get_hwmon_reader()
+    if reader is not None:
+        return [
+            {
+                "name": fan['label'],
+                "hardware": fan['chip'],
+                "type": "Fan",
+                "value": int(fan['rpm']),
+                "speed": f"{int(fan['rpm'])} RPM",
+                "status": "Active" if fan['rpm'] > 0 else "Inactive"
+            }
+            for fan in reader.read_fans()
+        ]
+    
     try:
-        # Use lm-sensors to get fan information
+        # Fall back to lm-sensors to get fan information
         result = subprocess.run(
             ["sensors", "-j"],
             capture_output=True,
-            text=True
+            text=True,
+            timeout=SUBPROCESS_TIMEOUT
         )
         
         # Parse the JSON output
@@ -839,6 +1291,7 @@ def simulate_fan_info():
     if platform.system() == "Windows":
         # Check if it's a laptop or desktop
         try:
+            import wmi
             c = wmi.WMI()
             chassis_types = [chassis.ChassisTypes for chassis in c.Win32_SystemEnclosure()]
             # Flatten the list of lists
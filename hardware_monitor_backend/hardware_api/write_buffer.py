@@ -0,0 +1,153 @@
+"""
+Write-behind buffer that persists SystemMetric rows in batches.
+
+Saving one row per sample costs one commit (and on SQLite one fsync) per
+sample. The buffer groups samples and their HardwareIssue rows and writes
+them with ``bulk_create`` inside a single transaction.
+"""
+
+import logging
+import threading
+import time
+
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+
+from .models import SystemMetric, HardwareIssue
+from .rollups import update_rollups
+
+logger = logging.getLogger(__name__)
+
+
+class MetricWriteBuffer:
+    """
+    Collects unsaved SystemMetric objects and writes them in batches.
+
+    A batch is flushed once it holds ``batch_size`` samples or its oldest
+    sample is ``max_age`` seconds old, whichever comes first.
+    """
+
+    def __init__(self, batch_size=100, max_age=10.0, max_pending=None, on_flush=None):
+        """
+        Args:
+            batch_size (int): Flush as soon as this many samples are buffered.
+            max_age (float): Flush once the oldest sample is this many seconds old.
+            max_pending (int, optional): Upper bound on samples kept while the
+                database is unavailable. Defaults to ten batches.
+            on_flush (callable, optional): Called with each batch of
+                ``(metric, issues)`` pairs once it has been committed.
+        """
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.max_pending = max_pending or batch_size * 10
+        self.on_flush = on_flush
+        self._pending = []
+        self._oldest = None
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, metric, issues=()):
+        """
+        Buffer a sample and the issues detected for it.
+
+        Args:
+            metric (SystemMetric): Unsaved metric object
+            issues (iterable): Unsaved HardwareIssue objects for the metric
+
+        Returns:
+            int: Number of samples written if this triggered a flush
+        """
+        with self._lock:
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append((metric, list(issues)))
+            if len(self._pending) >= self.batch_size:
+                return self.flush()
+        return 0
+
+    def flush_if_due(self):
+        """Flush the buffer if its oldest sample has reached ``max_age``."""
+        with self._lock:
+            if self._pending and time.monotonic() - self._oldest >= self.max_age:
+                return self.flush()
+        return 0
+
+    def flush(self):
+        """
+        Write every buffered sample in one transaction.
+
+        Returns:
+            int: Number of samples written
+        """
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, []
+            oldest, self._oldest = self._oldest, None
+
+            try:
+                self._write(batch)
+            except Exception as e:
+                logger.error(f"Error writing {len(batch)} buffered metrics: {e}")
+                self._reset(batch)
+                # Keep the batch for the next attempt, dropping the oldest
+                # samples if the database has been unavailable for a while.
+                self._pending = (batch + self._pending)[-self.max_pending:]
+                self._oldest = oldest
+                return 0
+
+        self._send_signals(batch)
+        if self.on_flush is not None:
+            try:
+                self.on_flush(batch)
+            except Exception as e:
+                logger.error(f"Error handling {len(batch)} written metrics: {e}")
+        return len(batch)
+
+    def _write(self, batch):
+        metrics = [metric for metric, _ in batch]
+
+        with transaction.atomic():
+            if connection.features.can_return_rows_from_bulk_insert:
+                SystemMetric.objects.bulk_create(metrics)
+            else:
+                # Without RETURNING support bulk_create leaves the primary
+                # keys unset, which the issues need for their foreign key.
+                for metric in metrics:
+                    metric.save()
+
+            issues = []
+            for metric, metric_issues in batch:
+                for issue in metric_issues:
+                    issue.metric = metric
+                    issues.append(issue)
+            if issues:
+                HardwareIssue.objects.bulk_create(issues)
+
+            update_rollups(metrics)
+
+    def _reset(self, batch):
+        """
+        Make the objects of a rolled-back batch unsaved again.
+
+        bulk_create and save() set primary keys that the rollback discarded.
+        Retried with them, the batch would collide with rows another writer
+        has inserted under the same ids in the meantime.
+        """
+        for metric, issues in batch:
+            metric.pk = None
+            metric._state.adding = True
+            for issue in issues:
+                issue.pk = None
+                issue._state.adding = True
+
+    def _send_signals(self, batch):
+        """bulk_create skips post_save, so send it for the existing receivers."""
+        for metric, issues in batch:
+            post_save.send(sender=SystemMetric, instance=metric, created=True,
+                           update_fields=None, raw=False, using=metric._state.db)
+            for issue in issues:
+                post_save.send(sender=HardwareIssue, instance=issue, created=True,
+                               update_fields=None, raw=False, using=issue._state.db)
@@ -0,0 +1,15 @@
+"""
+ASGI config for hardware_monitor_project project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+Serving under ASGI lets /api/stream/ hold many idle clients without a
+worker thread each.
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hardware_monitor_project.settings')
+
+application = get_asgi_application()
@@ -4,6 +4,7 @@ Django settings for hardware_monitor_project.
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -33,6 +34,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware should be at the top
+    # Compresses JSON/CSV/NDJSON responses; before anything that reads the body
+    'hardware_api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -119,6 +122,19 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = 'media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Caches. 'hardware_monitor' is shared between the monitor_hardware
+# collector and the web workers (it holds the dashboard snapshot), so it
+# must not be a per-process cache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'hardware_monitor': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(tempfile.gettempdir(), 'hardware_monitor_cache'),
+    },
+}
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -137,6 +153,10 @@ REST_FRAMEWORK = {
         'rest_framework.filters.SearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'hardware_api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 100,
     'DEFAULT_THROTTLE_CLASSES': [
@@ -156,9 +176,8 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
 }
 
-# Directory to store ML models
+# Directory to store ML models (created when the first model is saved)
 ML_MODELS_DIR = os.path.join(BASE_DIR, 'ml_models')
-os.makedirs(ML_MODELS_DIR, exist_ok=True)
 
 # Logging configuration
 LOGGING = {
@@ -185,6 +204,8 @@ LOGGING = {
             'class': 'logging.FileHandler',
             'filename': os.path.join(BASE_DIR, 'hardware_monitor.log'),
             'formatter': 'verbose',
+            # Opened on the first record rather than at start-up
+            'delay': True,
         },
     },
     'root': {
@@ -215,4 +236,70 @@ HARDWARE_MONITOR = {
     'HIGH_DISK_THRESHOLD': 90,
     'HIGH_TEMP_THRESHOLD': 80,  # celsius
     'LOW_BATTERY_THRESHOLD': 15,
+    'CPU_SAMPLE_INTERVAL': 1.0,  # seconds between background CPU samples
+    'CPU_SAMPLE_HISTORY': 60,  # samples kept in the CPU ring buffer
+    'WRITE_BATCH_SIZE': 100,  # buffered samples written per transaction
+    'WRITE_BATCH_MAX_AGE': 10,  # seconds before a partial batch is flushed
+    # Raw cpu/memory samples kept in memory by the collector for
+    # /api/metrics/recent/ (one row per cpu probe run). RECENT_SAMPLES_PATH
+    # defaults to a file in the system temp directory.
+    'RECENT_SAMPLES_CAPACITY': 3600,
+    'RECENT_SAMPLES_PATH': None,
+    # Seconds between runs of each probe in the monitor_hardware collector
+    'PROBE_INTERVALS': {
+        'cpu': 0.25,
+        'memory': 0.25,
+        'network': 5,
+        'disk_io': 5,
+        'temperature': 10,
+        'fans': 30,
+        'battery': 60,
+        'disk_usage': 60,
+    },
+    # Seconds /api/system-info/ reuses each probe result. 'negative' is how
+    # long a failed probe (e.g. missing nvidia-smi) is remembered.
+    'PROBE_CACHE_TTLS': {
+        'dns': 300,
+        'network': 10,
+        'disks': 30,
+        'gpu': 5,
+        'negative': 300,
+    },
+    # /api/stream/ polls the database for new rows every
+    # STREAM_POLL_INTERVAL seconds (once per process, shared by all clients),
+    # sends a keepalive after STREAM_HEARTBEAT idle seconds and replays at
+    # most STREAM_BACKLOG_LIMIT rows to a reconnecting client. Ids a poll
+    # skipped (a transaction still open, or rolled back) are rechecked for
+    # STREAM_GAP_TIMEOUT seconds
+    'STREAM_POLL_INTERVAL': 1.0,
+    'STREAM_HEARTBEAT': 15,
+    'STREAM_BACKLOG_LIMIT': 500,
+    'STREAM_GAP_TIMEOUT': 30,
+    # Responses smaller than this are not worth compressing
+    'COMPRESSION_MIN_BYTES': 1024,
+    # Seconds a /api/metrics/statistics/ result is reused while no new
+    # samples arrive
+    'STATISTICS_CACHE_TTL': 60,
+    # /api/system-info/ runs its disk, network, fan and GPU probes on a pool
+    # of PROBE_WORKERS threads and waits at most PROBE_DEADLINES seconds for
+    # each before reporting the section as {"status": "timeout"}
+    'PROBE_WORKERS': 4,
+    'PROBE_DEADLINES': {
+        'disks': 2,
+        'network': 1,
+        'fans': 3,
+        'gpu': 3,
+    },
+    # /api/training/train/ runs jobs on a pool of TRAINING_PROCESSES worker
+    # processes (0 trains inline, in the requesting process). A running job
+    # that reports no progress for TRAINING_JOB_STALE_AFTER seconds is
+    # considered lost and marked failed. A request may train on at most
+    # TRAINING_MAX_SAMPLES of the most recent metrics.
+    'TRAINING_PROCESSES': 1,
+    'TRAINING_JOB_STALE_AFTER': 600,
+    'TRAINING_MAX_SAMPLES': 100000,
+    # Seconds between checks for a newer model version. Each process scores
+    # with the model it has and loads a retrained one in the background, so
+    # a new model is in use everywhere within this long.
+    'MODEL_CHECK_INTERVAL': 5,
 }
\ No newline at end of file